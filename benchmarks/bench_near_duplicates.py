@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate index scaling benchmark
+
+Builds synthetic corpora of growing size (families of reissued documents that
+differ only in dates and IDs, plus unrelated documents) and measures the time
+of one lookup and the number of candidate documents it has to compare. With
+LSH both should stay roughly flat while the corpus grows; a linear scan would
+grow with it.
+
+    python benchmarks/bench_near_duplicates.py --sizes 1000 5000 20000
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from src.data_processing.near_duplicates import NearDuplicateIndex, minhash_signature
+
+VOCABULARY = (
+    "inspection report helmet safety valve pressure torque bolt steel concrete "
+    "certificate audit compliance standard load test weld fatigue crack coating "
+    "thickness sample batch calibration tolerance specification supplier"
+).split()
+
+
+def make_document(rng, family_seed, family_variant):
+    """Text of one document; documents of the same family differ only in numbers"""
+    family_rng = random.Random(family_seed)
+    words = [family_rng.choice(VOCABULARY) for _ in range(600)]
+    for i in range(0, len(words), 40):
+        words[i] = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{2020 + family_variant}"
+    pages = [words[i:i + 200] for i in range(0, len(words), 200)]
+    return {
+        "content": " ".join(words),
+        "pages": [{"page_number": n + 1, "lines": [" ".join(page)]} for n, page in enumerate(pages)],
+    }
+
+
+def build(index, size, rng, family_size=5):
+    for i in range(size):
+        family = i // family_size
+        index.add(f"doc-{i}", make_document(rng, family, i % family_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate lookups as the corpus grows")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    results = []
+    print(f"{'corpus':>8} {'build s':>9} {'query ms':>9} {'candidates':>11} {'found':>6}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            index = NearDuplicateIndex(os.path.join(directory, "bench.db"), threshold=0.8)
+            started = time.perf_counter()
+            build(index, size, rng)
+            build_seconds = time.perf_counter() - started
+
+            query_seconds, candidates, found = 0.0, 0, 0
+            for q in range(args.queries):
+                family = rng.randrange(size // 5)
+                signature = minhash_signature(make_document(rng, family, 99)["content"])
+                started = time.perf_counter()
+                matches = index.find(signature)
+                query_seconds += time.perf_counter() - started
+                candidates += index.last_candidates
+                found += bool(matches)
+
+            result = {
+                "corpus_size": size,
+                "build_seconds": round(build_seconds, 2),
+                "query_ms": round(query_seconds / args.queries * 1000, 3),
+                "avg_candidates": round(candidates / args.queries, 1),
+                "recall": round(found / args.queries, 3),
+            }
+            results.append(result)
+            print(f"{size:>8} {result['build_seconds']:>9} {result['query_ms']:>9} "
+                  f"{result['avg_candidates']:>11} {result['recall']:>6}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
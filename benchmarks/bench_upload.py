@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Upload throughput benchmark by file size and concurrency
+
+Runs against Azurite by default so it never touches (or bills) a real account:
+
+    azurite-blob --silent --location /tmp/azurite &
+    python benchmarks/bench_upload.py --sizes 1 16 64 256 --concurrency 1 4 8 16
+
+Every size is uploaded once per concurrency level plus once with the automatic
+tuning from AzureStorageClient.get_upload_tuning ("auto").
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import json
+import logging
+import tempfile
+import time
+
+# Well-known Azurite development account (not a secret)
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+from src.data_ingestion.storage_client import AzureStorageClient, MB
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def make_file(directory, size_mb):
+    """Write a file of random (incompressible) bytes"""
+    path = os.path.join(directory, f"bench_{size_mb}mb.bin")
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(MB))
+    return path
+
+
+def bench_upload(storage_client, path, concurrency, repeat):
+    """Best-of-N upload time for one file at one concurrency level"""
+    blob_name = f"bench/{os.path.basename(path)}"
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        storage_client.upload_file(path, blob_name, max_concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blob upload throughput")
+    parser.add_argument("--connection-string", default=os.getenv("BENCH_STORAGE_CONNECTION_STRING", AZURITE_CONNECTION_STRING))
+    parser.add_argument("--container", default="benchmark-uploads")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 64, 256], help="File sizes in MB")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3, help="Uploads per case, best time is kept")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    storage_client = AzureStorageClient(args.connection_string, args.container)
+    results = []
+
+    print(f"{'size':>8} {'concurrency':>12} {'block':>8} {'seconds':>9} {'MB/s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size_mb in args.sizes:
+            path = make_file(directory, size_mb)
+            tuning = storage_client.get_upload_tuning(size_mb * MB)
+            for concurrency in args.concurrency + ["auto"]:
+                level = tuning["max_concurrency"] if concurrency == "auto" else concurrency
+                seconds = bench_upload(storage_client, path, level, args.repeat)
+                result = {
+                    "size_mb": size_mb,
+                    "concurrency": concurrency,
+                    "block_size_mb": tuning["block_size"] // MB,
+                    "seconds": round(seconds, 4),
+                    "mb_per_s": round(size_mb / seconds, 2),
+                }
+                results.append(result)
+                print(f"{size_mb:>6}MB {str(concurrency):>12} {result['block_size_mb']:>6}MB "
+                      f"{result['seconds']:>9.3f} {result['mb_per_s']:>9.1f}")
+            os.remove(path)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
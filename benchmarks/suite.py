@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite with JSON baselines and regression checks
+
+    python benchmarks/suite.py run                          # every case that can run here
+    python benchmarks/suite.py run --only flatten verify    # cases whose name starts with these
+    python benchmarks/suite.py run --save-baseline          # also store as the baseline
+    python benchmarks/suite.py compare                      # latest run vs baseline
+    python benchmarks/suite.py compare base.json new.json --threshold 15
+
+Results are written to benchmarks/results/ (latest.json plus a timestamped
+copy); baselines live in benchmarks/baselines/. Storage cases run against
+Azurite unless BENCH_STORAGE_CONNECTION_STRING is set, and the end-to-end case
+analyzes through the in-process fake Document Intelligence server, so nothing
+here needs the network. Cases whose dependencies are unavailable are
+reported as skipped rather than failed.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import tempfile
+
+# Keep the indexes and event log written by the pipeline out of the real data directory
+os.environ.setdefault("SECUREDOC_DATA_DIR", tempfile.mkdtemp(prefix="securedoc-bench-"))
+
+import argparse
+import json
+import logging
+import platform
+import socket
+import statistics
+import subprocess
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from bench_upload import AZURITE_CONNECTION_STRING
+from config.settings import settings
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINES_DIR = os.path.join(BENCH_DIR, "baselines")
+DEFAULT_BASELINE = os.path.join(BASELINES_DIR, "baseline.json")
+MB = 1024 * 1024
+
+CASES = []
+
+
+def case(name, params=(None,), requires=()):
+    """
+    Register a benchmark case, once per parameter
+
+    The decorated function receives (param, context) and does its setup,
+    then returns a dict with the callable to time under "run", plus optional
+    "number" (calls per sample, calibrated automatically when missing),
+    "repeat", "bytes" (processed per call, to report MB/s) and "teardown".
+    """
+    def register(func):
+        for param in params:
+            CASES.append({
+                "name": name if param is None else f"{name}[{param}]",
+                "func": func,
+                "param": param,
+                "requires": requires,
+            })
+        return func
+    return register
+
+
+class Context:
+    """Shared, lazily created resources and the availability checks for them"""
+
+    def __init__(self, connection_string):
+        self.connection_string = connection_string
+        self._storage_clients = {}
+        self._fake_document_intelligence = None
+        self.temp_dir = tempfile.mkdtemp(prefix="securedoc-bench-files-")
+
+    def storage_available(self):
+        endpoint = dict(
+            part.split("=", 1) for part in self.connection_string.split(";") if "=" in part
+        ).get("BlobEndpoint")
+        if not endpoint:
+            return True  # a real account; let the case fail loudly if it is unreachable
+        url = urlsplit(endpoint)
+        try:
+            with socket.create_connection((url.hostname, url.port or 80), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def storage(self, container="benchmark-suite"):
+        from src.data_ingestion.storage_client import AzureStorageClient
+        if container not in self._storage_clients:
+            self._storage_clients[container] = AzureStorageClient(self.connection_string, container)
+        return self._storage_clients[container]
+
+    def fake_document_intelligence(self):
+        from fake_document_intelligence import start_server
+        if self._fake_document_intelligence is None:
+            self._fake_document_intelligence = start_server(
+                latency_ms=50, per_page_ms=5, jitter=0, poll_interval=0.05, seed=0
+            )
+        return self._fake_document_intelligence
+
+    def check(self, requirement):
+        """Reason a requirement is not met, or None"""
+        if requirement == "storage" and not self.storage_available():
+            return "storage emulator not reachable (start Azurite or set BENCH_STORAGE_CONNECTION_STRING)"
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+
+def _sdk_analyze_result(pages, with_words=True):
+    """SDK AnalyzeResult object for a synthetic document of ``pages`` pages"""
+    # The generated model is what the SDK deserializes service JSON into
+    from azure.ai.formrecognizer import AnalyzeResult
+    from azure.ai.formrecognizer._generated.v2023_07_31.models import AnalyzeResult as GeneratedAnalyzeResult
+    from fake_document_intelligence import synthetic_result
+
+    raw = synthetic_result(b"%PDF-1.4\n" + b"<< /Type /Page >>\n" * pages)
+    if not with_words:
+        for page in raw["pages"]:
+            page["words"] = []
+    return raw, lambda: AnalyzeResult._from_generated(GeneratedAnalyzeResult.deserialize(raw))
+
+
+@case("flatten_result", params=(1, 100, 1000))
+def bench_flatten_result(pages, context):
+    """DocumentProcessor's conversion of an SDK result into the API dict"""
+    from src.data_processing.document_processor import flatten_result
+    _, build = _sdk_analyze_result(pages, with_words=False)
+    result = build()
+    return {"run": lambda: flatten_result(result)}
+
+
+@case("sdk_deserialize", params=(100,))
+def bench_sdk_deserialize(pages, context):
+    """Service JSON to SDK objects, the step before flattening inside poller.result()"""
+    _, build = _sdk_analyze_result(pages)
+    return {"run": build, "repeat": 3}
+
+
+@case("verify_token")
+def bench_verify_token(_, context):
+    """Per-request JWT decode and user lookup"""
+    from src.auth.authentication import auth_system
+    token = auth_system.create_access_token({"sub": "admin"})
+    return {"run": lambda: auth_system.verify_token(token)}
+
+
+@case("generate_sas_url")
+def bench_generate_sas_url(_, context):
+    """Signing a read SAS for one blob"""
+    from src.data_ingestion.shards import ShardMap, StorageShard
+    from src.data_ingestion.storage_client import AzureStorageClient
+
+    # SAS signing is purely local: build the client without the container
+    # round-trip done by __init__ so this case runs without storage
+    storage_client = AzureStorageClient.__new__(AzureStorageClient)
+    storage_client.shards = ShardMap([
+        StorageShard("benchmark-suite", context.connection_string, "benchmark-suite")
+    ])
+    return {"run": lambda: storage_client.generate_sas_url("reports/inspection-2024.pdf")}
+
+
+@case("list_blobs", params=(10000,), requires=("storage",))
+def bench_list_blobs(count, context):
+    """Full container listing, as /documents/list and the dashboard do"""
+    storage_client = context.storage(f"benchmark-list-{count}")
+    existing = {blob.name for blob in storage_client.container_client.list_blobs()}
+    missing = [f"doc-{i:06d}.pdf" for i in range(count) if f"doc-{i:06d}.pdf" not in existing]
+    if missing:
+        print(f"   📦 Creating {len(missing)} blobs for list_blobs[{count}] (one-time setup)")
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            list(executor.map(
+                lambda name: storage_client.container_client.upload_blob(name, b"%PDF-1.4", overwrite=True),
+                missing
+            ))
+    return {"run": storage_client.list_blobs, "number": 1, "repeat": 3}
+
+
+@case("upload", params=("1MB", "16MB", "64MB"), requires=("storage",))
+def bench_upload_throughput(size, context):
+    """Blob upload with the automatic tuning from get_upload_tuning"""
+    size_bytes = int(size[:-2]) * MB
+    path = os.path.join(context.temp_dir, f"upload-{size}.bin")
+    with open(path, "wb") as f:
+        for _ in range(size_bytes // MB):
+            f.write(os.urandom(MB))
+    storage_client = context.storage()
+    return {
+        "run": lambda: storage_client.upload_file(path, f"bench/upload-{size}.bin"),
+        "number": 1,
+        "repeat": 3,
+        "bytes": size_bytes,
+        "teardown": lambda: os.remove(path),
+    }
+
+
+@case("end_to_end", params=(1, 12), requires=("storage",))
+def bench_end_to_end(pages, context):
+    """Upload, analysis through the fake service, indexing and event recording"""
+    from reportlab.pdfgen import canvas
+    from src.data_processing.document_processor import DocumentProcessor
+    from src.data_processing.pipeline import analyze_blob
+
+    path = os.path.join(context.temp_dir, f"report-{pages}p.pdf")
+    pdf = canvas.Canvas(path)
+    for page in range(pages):
+        pdf.drawString(72, 720, f"Inspection report page {page + 1}")
+        pdf.showPage()
+    pdf.save()
+
+    settings.AZURE_FORMRECOGNIZER_ENDPOINT = context.fake_document_intelligence().endpoint
+    settings.AZURE_FORMRECOGNIZER_KEY = "benchmark"
+    doc_processor = DocumentProcessor()
+    storage_client = context.storage()
+    blob_name = f"bench/report-{pages}p.pdf"
+
+    def run():
+        storage_client.upload_file(path, blob_name)
+        analyze_blob(storage_client, doc_processor, blob_name, user="benchmark")
+
+    return {"run": run, "number": 1, "repeat": 5, "teardown": lambda: os.remove(path)}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def measure(spec, repeat=None):
+    """
+    Time one prepared case
+
+    Returns:
+        dict: Per-call seconds (median, min, max, mean) and sampling details
+    """
+    run = spec["run"]
+    run()  # warm-up: imports, connections, caches
+    number = spec.get("number")
+    if number is None:
+        number, _ = timeit.Timer(run).autorange()
+    repeat = repeat or spec.get("repeat", 7)
+    samples = [t / number for t in timeit.Timer(run).repeat(repeat=repeat, number=number)]
+    result = {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "mean_s": statistics.fmean(samples),
+        "number": number,
+        "repeat": repeat,
+    }
+    if spec.get("bytes"):
+        result["mb_per_s"] = round(spec["bytes"] / MB / result["median_s"], 2)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCH_DIR, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.2f} s "
+
+
+def run_suite(only=None, repeat=None, connection_string=AZURITE_CONNECTION_STRING):
+    context = Context(connection_string)
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": {},
+        "skipped": {},
+    }
+    selected = [c for c in CASES if not only or any(c["name"].startswith(prefix) for prefix in only)]
+
+    print(f"{'case':<28} {'median':>12} {'min':>12} {'calls':>8}")
+    for benchmark in selected:
+        reason = next((r for r in map(context.check, benchmark["requires"]) if r), None)
+        if reason:
+            report["skipped"][benchmark["name"]] = reason
+            print(f"{benchmark['name']:<28} ⏭️  skipped: {reason}")
+            continue
+        spec = {}
+        try:
+            spec = benchmark["func"](benchmark["param"], context)
+            result = measure(spec, repeat)
+        except Exception as e:
+            report["skipped"][benchmark["name"]] = f"error: {e}"
+            print(f"{benchmark['name']:<28} ❌ {e}")
+            continue
+        finally:
+            if spec.get("teardown"):
+                spec["teardown"]()
+        report["results"][benchmark["name"]] = result
+        extra = f"  {result['mb_per_s']} MB/s" if "mb_per_s" in result else ""
+        print(f"{benchmark['name']:<28} {_format_seconds(result['median_s']):>12} "
+              f"{_format_seconds(result['min_s']):>12} {result['number'] * result['repeat']:>8}{extra}")
+    return report
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare median times case by case
+
+    A case counts as a regression when its median is more than ``threshold``
+    percent slower and its fastest sample is still slower than the
+    baseline's slowest, so scheduler noise on tiny cases is not flagged.
+
+    Returns:
+        list: Names of the cases slower than the baseline by more than threshold percent
+    """
+    regressions = []
+    print(f"{'case':<28} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if not before or not after:
+            where = "baseline" if not before else "current run"
+            print(f"{name:<28} ➖ not in {where}")
+            continue
+        change = (after["median_s"] / before["median_s"] - 1) * 100
+        if change > threshold and after["min_s"] > before["max_s"]:
+            marker = "❌"
+            regressions.append(name)
+        elif change > threshold:
+            marker = "⚠️ noisy"  # slower median, but the sample ranges overlap
+        elif change < -threshold:
+            marker = "🚀"
+        else:
+            marker = "✅"
+        print(f"{name:<28} {_format_seconds(before['median_s']):>12} {_format_seconds(after['median_s']):>12} "
+              f"{change:>+8.1f}% {marker}")
+    return regressions
+
+
+def _write(report, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run benchmarks and compare them against a baseline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and store the results")
+    run_parser.add_argument("--only", nargs="+", help="Run only cases whose name starts with one of these")
+    run_parser.add_argument("--repeat", type=int, help="Samples per case (overrides each case's default)")
+    run_parser.add_argument("--output", help="Also write the results to this file")
+    run_parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                            help=f"Store the results as a baseline (default {os.path.relpath(DEFAULT_BASELINE)})")
+    run_parser.add_argument("--connection-string",
+                            default=os.getenv("BENCH_STORAGE_CONNECTION_STRING", AZURITE_CONNECTION_STRING))
+
+    compare_parser = commands.add_parser("compare", help="Flag cases slower than the baseline")
+    compare_parser.add_argument("baseline", nargs="?", default=DEFAULT_BASELINE)
+    compare_parser.add_argument("current", nargs="?", default=os.path.join(RESULTS_DIR, "latest.json"))
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Allowed slowdown in percent before a case counts as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args.only, args.repeat, args.connection_string)
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        for path in filter(None, [os.path.join(RESULTS_DIR, "latest.json"),
+                                  os.path.join(RESULTS_DIR, f"{stamp}.json"),
+                                  args.output, args.save_baseline]):
+            _write(report, path)
+        print(f"💾 Results written to {os.path.relpath(os.path.join(RESULTS_DIR, 'latest.json'))}")
+        if args.save_baseline:
+            print(f"📌 Baseline saved to {os.path.relpath(args.save_baseline)}")
+        return 0
+
+    for path in (args.baseline, args.current):
+        if not os.path.exists(path):
+            print(f"❌ {path} not found - run 'python benchmarks/suite.py run' first")
+            return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) above {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    print(f"✅ No regressions above {args.threshold}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,11 +12,104 @@ class Settings:
     AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
     AZURE_FORMRECOGNIZER_ENDPOINT = os.getenv("AZURE_FORMRECOGNIZER_ENDPOINT")
     AZURE_FORMRECOGNIZER_KEY = os.getenv("AZURE_FORMRECOGNIZER_KEY")
+    # More Document Intelligence resources to spread analyses over, as comma-separated
+    # "endpoint=key" pairs; an endpoint failing DI_EJECT_AFTER_FAILURES times in a row
+    # (or still throttled after retries) leaves the rotation for DI_EJECT_SECONDS
+    AZURE_FORMRECOGNIZER_ENDPOINTS = os.getenv("AZURE_FORMRECOGNIZER_ENDPOINTS", "")
+    DI_EJECT_AFTER_FAILURES = int(os.getenv("DI_EJECT_AFTER_FAILURES", "3"))
+    DI_EJECT_SECONDS = int(os.getenv("DI_EJECT_SECONDS", "30"))
     
     # Application settings
     API_KEY = os.getenv("API_KEY", "dev-key-change-in-production")
     STORAGE_CONTAINER = "technical-reports"
+    # Hash-shard blobs over several containers to spread request load: comma-separated
+    # "container" entries, or "container@ENV_VAR" for a container in the storage account
+    # whose connection string is in ENV_VAR. Empty = STORAGE_CONTAINER only. Run
+    # scripts/rebalance_shards.py when the list changes
+    STORAGE_SHARDS = os.getenv("STORAGE_SHARDS", "")
+    STORAGE_LIST_CONCURRENCY = int(os.getenv("STORAGE_LIST_CONCURRENCY", "8"))
+    # Each user's documents are stored under <USER_BLOB_PREFIX><username>/ so listings
+    # only scan that user's namespace
+    USER_BLOB_PREFIX = os.getenv("USER_BLOB_PREFIX", "users/")
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    
+    # Local state (indexes, queues, counters) lives under this directory
+    DATA_DIR = os.getenv("SECUREDOC_DATA_DIR", "data")
+    
+    # Direct-to-storage uploads: lifetime of the write SAS and largest accepted file
+    UPLOAD_SAS_EXPIRY_MINUTES = int(os.getenv("UPLOAD_SAS_EXPIRY_MINUTES", "15"))
+    DIRECT_UPLOAD_MAX_MB = int(os.getenv("DIRECT_UPLOAD_MAX_MB", "2048"))
+    
+    # Resumable uploads: default and largest chunk a client may send
+    UPLOAD_CHUNK_SIZE_MB = int(os.getenv("UPLOAD_CHUNK_SIZE_MB", "8"))
+    UPLOAD_MAX_CHUNK_SIZE_MB = 100
+    
+    # Near-duplicate detection over extracted content (MinHash similarity threshold)
+    NEAR_DUPLICATE_DETECTION = os.getenv("NEAR_DUPLICATE_DETECTION", "true").lower() == "true"
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+    
+    # Dashboard: how long one storage listing is reused across reruns and viewers
+    DASHBOARD_METRICS_TTL_SECONDS = int(os.getenv("DASHBOARD_METRICS_TTL_SECONDS", "60"))
+    # User whose namespace dashboard uploads are stored in (and who they are recorded for)
+    DASHBOARD_USER = os.getenv("DASHBOARD_USER", "dashboard")
+    
+    # Store uploads under their SHA-256 and skip uploading content seen before
+    CONTENT_ADDRESSED_UPLOADS = os.getenv("CONTENT_ADDRESSED_UPLOADS", "false").lower() == "true"
+    
+    # Upload tuning - leave unset to pick values automatically from the file size
+    UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "0"))
+    UPLOAD_BLOCK_SIZE_MB = int(os.getenv("UPLOAD_BLOCK_SIZE_MB", "0"))
+    UPLOAD_SINGLE_PUT_MB = int(os.getenv("UPLOAD_SINGLE_PUT_MB", "0"))
+
+    # Background analysis jobs - "sqlite" for one node, "azure" (Storage Queue) for many
+    JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "sqlite")
+    JOB_QUEUE_NAME = os.getenv("JOB_QUEUE_NAME", "analysis-jobs")
+    JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    # Cross-node work claims: leased marker blobs, one per document being analyzed
+    CLAIMS_CONTAINER = os.getenv("CLAIMS_CONTAINER", "work-claims")
+    CLAIM_LEASE_SECONDS = int(os.getenv("CLAIM_LEASE_SECONDS", "60"))
+
+    # Analysis scheduling: concurrent Document Intelligence calls per process, how long
+    # lower-priority work waits before moving up a class, and per-user fair-share weights
+    ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "8"))
+    ANALYSIS_AGING_SECONDS = float(os.getenv("ANALYSIS_AGING_SECONDS", "30"))
+    ANALYSIS_USER_WEIGHTS = os.getenv("ANALYSIS_USER_WEIGHTS", "")  # e.g. "admin=2,bulk-ingest=0.5"
+    ANALYSIS_BYTES_PER_PAGE = int(os.getenv("ANALYSIS_BYTES_PER_PAGE", "100000"))
+    # Cluster-wide cap on concurrent background/bulk analyses over all API, worker and bulk
+    # ingest processes (leases in CLAIMS_CONTAINER), so backfills leave Document Intelligence
+    # capacity for interactive requests; "" removes the cap
+    ANALYSIS_SHARED_SLOTS = os.getenv("ANALYSIS_SHARED_SLOTS", "background=8,bulk=4")
+
+    # Per-user API limits (0 disables): request rate with a burst allowance, and
+    # Document Intelligence pages per UTC day; page usage is saved every few seconds
+    RATE_LIMIT_REQUESTS_PER_MINUTE = int(os.getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "600"))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "100"))
+    DAILY_PAGE_QUOTA = int(os.getenv("DAILY_PAGE_QUOTA", "5000"))
+    RATE_LIMIT_PERSIST_SECONDS = int(os.getenv("RATE_LIMIT_PERSIST_SECONDS", "10"))
+
+    # Admission control (0 disables a limit): requests over a limit get an immediate 503.
+    # Queued analyses are those waiting for one of the ANALYSIS_CONCURRENCY slots
+    ADMISSION_MAX_UPLOADS = int(os.getenv("ADMISSION_MAX_UPLOADS", "32"))
+    ADMISSION_MAX_BUFFERED_MB = int(os.getenv("ADMISSION_MAX_BUFFERED_MB", "1024"))
+    ADMISSION_MAX_QUEUED_ANALYSES = int(os.getenv("ADMISSION_MAX_QUEUED_ANALYSES", "32"))
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+    # Shared HTTP transport of all Azure SDK clients in a process: host pools kept, connections
+    # per host (cover upload concurrency plus ANALYSIS_CONCURRENCY), TCP keep-alive idle seconds
+    # (0 = off), timeouts, and connections opened per endpoint at startup
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "64"))
+    HTTP_KEEPALIVE_SECONDS = int(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+    HTTP_CONNECTION_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECTION_TIMEOUT_SECONDS", "20"))
+    HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "60"))
+    HTTP_PREWARM_CONNECTIONS = int(os.getenv("HTTP_PREWARM_CONNECTIONS", "4"))
+
+    # Client deadlines: X-Request-Timeout (seconds) bounds storage calls, queueing and
+    # polling of a request's analysis; values above the cap are lowered to it (0 = no cap)
+    REQUEST_TIMEOUT_HEADER = os.getenv("REQUEST_TIMEOUT_HEADER", "X-Request-Timeout")
+    REQUEST_TIMEOUT_MAX_SECONDS = float(os.getenv("REQUEST_TIMEOUT_MAX_SECONDS", "300"))
 
 # Create a global settings instance
 settings = Settings()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion: upload and analyze a whole directory tree (or glob) in parallel
+
+Uploads and analyses run in two separate worker pools so the stages overlap:
+a file is handed to the analysis pool as soon as its upload finishes. Every
+completed step is appended to a JSONL manifest, so an interrupted run picks
+up where it stopped when started again with the same manifest.
+
+Usage:
+    python scripts/bulk_ingest.py reports/ --pattern "*.pdf"
+    python scripts/bulk_ingest.py "scans/**/*.pdf" --upload-workers 16 --analyze-workers 4
+    python scripts/bulk_ingest.py reports/ --owner alice   # into alice's namespace
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import fnmatch
+import glob
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config.settings import settings
+from src.data_ingestion.storage_client import AzureStorageClient, user_prefix
+from src.data_ingestion.work_claims import claim
+from src.data_processing.document_processor import DocumentProcessor
+from src.data_processing.pipeline import analyze_blob
+
+# Keep the per-file SDK logging out of the live progress line
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("bulk-ingest")
+
+
+def _glob_base(pattern):
+    """Leading directories of a glob pattern that contain no wildcards"""
+    if not glob.has_magic(pattern):
+        return os.path.dirname(pattern) or "."
+    parts = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    base = os.sep.join(parts)
+    if not base:
+        return os.sep if pattern.startswith(os.sep) else "."
+    return base
+
+
+def collect_files(sources, pattern):
+    """
+    Expand directories and glob patterns into (local path, blob name) pairs
+
+    Blob names keep the path relative to the directory they were found in
+    (for a glob, the part of the pattern before the first wildcard), so the
+    same tree always maps to the same blob names between runs.
+
+    Raises:
+        ValueError: If different files would be stored under the same blob name
+    """
+    files = {}
+    for source in sources:
+        if os.path.isdir(source):
+            base, paths = source, (os.path.join(root, name)
+                                   for root, _, names in os.walk(source)
+                                   for name in names if fnmatch.fnmatch(name, pattern))
+        else:
+            base, paths = _glob_base(source), (path for path in glob.glob(source, recursive=True)
+                                               if os.path.isfile(path))
+        for path in paths:
+            files[path] = os.path.relpath(path, base).replace(os.sep, "/")
+
+    paths_by_name = {}
+    for path, name in files.items():
+        paths_by_name.setdefault(name, []).append(path)
+    collisions = {name: paths for name, paths in paths_by_name.items() if len(paths) > 1}
+    if collisions:
+        examples = "; ".join(f"{name} <- {', '.join(sorted(paths))}"
+                             for name, paths in sorted(collisions.items())[:5])
+        raise ValueError(f"{len(collisions)} blob names would be shared by several files: {examples}")
+    return sorted(files.items())
+
+
+class Manifest:
+    """Append-only JSONL record of completed upload and analysis steps"""
+
+    def __init__(self, path):
+        self.path = path
+        self.uploaded = set()
+        self.analyzed = set()
+        self.content_blobs = {}
+        self.analyzed_content = set()
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write leaves a truncated last line
+                    continue
+                self._apply(entry)
+
+    def record(self, blob_name, status, **details):
+        entry = {"blob_name": blob_name, "status": status,
+                 "timestamp": datetime.utcnow().isoformat(), **details}
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            self._apply(entry)
+
+    def _apply(self, entry):
+        blob_name = entry["blob_name"]
+        content_blob = entry.get("content_blob", blob_name)
+        if entry.get("status") == "uploaded":
+            self.uploaded.add(blob_name)
+            self.content_blobs[blob_name] = content_blob
+        elif entry.get("status") == "analyzed":
+            self.uploaded.add(blob_name)
+            self.analyzed.add(blob_name)
+            self.analyzed_content.add(content_blob)
+
+    def close(self):
+        self._file.close()
+
+
+class Progress:
+    """Thread-safe counters with a live one-line progress report"""
+
+    def __init__(self, total_files, total_bytes):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.uploaded = 0
+        self.analyzed = 0
+        self.failed = 0
+        self.claimed = 0
+        self.bytes_uploaded = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._report_loop, daemon=True)
+
+    def add(self, uploaded=0, analyzed=0, failed=0, claimed=0, nbytes=0):
+        with self._lock:
+            self.uploaded += uploaded
+            self.analyzed += analyzed
+            self.failed += failed
+            self.claimed += claimed
+            self.bytes_uploaded += nbytes
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        done = self.analyzed + self.failed + self.claimed
+        rate = done / elapsed
+        remaining = self.total_files - done
+        eta = f"{remaining / rate:,.0f}s" if rate > 0 else "--"
+        return (f"⏳ uploaded {self.uploaded}/{self.total_files} | "
+                f"analyzed {self.analyzed}/{self.total_files} | failed {self.failed} | "
+                f"other node {self.claimed} | "
+                f"{rate:.1f} files/s | {self.bytes_uploaded / elapsed / (1024 * 1024):.1f} MB/s | "
+                f"ETA {eta}")
+
+    def _report_loop(self):
+        while not self._stop.wait(1.0):
+            print("\r" + self.line(), end="", flush=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        print("\r" + self.line(), flush=True)
+
+
+def run(files, manifest, upload_workers, analyze_workers, analyze=True, content_addressed=False, owner=None):
+    storage_client = AzureStorageClient()
+    doc_processor = DocumentProcessor() if analyze else None
+    # Blob names (and so manifest entries) include the owner's namespace, so
+    # the same tree ingested for another owner is not taken as done
+    prefix = user_prefix(owner) if owner else ""
+    files = [(path, prefix + name) for path, name in files]
+
+    pending = [(path, blob_name) for path, blob_name in files
+               if blob_name not in (manifest.analyzed if analyze else manifest.uploaded)]
+    skipped = len(files) - len(pending)
+    if skipped:
+        print(f"↩️  Resuming: {skipped} files already completed according to {manifest.path}")
+
+    progress = Progress(len(pending), sum(os.path.getsize(path) for path, _ in pending))
+    upload_pool = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="upload")
+    analyze_pool = ThreadPoolExecutor(max_workers=analyze_workers, thread_name_prefix="analyze")
+
+    # One analysis per distinct content blob; later files with the same content wait for it
+    content_analyses = {}
+    content_lock = threading.Lock()
+    # Content blobs another node held a claim on; they are retried on the next run
+    claimed_elsewhere = set()
+
+    def record_duplicate(blob_name, content_blob):
+        if content_blob in manifest.analyzed_content:
+            manifest.record(blob_name, "analyzed", content_blob=content_blob, duplicate=True)
+            progress.add(analyzed=1)
+        elif content_blob in claimed_elsewhere:
+            manifest.record(blob_name, "claimed", content_blob=content_blob)
+            progress.add(claimed=1)
+        else:
+            manifest.record(blob_name, "failed", stage="analyze", error="shared analysis failed")
+            progress.add(failed=1)
+
+    def analyze_file(blob_name, content_blob, size):
+        # With content-addressed uploads, identical files share one analysis
+        if content_blob in manifest.analyzed_content:
+            manifest.record(blob_name, "analyzed", content_blob=content_blob, duplicate=True)
+            progress.add(analyzed=1)
+            return
+        started = time.monotonic()
+        try:
+            # Several nodes may backfill the same container: only the claim holder analyzes
+            work_claim = claim(storage_client, content_blob)
+            if work_claim is None:
+                claimed_elsewhere.add(content_blob)
+                manifest.record(blob_name, "claimed", content_blob=content_blob)
+                progress.add(claimed=1)
+                return
+            with work_claim:
+                result = analyze_blob(storage_client, doc_processor, content_blob, user="bulk-ingest",
+                                      size_bytes=size, claim=work_claim, priority="bulk")
+            manifest.record(blob_name, "analyzed", content_blob=content_blob,
+                            pages=len(result["pages"]), tables=len(result["tables"]),
+                            seconds=round(time.monotonic() - started, 3))
+            progress.add(analyzed=1)
+        except Exception as e:
+            manifest.record(blob_name, "failed", stage="analyze", error=str(e))
+            progress.add(failed=1)
+
+    def upload_file(path, blob_name):
+        if blob_name not in manifest.uploaded:
+            started = time.monotonic()
+            try:
+                if content_addressed:
+                    upload = storage_client.upload_content_addressed(path, blob_name[len(prefix):],
+                                                                     prefix=prefix)
+                    content_blob, deduplicated = upload["blob_name"], upload["deduplicated"]
+                else:
+                    storage_client.upload_file(path, blob_name)
+                    content_blob, deduplicated = blob_name, False
+            except Exception as e:
+                manifest.record(blob_name, "failed", stage="upload", path=path, error=str(e))
+                progress.add(failed=1)
+                return
+            size = os.path.getsize(path)
+            manifest.record(blob_name, "uploaded", path=path, size=size, content_blob=content_blob,
+                            seconds=round(time.monotonic() - started, 3))
+            progress.add(uploaded=1, nbytes=0 if deduplicated else size)
+        else:
+            content_blob = manifest.content_blobs.get(blob_name, blob_name)
+            progress.add(uploaded=1)
+
+        if analyze:
+            with content_lock:
+                shared = content_analyses.get(content_blob)
+                if shared is None:
+                    content_analyses[content_blob] = analyze_pool.submit(
+                        analyze_file, blob_name, content_blob, os.path.getsize(path))
+                    return
+            shared.add_done_callback(lambda _: record_duplicate(blob_name, content_blob))
+        else:
+            progress.add(analyzed=1)
+
+    progress.start()
+    try:
+        upload_futures = [upload_pool.submit(upload_file, path, blob_name)
+                          for path, blob_name in pending]
+        for future in upload_futures:
+            future.result()
+        upload_pool.shutdown(wait=True)
+        analyze_pool.shutdown(wait=True)
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted - completed files are in the manifest, re-run to resume")
+        upload_pool.shutdown(wait=False, cancel_futures=True)
+        analyze_pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        progress.stop()
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk upload and analyze documents")
+    parser.add_argument("sources", nargs="+", help="Directories or glob patterns (use quotes for **)")
+    parser.add_argument("--pattern", default="*", help="File name pattern inside directories (default: *)")
+    parser.add_argument("--manifest", default="bulk_ingest_manifest.jsonl", help="JSONL manifest used for resuming")
+    parser.add_argument("--upload-workers", type=int, default=8, help="Concurrent uploads (default: 8)")
+    parser.add_argument("--analyze-workers", type=int, default=4, help="Concurrent analyses (default: 4)")
+    parser.add_argument("--no-analyze", action="store_true", help="Only upload, skip Document Intelligence")
+    parser.add_argument("--content-addressed", action="store_true", default=settings.CONTENT_ADDRESSED_UPLOADS,
+                        help="Store blobs under their SHA-256 and skip content that is already stored")
+    parser.add_argument("--owner", help="Store the documents in this user's namespace, visible to them in the API")
+    args = parser.parse_args()
+
+    try:
+        files = collect_files(args.sources, args.pattern)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        return
+    if not files:
+        print("❌ No files matched")
+        return
+
+    print(f"📦 Bulk ingesting {len(files)} files "
+          f"({args.upload_workers} upload / {args.analyze_workers} analysis workers)")
+    manifest = Manifest(args.manifest)
+    try:
+        progress = run(files, manifest, args.upload_workers, args.analyze_workers,
+                       analyze=not args.no_analyze, content_addressed=args.content_addressed,
+                       owner=args.owner)
+    except KeyboardInterrupt:
+        return
+    finally:
+        manifest.close()
+
+    print(f"🎉 Done: {progress.analyzed} completed, {progress.failed} failed")
+    if progress.claimed:
+        print(f"   {progress.claimed} files were being analyzed by another node and were skipped")
+    if progress.failed:
+        print(f"   Failed files are listed in {args.manifest} and will be retried on the next run")
+
+
+if __name__ == "__main__":
+    main()
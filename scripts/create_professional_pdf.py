@@ -11,15 +11,14 @@ from reportlab.lib import colors
 from datetime import datetime
 import os
 
-def create_professional_technical_report():
-    """Create a professional technical report PDF"""
-    filename = "professional_technical_report.pdf"
+def report_styles():
+    """
+    Paragraph styles shared by the generated technical reports
     
-    doc = SimpleDocTemplate(filename, pagesize=A4)
+    Returns:
+        tuple: (sample stylesheet, title style, heading style)
+    """
     styles = getSampleStyleSheet()
-    story = []
-    
-    # Custom styles
     title_style = ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
@@ -36,6 +35,47 @@ def create_professional_technical_report():
         spaceAfter=12,
         textColor=colors.HexColor('#2d3748')
     )
+    return styles, title_style, heading_style
+
+def metadata_table(metadata):
+    """Two-column "label: value" table shown at the top of a report"""
+    table = Table(metadata, colWidths=[2*inch, 4*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f7fafc')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0'))
+    ]))
+    return table
+
+def results_table(rows, col_widths=None):
+    """Test results table with a dark header row and a highlighted status column"""
+    table = Table(rows, colWidths=col_widths or [1.5*inch, 1.8*inch, 1.2*inch, 1*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2d3748')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ffffff')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cbd5e0')),
+        ('BACKGROUND', (3, 1), (3, -1), colors.HexColor('#c6f6d5'))
+    ]))
+    return table
+
+def create_professional_technical_report():
+    """Create a professional technical report PDF"""
+    filename = "professional_technical_report.pdf"
+    
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    story = []
+    
+    styles, title_style, heading_style = report_styles()
     
     # Title
     title = Paragraph("TECHNICAL COMPLIANCE REPORT", title_style)
@@ -53,21 +93,7 @@ def create_professional_technical_report():
         ["Validity:", "24 months from issue date"]
     ]
     
-    # Create metadata table
-    metadata_table = Table(metadata, colWidths=[2*inch, 4*inch])
-    metadata_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f7fafc')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0'))
-    ]))
-    
-    story.append(metadata_table)
+    story.append(metadata_table(metadata))
     story.append(Spacer(1, 20))
     
     # Executive Summary
@@ -97,19 +123,7 @@ def create_professional_technical_report():
         ["Temperature Resistance", "-20°C to +50°C", "No degradation", "PASS"]
     ]
     
-    results_table = Table(test_results, colWidths=[1.5*inch, 1.8*inch, 1.2*inch, 1*inch])
-    results_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2d3748')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ffffff')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cbd5e0')),
-        ('BACKGROUND', (3, 1), (3, -1), colors.HexColor('#c6f6d5'))
-    ]))
-    
-    story.append(results_table)
+    story.append(results_table(test_results))
     story.append(Spacer(1, 20))
     
     # Additional Notes
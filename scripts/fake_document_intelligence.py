@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Azure Document Intelligence (Form Recognizer)
+
+Implements the two REST calls made by
+DocumentAnalysisClient.begin_analyze_document_from_url / begin_analyze_document:
+
+    POST /formrecognizer/documentModels/{model}:analyze     -> 202 + Operation-Location
+    GET  /formrecognizer/documentModels/{model}/analyzeResults/{id}
+
+so DocumentProcessor, the API and the scripts can run against it unchanged by
+pointing AZURE_FORMRECOGNIZER_ENDPOINT at it. Together with Azurite this gives
+performance tests with no network and no cost.
+
+Modes:
+    synthetic (default)  Fetch the document, count its pages and return a
+                         deterministic prebuilt-read result whose page, line
+                         and table counts scale with the document
+    --record DIR         Forward every analysis to a real resource and save
+                         the result under DIR, keyed by the document's SHA-256
+    --replay DIR         Serve results saved by --record (synthetic fallback
+                         for documents that were never recorded)
+
+Usage:
+    python scripts/fake_document_intelligence.py --port 5055 --latency-ms 800 --per-page-ms 150
+    AZURE_FORMRECOGNIZER_ENDPOINT=http://127.0.0.1:5055 AZURE_FORMRECOGNIZER_KEY=fake python scripts/process_document.py ...
+
+    python scripts/fake_document_intelligence.py --record recordings/ \\
+        --upstream-endpoint https://<resource>.cognitiveservices.azure.com --upstream-key <key>
+    python scripts/fake_document_intelligence.py --replay recordings/
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("fake-document-intelligence")
+
+ANALYZE_PATH = re.compile(r"^/formrecognizer/documentModels/(?P<model>[^/:]+):analyze$")
+RESULT_PATH = re.compile(r"^/formrecognizer/documentModels/(?P<model>[^/]+)/analyzeResults/(?P<result_id>[^/]+)$")
+PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+PDF_PAGE_COUNT = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b", re.S)
+
+MAX_PAGES = 2000  # prebuilt-read page limit
+PAGE_WIDTH, PAGE_HEIGHT = 8.5, 11.0
+BYTES_PER_PAGE_ESTIMATE = 60 * 1024  # for PDFs whose page objects sit in compressed streams
+
+VOCABULARY = (
+    "inspection report helmet safety valve pressure torque bolt steel concrete certificate "
+    "audit compliance standard load test weld fatigue crack coating thickness sample batch "
+    "calibration tolerance specification supplier result pass fail nominal measured limit "
+    "section clause annex reference equipment serial operator date approved reviewed"
+).split()
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def count_pages(data):
+    """
+    Page count of a document, as the service would bill it
+
+    PDFs are counted from their page objects (or the page tree's /Count when
+    the objects are compressed); any other format is a single page.
+    """
+    if not data.startswith(b"%PDF"):
+        return 1
+    pages = len(PDF_PAGE.findall(data))
+    if not pages:
+        counts = [int(a or b) for a, b in PDF_PAGE_COUNT.findall(data)]
+        pages = max(counts) if counts else max(1, len(data) // BYTES_PER_PAGE_ESTIMATE)
+    return min(pages, MAX_PAGES)
+
+
+def _polygon(x0, y0, x1, y1):
+    return [round(v, 4) for v in (x0, y0, x1, y0, x1, y1, x0, y1)]
+
+
+class _ContentBuilder:
+    """Accumulates result content and hands out the spans pointing into it"""
+
+    def __init__(self):
+        self.parts = []
+        self.offset = 0
+
+    def add(self, text):
+        span = {"offset": self.offset, "length": len(text)}
+        self.parts.append(text + "\n")
+        self.offset += len(text) + 1
+        return span
+
+    def text(self):
+        return "".join(self.parts)
+
+
+def synthetic_result(data, model_id="prebuilt-read", api_version="2023-07-31",
+                     lines_per_page=40, words_per_line=8, tables_per_page=0.3):
+    """
+    Deterministic prebuilt-read analyzeResult for a document
+
+    The same bytes always produce the same result. Pages follow the document,
+    lines and words scale with pages, and tables appear on roughly
+    ``tables_per_page`` of the pages (their cells are also page lines, as
+    with the real service).
+    """
+    rng = random.Random(hashlib.sha256(data).digest())
+    content = _ContentBuilder()
+    pages, tables = [], []
+    line_height = (PAGE_HEIGHT - 2) / (lines_per_page + 6)
+
+    for page_number in range(1, count_pages(data) + 1):
+        page_start = content.offset
+        lines, words = [], []
+        y = 1.0
+
+        def add_line(text, x0=1.0):
+            nonlocal y
+            span = content.add(text)
+            width = min(PAGE_WIDTH - 1 - x0, 0.09 * len(text))
+            lines.append({"content": text, "polygon": _polygon(x0, y, x0 + width, y + line_height * 0.8),
+                          "spans": [span]})
+            x, offset = x0, span["offset"]
+            for word in text.split(" "):
+                word_width = 0.09 * len(word)
+                words.append({"content": word, "polygon": _polygon(x, y, x + word_width, y + line_height * 0.8),
+                              "confidence": round(rng.uniform(0.9, 0.999), 3),
+                              "span": {"offset": offset, "length": len(word)}})
+                x += word_width + 0.09
+                offset += len(word) + 1
+            y += line_height
+            return span
+
+        for _ in range(lines_per_page):
+            add_line(" ".join(rng.choice(VOCABULARY) for _ in range(words_per_line)))
+
+        if rng.random() < tables_per_page:
+            row_count, column_count = rng.randint(3, 8), rng.randint(2, 5)
+            table_top, cells = y, []
+            for row in range(row_count):
+                for column in range(column_count):
+                    text = f"{rng.randint(1, 9999)}" if row and column else rng.choice(VOCABULARY)
+                    x0 = 1.0 + column * (PAGE_WIDTH - 2) / column_count
+                    row_y = y
+                    span = add_line(text, x0)
+                    y = row_y if column < column_count - 1 else y
+                    cell = {"rowIndex": row, "columnIndex": column, "content": text,
+                            "boundingRegions": [{"pageNumber": page_number,
+                                                 "polygon": _polygon(x0, row_y, x0 + 1, row_y + line_height)}],
+                            "spans": [span]}
+                    if row == 0:
+                        cell["kind"] = "columnHeader"
+                    cells.append(cell)
+            tables.append({"rowCount": row_count, "columnCount": column_count, "cells": cells,
+                           "boundingRegions": [{"pageNumber": page_number,
+                                                "polygon": _polygon(1, table_top, PAGE_WIDTH - 1, y)}],
+                           "spans": [{"offset": cells[0]["spans"][0]["offset"],
+                                      "length": content.offset - cells[0]["spans"][0]["offset"]}]})
+
+        pages.append({"pageNumber": page_number, "angle": 0, "width": PAGE_WIDTH, "height": PAGE_HEIGHT,
+                      "unit": "inch", "words": words, "lines": lines,
+                      "spans": [{"offset": page_start, "length": content.offset - page_start}]})
+
+    text = content.text()
+    return {
+        "apiVersion": api_version,
+        "modelId": model_id,
+        "stringIndexType": "utf16CodeUnit",
+        "content": text,
+        "pages": pages,
+        "tables": tables,
+        "paragraphs": [],
+        "styles": [],
+    }
+
+
+class FakeDocumentIntelligenceServer(ThreadingHTTPServer):
+    """
+    HTTP server holding the fake's configuration and its operations
+
+    Every analysis becomes an operation that reports "running" until its
+    simulated processing time has elapsed:
+    latency_ms + per_page_ms * pages, scaled by a random +/- jitter.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=500, per_page_ms=100, jitter=0.2, error_rate=0.0,
+                 throttle_rate=0.0, max_running=0, throttle_retry_after=1.0, poll_interval=0.5,
+                 key=None, record_dir=None, replay_dir=None, upstream_endpoint=None, upstream_key=None,
+                 lines_per_page=40, tables_per_page=0.3, seed=None, result_ttl=3600, verbose=False):
+        super().__init__(address, FakeDocumentIntelligenceHandler)
+        self.latency_ms = latency_ms
+        self.per_page_ms = per_page_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_running = max_running
+        self.throttle_retry_after = throttle_retry_after
+        self.poll_interval = poll_interval
+        self.key = key
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.upstream_endpoint = upstream_endpoint.rstrip("/") if upstream_endpoint else None
+        self.upstream_key = upstream_key
+        self.lines_per_page = lines_per_page
+        self.tables_per_page = tables_per_page
+        self.result_ttl = result_ttl
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.operations = {}
+        self.lock = threading.Lock()
+        self.stats = {"analyze_requests": 0, "throttled": 0, "failed": 0, "succeeded": 0,
+                      "pages": 0, "replayed": 0, "recorded": 0, "max_running": 0}
+        for directory in (record_dir, replay_dir):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def running(self):
+        now = time.time()
+        return sum(1 for op in self.operations.values() if op["status"] == "running" and op["ready_at"] > now)
+
+    def processing_seconds(self, pages):
+        base = (self.latency_ms + self.per_page_ms * pages) / 1000.0
+        return max(0.0, base * self.rng.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def admit(self):
+        """
+        Decide whether a new analysis is throttled, mirroring the 429s a
+        resource returns above its transactions-per-second limit
+
+        Returns:
+            bool: True when the request may proceed
+        """
+        with self.lock:
+            self.stats["analyze_requests"] += 1
+            running = self.running()
+            if (self.max_running and running >= self.max_running) or self.rng.random() < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return False
+            return True
+
+    def start_operation(self, model_id, api_version, source):
+        """Register an analysis and start producing its result in the background"""
+        result_id = str(uuid.uuid4())
+        operation = {"status": "running", "created": _now(), "updated": _now(),
+                     "model_id": model_id, "api_version": api_version,
+                     "ready_at": float("inf"), "created_at": time.time()}
+        with self.lock:
+            self._prune()
+            self.operations[result_id] = operation
+        threading.Thread(target=self._produce, args=(operation, source), daemon=True).start()
+        return result_id
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for result_id in [r for r, op in self.operations.items() if op["created_at"] < cutoff]:
+            del self.operations[result_id]
+
+    def _fetch(self, source):
+        if "urlSource" in source:
+            response = requests.get(source["urlSource"], timeout=60)
+            response.raise_for_status()
+            return response.content
+        if "base64Source" in source:
+            return base64.b64decode(source["base64Source"])
+        return source["bytes"]
+
+    def _produce(self, operation, source):
+        started = time.time()
+        try:
+            data = self._fetch(source)
+        except Exception as e:
+            self._finish(operation, started, error={
+                "code": "InvalidRequest", "message": "Invalid request.",
+                "innererror": {"code": "InvalidContent", "message": f"Could not download the file: {e}"}})
+            return
+
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            if self.record_dir:
+                analyze_result = self._record(operation, source, data, digest)
+                started = time.time()  # upstream already took its real time
+                self._finish(operation, started, analyze_result=analyze_result, simulate=False)
+                return
+            analyze_result = self._replayed(digest)
+            if analyze_result is None:
+                analyze_result = synthetic_result(data, operation["model_id"], operation["api_version"],
+                                                  self.lines_per_page, tables_per_page=self.tables_per_page)
+        except Exception as e:
+            logger.error(f"❌ Producing result failed: {str(e)}")
+            self._finish(operation, started, error={"code": "InternalServerError", "message": str(e)})
+            return
+
+        if self.rng.random() < self.error_rate:
+            self._finish(operation, started, error={
+                "code": "InternalServerError", "message": "An unexpected error occurred."})
+        else:
+            self._finish(operation, started, analyze_result=analyze_result)
+
+    def _replayed(self, digest):
+        if not self.replay_dir:
+            return None
+        path = os.path.join(self.replay_dir, f"{digest}.json")
+        if not os.path.exists(path):
+            logger.warning(f"⚠️ No recording for {digest[:12]}, serving a synthetic result")
+            return None
+        with open(path) as f:
+            with self.lock:
+                self.stats["replayed"] += 1
+            return json.load(f)["analyzeResult"]
+
+    def _record(self, operation, source, data, digest):
+        """Run the analysis on the real resource and save its result"""
+        if not self.upstream_endpoint or not self.upstream_key:
+            raise ValueError("--record needs --upstream-endpoint and --upstream-key")
+        headers = {"Ocp-Apim-Subscription-Key": self.upstream_key}
+        response = requests.post(
+            f"{self.upstream_endpoint}/formrecognizer/documentModels/{operation['model_id']}:analyze",
+            params={"api-version": operation["api_version"]}, headers=headers,
+            json={"base64Source": base64.b64encode(data).decode()}, timeout=120)
+        response.raise_for_status()
+        location = response.headers["Operation-Location"]
+        while True:
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+            response = requests.get(location, headers=headers, timeout=60)
+            response.raise_for_status()
+            body = response.json()
+            if body["status"] == "succeeded":
+                break
+            if body["status"] == "failed":
+                raise RuntimeError(body.get("error", {}).get("message", "upstream analysis failed"))
+        with open(os.path.join(self.record_dir, f"{digest}.json"), "w") as f:
+            json.dump(body, f)
+        with self.lock:
+            self.stats["recorded"] += 1
+        logger.info(f"💾 Recorded {len(body['analyzeResult'].get('pages', []))} pages for {digest[:12]}")
+        return body["analyzeResult"]
+
+    def _finish(self, operation, started, analyze_result=None, error=None, simulate=True):
+        pages = len(analyze_result.get("pages", [])) if analyze_result else 1
+        ready_at = started + (self.processing_seconds(pages) if simulate else 0.0)
+        with self.lock:
+            operation["analyze_result"] = analyze_result
+            operation["error"] = error
+            operation["final_status"] = "failed" if error else "succeeded"
+            operation["ready_at"] = ready_at
+            self.stats["failed" if error else "succeeded"] += 1
+            self.stats["pages"] += pages if analyze_result else 0
+            self.stats["max_running"] = max(self.stats["max_running"], self.running())
+
+    def poll(self, result_id):
+        """Current body of an operation, or None if it is unknown"""
+        with self.lock:
+            operation = self.operations.get(result_id)
+            if operation is None:
+                return None
+            if operation["status"] == "running" and time.time() >= operation["ready_at"]:
+                operation["status"] = operation["final_status"]
+                operation["updated"] = _now()
+            body = {"status": operation["status"], "createdDateTime": operation["created"],
+                    "lastUpdatedDateTime": operation["updated"]}
+            if operation["status"] == "succeeded":
+                body["analyzeResult"] = operation["analyze_result"]
+            elif operation["status"] == "failed":
+                body["error"] = operation["error"]
+            return body
+
+
+class FakeDocumentIntelligenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            logger.info(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("apim-request-id", str(uuid.uuid4()))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, code, message, headers=None):
+        self._send_json(status, {"error": {"code": code, "message": message}}, headers)
+
+    def _authorized(self):
+        if self.server.key and self.headers.get("Ocp-Apim-Subscription-Key") != self.server.key:
+            self._error(401, "401", "Access denied due to invalid subscription key or wrong API endpoint.")
+            return False
+        return True
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        match = ANALYZE_PATH.match(url.path)
+        body = self._read_body()
+        if not match:
+            self._error(404, "404", "Resource not found")
+            return
+        if not self._authorized():
+            return
+        if not self.server.admit():
+            retry_after = self.server.throttle_retry_after
+            self._error(429, "429", f"Rate limit exceeded. Please retry after {retry_after} seconds.",
+                        {"Retry-After": str(retry_after)})
+            return
+
+        api_version = parse_qs(url.query).get("api-version", ["2023-07-31"])[0]
+        if "json" in (self.headers.get("Content-Type") or ""):
+            try:
+                source = json.loads(body or b"{}")
+            except ValueError:
+                self._error(400, "InvalidRequest", "Invalid request body.")
+                return
+            if "urlSource" not in source and "base64Source" not in source:
+                self._error(400, "InvalidRequest", "Either urlSource or base64Source is required.")
+                return
+        else:
+            source = {"bytes": body}
+
+        result_id = self.server.start_operation(match.group("model"), api_version, source)
+        host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        location = (f"http://{host}/formrecognizer/documentModels/{match.group('model')}"
+                    f"/analyzeResults/{result_id}?api-version={api_version}")
+        self.send_response(202)
+        self.send_header("Operation-Location", location)
+        self.send_header("apim-request-id", result_id)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/fake/stats":
+            with self.server.lock:
+                stats = dict(self.server.stats, running=self.server.running())
+            self._send_json(200, stats)
+            return
+        match = RESULT_PATH.match(url.path)
+        if not match:
+            self._error(404, "404", "Resource not found")
+            return
+        if not self._authorized():
+            return
+        body = self.server.poll(match.group("result_id"))
+        if body is None:
+            self._error(404, "NotFound", "Resource not found.")
+            return
+        headers = {"Retry-After": str(self.server.poll_interval)} if body["status"] == "running" else {}
+        self._send_json(200, body, headers)
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """
+    Start the fake in a background thread (for benchmarks and load tests)
+
+    Returns:
+        FakeDocumentIntelligenceServer: Running server; use .endpoint and .shutdown()
+    """
+    server = FakeDocumentIntelligenceServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for Azure Document Intelligence")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--latency-ms", type=float, default=500, help="Fixed processing time per analysis")
+    parser.add_argument("--per-page-ms", type=float, default=100, help="Additional processing time per page")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Random +/- fraction applied to processing time")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of analyses that end in 'failed'")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of analyze calls answered with 429")
+    parser.add_argument("--max-running", type=int, default=0, help="Answer 429 above this many running analyses (0 = no limit)")
+    parser.add_argument("--throttle-retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Retry-After seconds sent while running")
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--tables-per-page", type=float, default=0.3, help="Share of pages that carry a table")
+    parser.add_argument("--key", help="Require this Ocp-Apim-Subscription-Key (any key is accepted by default)")
+    parser.add_argument("--seed", type=int, help="Seed for latency jitter, errors and throttling")
+    parser.add_argument("--record", metavar="DIR", help="Forward analyses upstream and save the results here")
+    parser.add_argument("--replay", metavar="DIR", help="Serve results previously saved with --record")
+    parser.add_argument("--upstream-endpoint", default=os.getenv("AZURE_FORMRECOGNIZER_ENDPOINT"))
+    parser.add_argument("--upstream-key", default=os.getenv("AZURE_FORMRECOGNIZER_KEY"))
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    if args.record and (not args.upstream_endpoint or not args.upstream_key):
+        parser.error("--record needs --upstream-endpoint and --upstream-key")
+
+    server = FakeDocumentIntelligenceServer(
+        (args.host, args.port), latency_ms=args.latency_ms, per_page_ms=args.per_page_ms, jitter=args.jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, max_running=args.max_running,
+        throttle_retry_after=args.throttle_retry_after, poll_interval=args.poll_interval, key=args.key,
+        record_dir=args.record, replay_dir=args.replay, upstream_endpoint=args.upstream_endpoint,
+        upstream_key=args.upstream_key, lines_per_page=args.lines_per_page,
+        tables_per_page=args.tables_per_page, seed=args.seed, verbose=args.verbose,
+    )
+    mode = "record" if args.record else "replay" if args.replay else "synthetic"
+    print(f"🤖 Fake Document Intelligence ({mode}) listening on {server.endpoint}")
+    print(f"   AZURE_FORMRECOGNIZER_ENDPOINT={server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
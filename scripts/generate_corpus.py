@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Generate a reproducible corpus of technical-report PDFs for benchmarks
+
+Documents are built from the same reportlab templates as
+create_professional_pdf.py, with controlled page counts, table density,
+image-only (scanned) pages and file sizes. Every document is derived from the
+corpus seed and its index only, so the same arguments always produce
+byte-identical files, whatever the number of workers.
+
+Usage:
+    python scripts/generate_corpus.py --count 1000 --output corpus/
+    python scripts/generate_corpus.py --count 200 --min-pages 50 --max-pages 500 --tables-per-page 1.5
+    python scripts/generate_corpus.py --count 20 --scanned-docs 0.5 --large-fraction 0.25 --large-size-mb 100 300
+
+A manifest.json next to the files lists every document's characteristics
+(pages, scanned pages, tables, size, SHA-256) for benchmark selection.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import reportlab
+from reportlab import rl_config
+from PIL import Image as PILImage, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+from create_professional_pdf import metadata_table, report_styles, results_table
+
+# Embed page images as binary streams: ASCII85 makes large scans 25% bigger
+# and dominates rendering time
+rl_config.useA85 = 0
+
+MB = 1024 * 1024
+SCAN_DPI = 150
+SCAN_FONT = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+# Noisy grayscale JPEG at quality 90 stores roughly this many bytes per pixel
+JPEG_BYTES_PER_PIXEL = 0.39
+# Largest padded scan (~15 MB); bigger targets are spread over more scanned pages
+MAX_SCAN_PIXELS = 40_000_000
+
+PRODUCTS = ["Industrial Safety Helmet Pro-X900", "Pressure Relief Valve PRV-220", "Fall Arrest Harness FA-12",
+            "Steel Anchor Bolt M24", "Hydraulic Hose Assembly HH-8", "Welding Gas Regulator WR-3",
+            "Scaffold Coupler SC-48", "Electrical Insulating Glove Class 2"]
+MANUFACTURERS = ["SafeTech Industries GmbH", "Nordwerk AG", "Alpine Components Ltd", "Rheinmetall Parts KG",
+                 "Baltic Engineering Oy", "Iberia Safety S.L."]
+INSPECTORS = ["Dr. Michael Weber", "Dr. Anna Schmidt", "Ing. Lukas Braun", "Dr. Sofia Rossi", "Ing. Jan Novak"]
+STANDARDS = ["EN 397:2012 + A1:2023", "EN ISO 4126-1:2013", "EN 361:2002", "EN 1993-1-8:2005",
+             "EN 853:2015", "EN ISO 2503:2009", "EN 74-1:2005", "EN 60903:2003"]
+SECTIONS = ["EXECUTIVE SUMMARY", "TEST METHOD", "TEST RESULTS SUMMARY", "MEASUREMENTS", "TECHNICAL NOTES",
+            "DEVIATIONS", "CALIBRATION RECORD", "CONCLUSION"]
+PARAMETERS = ["Impact Resistance", "Penetration Test", "Flammability", "Electrical Insulation",
+              "Chin Strap Strength", "Temperature Resistance", "Burst Pressure", "Set Pressure Tolerance",
+              "Tensile Strength", "Elongation at Break", "Coating Thickness", "Salt Spray Exposure",
+              "Dimensional Check", "Leak Test", "Fatigue Cycles", "Hardness (HV10)"]
+SENTENCE_PARTS = (
+    ["The specimen", "The test sample", "Each unit of the batch", "The assembly", "The reference item"],
+    ["was conditioned", "was examined", "was loaded", "was measured", "was exposed"],
+    ["in accordance with the applicable standard", "at the nominal operating temperature",
+     "after 24 hours of conditioning", "using calibrated equipment", "under the supervision of the inspector"],
+    ["and met all requirements.", "and no defects were observed.", "with results within tolerance.",
+     "and the deviation was recorded.", "as described in the annex."],
+)
+
+
+def document_seed(corpus_seed, index):
+    """Seed of one document, independent of worker scheduling"""
+    return int.from_bytes(hashlib.sha256(f"{corpus_seed}:{index}".encode()).digest()[:8], "little")
+
+
+def plan_document(index, args):
+    """
+    Decide a document's characteristics before rendering it
+
+    Returns:
+        dict: File name, seed, per-page kinds and table counts, and target size
+    """
+    seed = document_seed(args.seed, index)
+    rng = random.Random(seed)
+    # Log-uniform so small documents dominate but long ones still occur
+    pages = int(round(math.exp(rng.uniform(math.log(args.min_pages), math.log(args.max_pages + 0.49)))))
+    pages = min(max(pages, args.min_pages), args.max_pages)
+
+    scanned_doc = rng.random() < args.scanned_docs
+    page_kinds = ["scanned" if scanned_doc or rng.random() < args.scanned_pages else "text" for _ in range(pages)]
+    whole, fraction = divmod(args.tables_per_page, 1)
+    tables = [0 if kind == "scanned" else min(2, int(whole) + (rng.random() < fraction)) for kind in page_kinds]
+
+    target_size = None
+    if rng.random() < args.large_fraction:
+        low, high = args.large_size_mb
+        target_size = int(rng.uniform(low, high) * MB)
+        # Size is carried by page images: append scanned pages (annexes) until
+        # no single image has to exceed MAX_SCAN_PIXELS
+        needed = math.ceil(target_size / (MAX_SCAN_PIXELS * JPEG_BYTES_PER_PIXEL))
+        extra = max(0, needed - page_kinds.count("scanned"))
+        page_kinds += ["scanned"] * extra
+        tables += [0] * extra
+
+    kind = "scanned" if all(k == "scanned" for k in page_kinds) else \
+        "mixed" if "scanned" in page_kinds else "text"
+    return {
+        "file": f"report-{index:06d}.pdf",
+        "index": index,
+        "seed": seed,
+        "kind": kind,
+        "page_kinds": page_kinds,
+        "tables": tables,
+        "target_size": target_size,
+    }
+
+
+def _sentence(rng):
+    return " ".join(rng.choice(part) for part in SENTENCE_PARTS)
+
+
+def _report_metadata(rng):
+    issued = date(2020, 1, 1) + timedelta(days=rng.randrange(1800))
+    return [
+        ["Report ID:", f"TR-QA-{issued.year}-{rng.randrange(1, 9999):04d}"],
+        ["Document Type:", rng.choice(["Safety Compliance Certificate", "Type Examination Report",
+                                       "Inspection Report", "Test Report"])],
+        ["Product:", rng.choice(PRODUCTS)],
+        ["Manufacturer:", rng.choice(MANUFACTURERS)],
+        ["Test Date:", issued.isoformat()],
+        ["Inspector:", rng.choice(INSPECTORS)],
+        ["Standard:", rng.choice(STANDARDS)],
+    ]
+
+
+def _results_rows(rng, rows):
+    data = [["Test Parameter", "Standard Requirement", "Test Result", "Status"]]
+    for parameter in rng.sample(PARAMETERS, rows):
+        limit = rng.randint(10, 5000)
+        data.append([parameter, f"≤ {limit} N", f"{rng.randint(1, limit)} N", "PASS" if rng.random() < 0.95 else "FAIL"])
+    return data
+
+
+def _text_page(story, rng, styles, heading_style, table_count):
+    story.append(Paragraph(rng.choice(SECTIONS), heading_style))
+    paragraphs = 3 if table_count == 0 else 2 if table_count == 1 else 1
+    for _ in range(paragraphs):
+        story.append(Paragraph(" ".join(_sentence(rng) for _ in range(rng.randint(3, 6))), styles["Normal"]))
+        story.append(Spacer(1, 10))
+    for _ in range(table_count):
+        story.append(results_table(_results_rows(rng, rng.randint(4, 8))))
+        story.append(Spacer(1, 15))
+
+
+def _scan_image(rng, np_rng, lines, pixels=None):
+    """
+    JPEG of a page as a scanner would produce it: rendered text, slight skew,
+    speckle noise. ``pixels`` enlarges the image with sensor noise so the
+    document reaches a target size.
+    """
+    width, height = int(8.27 * SCAN_DPI), int(11.69 * SCAN_DPI)
+    if pixels and pixels > width * height:
+        scale = math.sqrt(pixels / (width * height))
+        width, height = int(width * scale), int(height * scale)
+    font = ImageFont.truetype(SCAN_FONT, max(12, width // 60))
+    page = PILImage.new("L", (width, height), 245)
+    draw = ImageDraw.Draw(page)
+    y = height // 12
+    for line in lines:
+        draw.text((width // 10, y), line, fill=30, font=font)
+        y += int(font.size * 1.6)
+        if y > height * 0.9:
+            break
+    page = page.rotate(rng.uniform(-1.5, 1.5), fillcolor=245)
+    pixels_array = np.asarray(page)
+    noise = np_rng.integers(0, 41 if pixels else 13, pixels_array.shape, dtype=np.uint8)
+    page = PILImage.fromarray(np.where(pixels_array > noise, pixels_array - noise, 0).astype(np.uint8))
+    buffer = io.BytesIO()
+    page.save(buffer, "JPEG", quality=90 if pixels else 75)
+    buffer.seek(0)
+    return buffer
+
+
+def render_document(plan, output_dir):
+    """
+    Write one planned document (runs in a worker process)
+
+    Returns:
+        dict: Manifest entry for the document
+    """
+    started = time.perf_counter()
+    rng = random.Random(plan["seed"])
+    np_rng = np.random.default_rng(plan["seed"])
+    path = os.path.join(output_dir, plan["file"])
+    styles, title_style, heading_style = report_styles()
+    # invariant: no timestamps or random IDs, so identical input gives identical bytes
+    doc = SimpleDocTemplate(path, pagesize=A4, invariant=1)
+    frame_width, frame_height = doc.width, doc.height - 12
+
+    scanned_count = plan["page_kinds"].count("scanned")
+    pixels_per_scan = None
+    if plan["target_size"]:
+        pixels_per_scan = int(plan["target_size"] / scanned_count / JPEG_BYTES_PER_PIXEL)
+
+    story = []
+    metadata = _report_metadata(rng)
+    for page_number, (kind, table_count) in enumerate(zip(plan["page_kinds"], plan["tables"]), start=1):
+        if page_number > 1:
+            story.append(PageBreak())
+        if kind == "scanned":
+            lines = [f"{label} {value}" for label, value in metadata] + \
+                [_sentence(rng) for _ in range(rng.randint(10, 25))]
+            story.append(Image(_scan_image(rng, np_rng, lines, pixels_per_scan), frame_width, frame_height))
+            continue
+        if page_number == 1:
+            story.append(Paragraph("TECHNICAL COMPLIANCE REPORT", title_style))
+            story.append(metadata_table(metadata))
+            story.append(Spacer(1, 20))
+            table_count = min(table_count, 1)
+        _text_page(story, rng, styles, heading_style, table_count)
+    doc.build(story)
+
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    return {
+        "file": plan["file"],
+        "seed": plan["seed"],
+        "kind": plan["kind"],
+        "pages": len(plan["page_kinds"]),
+        "text_pages": len(plan["page_kinds"]) - scanned_count,
+        "scanned_pages": scanned_count,
+        "tables": sum(plan["tables"]),
+        "target_size_bytes": plan["target_size"],
+        "size_bytes": os.path.getsize(path),
+        "sha256": sha256,
+        "render_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible benchmark corpus of PDF reports")
+    parser.add_argument("--output", default="corpus", help="Output directory")
+    parser.add_argument("--count", type=int, default=100, help="Number of documents")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed; same seed, same files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel worker processes")
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=30)
+    parser.add_argument("--tables-per-page", type=float, default=0.5,
+                        help="Average tables per text page (at most 2 per page)")
+    parser.add_argument("--scanned-pages", type=float, default=0.1,
+                        help="Probability that a page of a text document is an image-only scan")
+    parser.add_argument("--scanned-docs", type=float, default=0.05,
+                        help="Fraction of documents that are scanned end to end")
+    parser.add_argument("--large-fraction", type=float, default=0.0,
+                        help="Fraction of documents padded to a large target size with scanned "
+                             "pages (appended when the document has too few)")
+    parser.add_argument("--large-size-mb", type=float, nargs=2, default=[50, 300], metavar=("MIN", "MAX"),
+                        help="Target size range of large documents")
+    args = parser.parse_args()
+
+    if not 1 <= args.min_pages <= args.max_pages:
+        parser.error("need 1 <= --min-pages <= --max-pages")
+
+    os.makedirs(args.output, exist_ok=True)
+    plans = [plan_document(index, args) for index in range(args.count)]
+    print(f"🏭 Generating {args.count} documents into {args.output}/ with {args.workers} workers (seed {args.seed})")
+
+    started = time.perf_counter()
+    documents = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(render_document, plan, args.output) for plan in plans]
+        for done, future in enumerate(as_completed(futures), start=1):
+            documents.append(future.result())
+            if done % max(1, args.count // 20) == 0 or done == args.count:
+                print(f"   📄 {done}/{args.count} ({time.perf_counter() - started:.1f}s)")
+
+    documents.sort(key=lambda document: document["file"])
+    manifest = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "seed": args.seed,
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "workers")},
+        "totals": {
+            "documents": len(documents),
+            "pages": sum(d["pages"] for d in documents),
+            "scanned_pages": sum(d["scanned_pages"] for d in documents),
+            "tables": sum(d["tables"] for d in documents),
+            "bytes": sum(d["size_bytes"] for d in documents),
+        },
+        "documents": documents,
+    }
+    with open(os.path.join(args.output, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    totals = manifest["totals"]
+    print(f"✅ {totals['documents']} documents, {totals['pages']} pages ({totals['scanned_pages']} scanned), "
+          f"{totals['tables']} tables, {totals['bytes'] / MB:.1f} MB in {time.perf_counter() - started:.1f}s")
+    print(f"📋 Manifest: {os.path.join(args.output, 'manifest.json')}")
+
+
+if __name__ == "__main__":
+    main()
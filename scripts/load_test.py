@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Asyncio load test for the SecureDoc AI FastAPI backend
+
+Logs in through /token, then drives a weighted mix of endpoints either with a
+fixed number of concurrent virtual users (closed loop) or at a target request
+rate (open loop), and reports throughput, latency percentiles and errors per
+endpoint.
+
+Usage:
+    python scripts/load_test.py --url http://localhost:8001 --concurrency 32 --duration 60
+    python scripts/load_test.py --rate 50 --mix list=5,health=3,analyze=2,upload=1 --file sample.pdf
+    python scripts/load_test.py --rate 20 --duration 300 --hdr-dir results/hdr --json results/load.json
+
+In rate mode latency is measured from when a request was due, not from when
+it was sent, so a stalled server shows up in the percentiles instead of
+silently lowering the request rate (coordinated omission).
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+try:
+    from hdrh.histogram import HdrHistogram
+except ImportError:  # optional: pip install hdrhistogram
+    HdrHistogram = None
+
+ENDPOINTS = ("upload", "list", "analyze", "health")
+DEFAULT_MIX = "list=5,health=3,analyze=2,upload=0"
+HDR_MAX_MICROSECONDS = 10 * 60 * 1_000_000
+
+
+class EndpointStats:
+    """Latencies (ms) and outcomes of one endpoint"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies_ms = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.histogram = HdrHistogram(1, HDR_MAX_MICROSECONDS, 3) if HdrHistogram else None
+
+    def record(self, latency_ms, status):
+        self.latencies_ms.append(latency_ms)
+        self.statuses[status] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+        if self.histogram:
+            self.histogram.record_value(min(max(int(latency_ms * 1000), 1), HDR_MAX_MICROSECONDS))
+
+    def percentile(self, fraction):
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+    def summary(self, seconds):
+        count = len(self.latencies_ms)
+        return {
+            "requests": count,
+            "throughput_rps": round(count / seconds, 2) if seconds else 0,
+            "error_rate": round(self.errors / count * 100, 2) if count else 0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(max(self.latencies_ms), 1) if count else None,
+            "statuses": {str(status): n for status, n in self.statuses.items()},
+        }
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.stats = {name: EndpointStats(name) for name in ENDPOINTS}
+        self.token = None
+        self._login_lock = asyncio.Lock()
+        self.documents = list(args.documents or [])
+        self.run_id = uuid.uuid4().hex[:8]
+        self.uploads = 0
+        self.measuring = False
+        self.in_flight = 0
+        self.dropped = 0
+        self.file_bytes = None
+        if args.file:
+            with open(args.file, "rb") as f:
+                self.file_bytes = f.read()
+
+    async def login(self, client):
+        """Fetch a bearer token (once, shared by every virtual user)"""
+        async with self._login_lock:
+            response = await client.post("/token", data={"username": self.args.username,
+                                                         "password": self.args.password})
+            response.raise_for_status()
+            self.token = response.json()["access_token"]
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def _call(self, client, endpoint):
+        if endpoint == "health":
+            return await client.get("/system/health")
+        if endpoint == "list":
+            return await client.get("/documents/list", headers=self._headers())
+        if endpoint == "analyze":
+            name = random.choice(self.documents)
+            return await client.get(f"/documents/analyze/{name}", headers=self._headers())
+        self.uploads += 1
+        name = f"loadtest-{self.run_id}-{self.uploads:06d}{os.path.splitext(self.args.file)[1]}"
+        response = await client.post("/documents/upload", headers=self._headers(),
+                                      files={"file": (name, self.file_bytes, "application/pdf")})
+        if response.status_code == 200:
+            self.documents.append(name)
+        return response
+
+    async def request(self, client, endpoint, due=None):
+        """Issue one request and record its latency (from ``due`` in rate mode)"""
+        started = due if due is not None else time.perf_counter()
+        self.in_flight += 1
+        try:
+            response = await self._call(client, endpoint)
+            if response.status_code == 401:
+                # Token expired during a long run: log in again and retry once
+                await self.login(client)
+                response = await self._call(client, endpoint)
+            status = response.status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        if self.measuring:
+            self.stats[endpoint].record((time.perf_counter() - started) * 1000, status)
+
+    def pick(self):
+        endpoints = [e for e in self.mix if e != "analyze" or self.documents]
+        return random.choices(endpoints, weights=[self.mix[e] for e in endpoints])[0]
+
+    async def _virtual_user(self, client, stop_at):
+        while time.perf_counter() < stop_at:
+            await self.request(client, self.pick())
+
+    async def _open_loop(self, client, stop_at):
+        """Start requests on a Poisson schedule at the target rate"""
+        tasks = set()
+        due = time.perf_counter()
+        while due < stop_at:
+            due += random.expovariate(self.args.rate)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.in_flight >= self.args.max_in_flight:
+                # Client-side cap reached: count it rather than queueing without bound
+                if self.measuring:
+                    self.dropped += 1
+                continue
+            task = asyncio.create_task(self.request(client, self.pick(), due))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.max_in_flight if self.args.rate else self.args.concurrency,
+                              max_keepalive_connections=self.args.concurrency)
+        timeout = httpx.Timeout(self.args.timeout)
+        async with httpx.AsyncClient(base_url=self.args.url, limits=limits, timeout=timeout) as client:
+            await self.login(client)
+            if self.mix.get("analyze") and not self.documents:
+                response = await client.get("/documents/list", headers=self._headers())
+                self.documents = [d["name"] for d in response.json().get("documents", [])][:self.args.analyze_pool]
+                if not self.documents and not self.mix.get("upload"):
+                    print("⚠️ No documents to analyze - analyze requests are skipped")
+
+            loop_started = time.perf_counter()
+            measure_from = loop_started + self.args.warmup
+            stop_at = measure_from + self.args.duration
+            asyncio.get_running_loop().call_at(
+                asyncio.get_running_loop().time() + self.args.warmup, self._start_measuring
+            )
+            if self.args.rate:
+                await self._open_loop(client, stop_at)
+            else:
+                await asyncio.gather(*(self._virtual_user(client, stop_at) for _ in range(self.args.concurrency)))
+            self.elapsed = min(time.perf_counter(), stop_at) - measure_from
+
+    def _start_measuring(self):
+        self.measuring = True
+
+    def report(self):
+        seconds = self.elapsed
+        summary = {name: stats.summary(seconds) for name, stats in self.stats.items() if stats.latencies_ms}
+        total = sum(s["requests"] for s in summary.values())
+        errors = sum(self.stats[name].errors for name in summary)
+        return {
+            "mode": f"rate {self.args.rate}/s" if self.args.rate else f"concurrency {self.args.concurrency}",
+            "duration_s": round(seconds, 1),
+            "requests": total,
+            "throughput_rps": round(total / seconds, 2) if seconds else 0,
+            "error_rate": round(errors / total * 100, 2) if total else 0,
+            "dropped": self.dropped,
+            "endpoints": summary,
+        }
+
+    def write_histograms(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name, stats in self.stats.items():
+            if not stats.latencies_ms:
+                continue
+            with open(os.path.join(directory, f"{name}.hgrm"), "wb") as f:
+                # Values are recorded in microseconds; report milliseconds
+                stats.histogram.output_percentile_distribution(f, 1000.0)
+            with open(os.path.join(directory, f"{name}.hdr"), "wb") as f:
+                f.write(stats.histogram.encode())
+
+
+def parse_mix(text):
+    """'list=5,health=1' -> {'list': 5.0, 'health': 1.0} (zero weights dropped)"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        if float(weight or 1) > 0:
+            mix[name] = float(weight or 1)
+    if not mix:
+        raise argparse.ArgumentTypeError("the mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def print_report(report):
+    print(f"\n📊 {report['mode']} for {report['duration_s']}s: {report['requests']} requests, "
+          f"{report['throughput_rps']} req/s, {report['error_rate']}% errors")
+    if report["dropped"]:
+        print(f"⚠️ {report['dropped']} requests not sent (--max-in-flight reached)")
+    print(f"\n{'endpoint':<10} {'requests':>9} {'req/s':>8} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, s in report["endpoints"].items():
+        print(f"{name:<10} {s['requests']:>9} {s['throughput_rps']:>8} {s['error_rate']:>7}% "
+              f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}")
+        failures = {status: n for status, n in s["statuses"].items() if not status.isdigit() or int(status) >= 400}
+        if failures:
+            print(f"{'':<10} ❌ {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the SecureDoc AI API")
+    parser.add_argument("--url", default="http://localhost:8001", help="API base URL")
+    parser.add_argument("--username", default="amer")
+    parser.add_argument("--password", default="demo123")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Endpoint weights, e.g. '{DEFAULT_MIX}' (endpoints: {', '.join(ENDPOINTS)})")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users (closed loop)")
+    mode.add_argument("--rate", type=float, help="Target requests per second (open loop)")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Cap on outstanding requests in rate mode")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring starts")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--file", help="Document sent by upload requests")
+    parser.add_argument("--documents", nargs="+", help="Names used by analyze requests (default: from /documents/list)")
+    parser.add_argument("--analyze-pool", type=int, default=50, help="How many listed documents analyze requests pick from")
+    parser.add_argument("--seed", type=int, help="Seed for the request mix and arrival times")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    parser.add_argument("--hdr-dir", help="Write HDR histograms (.hgrm percentiles and encoded .hdr) here")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if mix.get("upload") and not args.file:
+        parser.error("upload requests need --file")
+    if args.hdr_dir and HdrHistogram is None:
+        parser.error("--hdr-dir needs the hdrhistogram package (pip install hdrhistogram)")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    load_test = LoadTest(args)
+    print(f"🚀 Load testing {args.url} - mix {mix}, "
+          f"{f'{args.rate} req/s' if args.rate else f'{args.concurrency} users'}, "
+          f"{args.warmup}s warm-up + {args.duration}s")
+    try:
+        asyncio.run(load_test.run())
+    except httpx.HTTPError as e:
+        print(f"❌ Load test could not start: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted")
+        return 1
+
+    report = load_test.report()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+    if args.hdr_dir:
+        load_test.write_histograms(args.hdr_dir)
+        print(f"📈 HDR histograms written to {args.hdr_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
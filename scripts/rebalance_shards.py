@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Move blobs to the storage shard that owns them after STORAGE_SHARDS changes
+
+Blob names are mapped to shards by rendezvous hashing (src/data_ingestion/shards.py),
+so adding a shard only moves the blobs that now hash to it. Each move is a
+server-side copy (no data passes through this machine), checked against the
+source size and MD5, followed by a delete of the source that is skipped if
+the blob changed since it was listed.
+
+Adding shards without a window where moved blobs cannot be found:
+    1. Copy to the new layout while the API still runs with the old one:
+       STORAGE_SHARDS="reports-0,reports-1,reports-2" python scripts/rebalance_shards.py --keep-source
+    2. Deploy the new STORAGE_SHARDS, then move what was uploaded in between
+       and delete the originals:
+       python scripts/rebalance_shards.py
+
+Retiring a shard: remove it from STORAGE_SHARDS and drain it
+    python scripts/rebalance_shards.py --drain old-reports@OLD_ACCOUNT_CONNECTION_STRING
+
+Usage:
+    python scripts/rebalance_shards.py --dry-run
+    python scripts/rebalance_shards.py --workers 32
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import BlobSasPermissions
+
+from src.data_ingestion.shards import parse_shards
+from src.data_ingestion.storage_client import AzureStorageClient
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("rebalance-shards")
+
+COPY_POLL_SECONDS = 0.5
+
+
+def plan_moves(shard_map, sources, workers):
+    """
+    List every source shard in parallel and pick the blobs whose owner is another shard
+
+    Returns:
+        tuple: ([(source shard, owner shard, blob)], Counter of blobs per owner)
+    """
+    def list_shard(shard):
+        return shard, list(shard.container_client.list_blobs())
+
+    moves = []
+    owners = Counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sources)))) as executor:
+        for source, blobs in executor.map(list_shard, sources):
+            for blob in blobs:
+                owner = shard_map.shard_for(blob.name)
+                owners[owner.name] += 1
+                if owner.name != source.name:
+                    moves.append((source, owner, blob))
+    return moves, owners
+
+
+def _md5s(blob, properties):
+    source_md5 = blob.content_settings.content_md5
+    target_md5 = properties.content_settings.content_md5
+    return (bytes(source_md5) if source_md5 else None), (bytes(target_md5) if target_md5 else None)
+
+
+def _same_content(blob, properties):
+    """
+    True only if both sides carry an MD5 and they match
+
+    Committed block blobs usually have no MD5; a size match alone could be a
+    re-upload of different content, so such blobs are always copied again.
+    """
+    source_md5, target_md5 = _md5s(blob, properties)
+    return blob.size == properties.size and source_md5 is not None and source_md5 == target_md5
+
+
+def _copy_matches(blob, properties):
+    """Check a finished copy against the listed source: size, and MD5 where both have one"""
+    source_md5, target_md5 = _md5s(blob, properties)
+    if blob.size != properties.size:
+        return False
+    return source_md5 is None or target_md5 is None or source_md5 == target_md5
+
+
+def move_blob(source, owner, blob, keep_source=False):
+    """
+    Copy one blob to its owner shard and delete it from the source
+
+    Returns:
+        str: "moved", "copied" (source kept), "changed" (source modified meanwhile, kept)
+    """
+    target = owner.container_client.get_blob_client(blob.name)
+    try:
+        properties = target.get_blob_properties()
+        already_there = _same_content(blob, properties)
+    except ResourceNotFoundError:
+        already_there = False
+
+    if not already_there:
+        source_url = source.sas_url(blob.name, BlobSasPermissions(read=True),
+                                    datetime.utcnow() + timedelta(hours=1))
+        try:
+            # Copy exactly the listed version; a newer upload is left for the next run
+            target.start_copy_from_url(source_url, source_etag=blob.etag,
+                                       source_match_condition=MatchConditions.IfNotModified)
+        except HttpResponseError as e:
+            # SourceConditionNotMet comes back as a plain 412
+            if e.status_code == 412:
+                return "changed"
+            raise
+        while True:
+            properties = target.get_blob_properties()
+            status = properties.copy.status
+            if status == "success":
+                break
+            if status != "pending":
+                raise RuntimeError(f"Copy of {blob.name} to {owner.name} ended as {status}: "
+                                   f"{properties.copy.status_description}")
+            time.sleep(COPY_POLL_SECONDS)
+        if not _copy_matches(blob, properties):
+            raise RuntimeError(f"Copy of {blob.name} to {owner.name} does not match the source")
+
+    if keep_source:
+        return "copied"
+    try:
+        # Only delete the version that was copied; a newer upload stays for the next run
+        source.container_client.get_blob_client(blob.name).delete_blob(
+            delete_snapshots="include", etag=blob.etag, match_condition=MatchConditions.IfNotModified
+        )
+    except ResourceModifiedError:
+        return "changed"
+    except ResourceNotFoundError:
+        pass
+    return "moved"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move blobs to the storage shard that owns them")
+    parser.add_argument("--drain", action="append", default=[],
+                        help="Shard no longer in STORAGE_SHARDS to empty (container or container@ENV_VAR)")
+    parser.add_argument("--keep-source", action="store_true",
+                        help="Copy only; leave the originals in place (step 1 of adding shards)")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent moves (default: 16)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    args = parser.parse_args()
+
+    storage_client = AzureStorageClient()
+    shard_map = storage_client.shards
+    drained = [shard for spec in args.drain for shard in parse_shards(spec, storage_client.connection_string)]
+    sources = list(shard_map) + [shard for shard in drained if shard.name not in {s.name for s in shard_map}]
+
+    print(f"🧭 Target layout: {', '.join(shard.name for shard in shard_map)}")
+    if drained:
+        print(f"🚰 Draining: {', '.join(shard.name for shard in drained)}")
+    moves, owners = plan_moves(shard_map, sources, args.workers)
+    total_bytes = sum(blob.size for _, _, blob in moves)
+    print(f"📊 Blobs per shard after rebalancing: "
+          + ", ".join(f"{shard.name}={owners[shard.name]}" for shard in shard_map))
+    print(f"📦 {len(moves)} blobs ({total_bytes / (1024 * 1024):.1f} MB) to move")
+    by_route = Counter((source.name, owner.name) for source, owner, _ in moves)
+    for (source, owner), count in sorted(by_route.items()):
+        print(f"   {source} → {owner}: {count}")
+    if args.dry_run or not moves:
+        return
+
+    results = Counter()
+    failures = []
+    lock = threading.Lock()
+    started = time.time()
+
+    def run(move):
+        source, owner, blob = move
+        try:
+            outcome = move_blob(source, owner, blob, keep_source=args.keep_source)
+        except Exception as e:
+            outcome = "failed"
+            with lock:
+                failures.append((blob.name, str(e)))
+        with lock:
+            results[outcome] += 1
+            done = sum(results.values())
+            if done % 100 == 0 or done == len(moves):
+                print(f"\r🔀 {done}/{len(moves)} blobs processed", end="", flush=True)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="move") as executor:
+            list(executor.map(run, moves))
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted - re-run to finish; blobs already moved are skipped")
+        return
+    print()
+
+    print(f"🎉 Done in {time.time() - started:.1f}s: {results['moved']} moved, "
+          f"{results['copied']} copied (sources kept), {results['failed']} failed")
+    if results["changed"]:
+        print(f"   {results['changed']} blobs changed while being moved; their sources were kept, re-run to move them")
+    for name, error in failures[:20]:
+        print(f"   ❌ {name}: {error}")
+    if len(failures) > 20:
+        print(f"   ... and {len(failures) - 20} more")
+
+
+if __name__ == "__main__":
+    main()
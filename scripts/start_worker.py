@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Background analysis worker: runs jobs queued by the API (POST /jobs/analyze,
+/documents/upload?background=true)
+
+Start as many workers, on as many machines, as the analysis load needs; the
+API only queues work. Use JOB_QUEUE_BACKEND=azure for workers on more than
+one machine, since the default SQLite queue is local to one node.
+
+Usage:
+    python scripts/start_worker.py
+    python scripts/start_worker.py --concurrency 4 --visibility-timeout 600
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import logging
+import signal
+
+from config.settings import settings
+from src.data_ingestion.http_transport import prewarm
+from src.data_ingestion.storage_client import AzureStorageClient
+from src.data_ingestion.work_claims import claim
+from src.data_processing.document_processor import DocumentProcessor
+from src.data_processing.pipeline import analyze_blob, analysis_summary
+from src.jobs.queue import get_job_queue
+from src.jobs.worker import JobDeferred, Worker
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.getLogger("azure").setLevel(logging.WARNING)
+
+
+def analyze_handler(storage_client, doc_processor):
+    """Job handler for "analyze" jobs queued by the API"""
+    def handle(payload):
+        # Another node may be analyzing the same blob (a second job, a backfill);
+        # that is not a failure, so the job waits out one lease without using an attempt
+        work_claim = claim(storage_client, payload["blob_name"])
+        if work_claim is None:
+            raise JobDeferred(f"{payload['blob_name']} is being analyzed by another worker",
+                              settings.CLAIM_LEASE_SECONDS)
+        with work_claim:
+            analysis_result = analyze_blob(storage_client, doc_processor, payload["blob_name"],
+                                           user=payload.get("user"), size_bytes=payload.get("size_bytes"),
+                                           claim=work_claim, priority=payload.get("priority", "background"))
+        return analysis_summary(analysis_result)
+    return handle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued document analysis jobs")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Jobs to run at the same time (default: 2)")
+    parser.add_argument("--visibility-timeout", type=int, default=settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+                        help="Seconds a claimed job stays hidden between heartbeats "
+                             f"(default: {settings.JOB_VISIBILITY_TIMEOUT_SECONDS})")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds to wait when the queue is empty (default: 2)")
+    args = parser.parse_args()
+
+    print("🚀 Starting SecureDoc AI analysis worker")
+    print(f"📬 Queue: {settings.JOB_QUEUE_BACKEND} ({settings.JOB_QUEUE_NAME}), "
+          f"max {settings.JOB_MAX_ATTEMPTS} attempts per job")
+    print("-" * 50)
+
+    queue = get_job_queue()
+    storage_client, doc_processor = AzureStorageClient(), DocumentProcessor()
+    handlers = {"analyze": analyze_handler(storage_client, doc_processor)}
+    prewarm([storage_client.blob_service_client.url, *doc_processor.endpoints],
+            connections=max(args.concurrency, settings.HTTP_PREWARM_CONNECTIONS))
+    worker = Worker(queue, handlers, concurrency=args.concurrency,
+                    visibility_timeout=args.visibility_timeout, poll_interval=args.poll_interval)
+
+    def shutdown(signum, frame):
+        print("\n🛑 Finishing running jobs before exiting...")
+        worker.request_stop()
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    worker.run_forever()
+    print(f"✅ Worker exited: {worker.processed} jobs succeeded, {worker.failed} failed, "
+          f"{worker.deferred} deferred")
+
+
+if __name__ == "__main__":
+    main()
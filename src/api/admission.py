@@ -0,0 +1,161 @@
+"""
+Admission control: shed upload and analysis requests early when the API is saturated
+"""
+import math
+import re
+from starlette.responses import JSONResponse
+from config.settings import settings
+from src.jobs.scheduler import get_analysis_scheduler
+import logging
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Requests whose body is a document (multipart upload or a resumable chunk)
+UPLOAD_ROUTES = re.compile(r"^/documents/(upload$|uploads/[^/]+/chunks/)")
+# Requests that run an analysis inside the request; ?background=true uploads only queue one
+ANALYSIS_ROUTES = re.compile(r"^/documents/(upload$|analyze/|.+/commit$)")
+
+def _utilization(used, limit):
+    return round(used / limit, 3) if limit > 0 else 0.0
+
+class AdmissionController:
+    """
+    Counters of work in flight, checked before a request is let in
+
+    Only the event loop thread touches the counters, so no locks are needed.
+    A request over any limit is answered 503 with Retry-After right away
+    instead of queueing behind work that will not finish in time.
+    """
+
+    def __init__(self, max_uploads=None, max_buffered_mb=None, max_queued_analyses=None,
+                 retry_after=None):
+        self.max_uploads = max_uploads if max_uploads is not None else settings.ADMISSION_MAX_UPLOADS
+        self.max_buffered_bytes = (max_buffered_mb if max_buffered_mb is not None
+                                   else settings.ADMISSION_MAX_BUFFERED_MB) * MB
+        self.max_queued_analyses = (max_queued_analyses if max_queued_analyses is not None
+                                    else settings.ADMISSION_MAX_QUEUED_ANALYSES)
+        self.retry_after = retry_after or settings.ADMISSION_RETRY_AFTER_SECONDS
+        self.uploads = 0
+        self.buffered_bytes = 0
+        self.analyses = 0
+        self.rejected = {"uploads": 0, "buffered_bytes": 0, "analyses": 0, "length_required": 0}
+
+    @property
+    def max_analyses(self):
+        # Running analyses plus the ones allowed to wait for a scheduler slot
+        return get_analysis_scheduler().concurrency + self.max_queued_analyses
+
+    def admit(self, path, query_string, content_length):
+        """
+        Reserve capacity for a request
+
+        Returns:
+            tuple: (reservation, None) if admitted, or (None, (status, reason)) if not
+        """
+        upload = bool(UPLOAD_ROUTES.match(path))
+        analysis = bool(ANALYSIS_ROUTES.match(path)) and b"background=true" not in query_string
+        if upload:
+            if content_length is None:
+                self.rejected["length_required"] += 1
+                return None, (411, "Content-Length is required for uploads")
+            if self.max_uploads > 0 and self.uploads >= self.max_uploads:
+                self.rejected["uploads"] += 1
+                return None, (503, "Too many uploads in progress")
+            if self.max_buffered_bytes > 0 and self.buffered_bytes + content_length > self.max_buffered_bytes:
+                # Always let one upload through, however big, so large files are never starved
+                if self.buffered_bytes:
+                    self.rejected["buffered_bytes"] += 1
+                    return None, (503, "Too much upload data in progress")
+        if analysis and self.max_queued_analyses > 0 and self.analyses >= self.max_analyses:
+            self.rejected["analyses"] += 1
+            return None, (503, "Too many analyses queued")
+
+        reservation = (upload, content_length if upload else 0, analysis)
+        self.uploads += upload
+        self.buffered_bytes += reservation[1]
+        self.analyses += analysis
+        return reservation, None
+
+    def release(self, reservation):
+        upload, nbytes, analysis = reservation
+        self.uploads -= upload
+        self.buffered_bytes -= nbytes
+        self.analyses -= analysis
+
+    def saturation(self):
+        """Utilization of each limit; "saturation" is the highest of them"""
+        scheduler = get_analysis_scheduler().stats()
+        queued = sum(scheduler["waiting"].values())
+        limits = {
+            "uploads": {
+                "in_flight": self.uploads,
+                "limit": self.max_uploads,
+                "utilization": _utilization(self.uploads, self.max_uploads),
+            },
+            "buffered_bytes": {
+                "in_flight": self.buffered_bytes,
+                "limit": self.max_buffered_bytes,
+                "utilization": _utilization(self.buffered_bytes, self.max_buffered_bytes),
+            },
+            "analyses": {
+                "in_flight": self.analyses,
+                "running": scheduler["running"],
+                "queued": queued,
+                "limit": self.max_analyses if self.max_queued_analyses > 0 else 0,
+                "utilization": _utilization(self.analyses, self.max_analyses if self.max_queued_analyses > 0 else 0),
+            },
+        }
+        return {
+            "saturation": max(limit["utilization"] for limit in limits.values()),
+            "limits": limits,
+            "rejected": dict(self.rejected),
+        }
+
+class AdmissionMiddleware:
+    """ASGI middleware applying AdmissionController to upload and analysis requests"""
+
+    def __init__(self, app, controller=None):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "GET"):
+            await self.app(scope, receive, send)
+            return
+        if self.controller is None:
+            self.controller = get_admission_controller()
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    content_length = int(value)
+                except ValueError:
+                    content_length = -1
+                break
+        if content_length is not None and content_length < 0:
+            response = JSONResponse(status_code=400, content={"detail": "Invalid Content-Length header"})
+            await response(scope, receive, send)
+            return
+
+        reservation, rejection = self.controller.admit(scope["path"], scope["query_string"], content_length)
+        if rejection:
+            status, reason = rejection
+            headers = {"Retry-After": str(math.ceil(self.controller.retry_after))} if status == 503 else {}
+            response = JSONResponse(status_code=status, content={"detail": reason}, headers=headers)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(reservation)
+
+_admission_controller = None
+
+def get_admission_controller():
+    """Process-wide admission controller, created on first use"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
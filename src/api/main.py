@@ -3,18 +3,38 @@
 FastAPI Backend for SecureDoc AI Platform
 """
 from datetime import datetime, timedelta  # Add this import
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from azure.core.exceptions import ResourceNotFoundError
+from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import base64
+import math
+import time
+import uuid
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
+from config.settings import settings
 from src.auth.authentication import auth_system, User, Token, UserInDB
-from src.data_ingestion.storage_client import AzureStorageClient
+from src.data_ingestion.http_transport import prewarm
+from src.data_ingestion.storage_client import AzureStorageClient, blob_owner, user_prefix
+from src.data_ingestion.upload_sessions import (UploadSessionStore, MAX_CHUNKS, chunk_count,
+                                                default_chunk_size, expected_chunk_length)
 from src.data_processing.document_processor import DocumentProcessor
+from src.data_processing.deadlines import Deadline, DeadlineExceeded, ClientDisconnected, WorkAbandoned
+from src.data_processing.single_flight import SingleFlight
+from src.data_processing.pipeline import analyze_blob, analysis_summary, get_search_index
+from src.api.admission import AdmissionMiddleware, get_admission_controller
+from src.api.rate_limits import RateLimitMiddleware, get_rate_limiter
+from src.jobs.queue import get_job_queue
+from src.jobs.scheduler import estimate_pages, get_analysis_scheduler, get_shared_slots
+from src.monitoring.event_store import get_event_store, GRANULARITIES
 import logging
 import json
 
@@ -31,6 +51,15 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Middleware added first runs innermost: CORS wraps everything so rejections still
+# carry CORS headers, then per-user limits, then global admission control
+
+# Shed uploads and analyses with 503 + Retry-After when the API is saturated
+app.add_middleware(AdmissionMiddleware)
+
+# Per-user request rate limits and daily page quotas (429 with Retry-After)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -59,9 +88,129 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def _is_admin(user):
+    return user.username == "admin"
+
+def _namespace(current_user, owner=None):
+    """
+    Blob prefix of the documents a request works on: the caller's own, or
+    another user's when an admin names one
+    """
+    if owner and owner != current_user.username:
+        if not _is_admin(current_user):
+            raise HTTPException(status_code=403, detail="Only admins can access other users' documents")
+        return user_prefix(owner)
+    return user_prefix(current_user.username)
+
+def _require_admin_for_all_users(current_user, all_users):
+    if all_users and not _is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Only admins can view all users' documents")
+
 # Initialize services
 storage_client = AzureStorageClient()
 doc_processor = DocumentProcessor()
+upload_sessions = UploadSessionStore()
+
+# Concurrent analyses of the same blob version share one Document Intelligence call
+analysis_flights = SingleFlight()
+
+@app.on_event("startup")
+async def prewarm_connections():
+    """Open pooled connections to Azure before serving, so the first requests skip the handshakes"""
+    await run_in_threadpool(prewarm, [storage_client.blob_service_client.url, *doc_processor.endpoints])
+
+def _enqueue_analysis(blob_name, document_name, user, size_bytes=None, priority="background"):
+    """Queue a stored blob for analysis by a worker (scripts/start_worker.py)"""
+    return get_job_queue().enqueue("analyze", {
+        "blob_name": blob_name,
+        "document": document_name,
+        "user": user,
+        "size_bytes": size_bytes,
+        "priority": priority
+    })
+
+def _analyze_blob(blob_name, user=None, size_bytes=None, upload_seconds=None, deadline=None):
+    """Run a stored blob through Document Intelligence and the downstream indexes"""
+    return analyze_blob(storage_client, doc_processor, blob_name, user=user,
+                        size_bytes=size_bytes, upload_seconds=upload_seconds, deadline=deadline)
+
+# Requests given up on before their work finished, by reason
+abandoned_requests = {"deadline_exceeded": 0, "client_disconnected": 0}
+
+def _request_deadline(request):
+    """Deadline from the client's X-Request-Timeout header (seconds), capped by settings"""
+    value = request.headers.get(settings.REQUEST_TIMEOUT_HEADER)
+    if not value:
+        return Deadline()
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = 0
+    if seconds <= 0:
+        raise HTTPException(status_code=400,
+                            detail=f"{settings.REQUEST_TIMEOUT_HEADER} must be a positive number of seconds")
+    if settings.REQUEST_TIMEOUT_MAX_SECONDS > 0:
+        seconds = min(seconds, settings.REQUEST_TIMEOUT_MAX_SECONDS)
+    return Deadline(seconds)
+
+async def _wait_for_disconnect(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(0.5)
+
+async def _until_abandoned(request, deadline, work):
+    """
+    Await work for a request, giving up when its deadline passes or the client disconnects
+
+    The work is cancelled when given up on; work running in a thread only
+    stops if it was passed the deadline too.
+    """
+    work = asyncio.ensure_future(work)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({work, disconnected}, timeout=deadline.remaining(),
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+    if work in done:
+        return work.result()
+    work.cancel()
+    if disconnected in done:
+        raise ClientDisconnected("Client disconnected before the work finished")
+    raise DeadlineExceeded("Request deadline exceeded")
+
+async def _analyze_coalesced(request, blob_name, properties, user, deadline):
+    """Analyze a blob version, sharing one call (and one deadline) with concurrent requests for it"""
+    # Key on the ETag so a re-uploaded blob is never served a stale analysis
+    return await _until_abandoned(request, deadline, analysis_flights.run(
+        (blob_name, properties.etag),
+        run_in_threadpool, _analyze_blob, blob_name, user, properties.size, None, deadline,
+        deadline=deadline
+    ))
+
+def _abandoned_error(e):
+    """HTTP error for a request whose work was abandoned: 504 on deadline, 499 on disconnect"""
+    if isinstance(e, ClientDisconnected):
+        abandoned_requests["client_disconnected"] += 1
+        logger.info(f"🔌 Abandoned request: {str(e)}")
+        return HTTPException(status_code=499, detail=str(e))
+    abandoned_requests["deadline_exceeded"] += 1
+    logger.warning(f"⏱️ Abandoned request: {str(e)}")
+    return HTTPException(status_code=504, detail=str(e))
+
+# Direct-to-storage upload models
+class UploadUrlRequest(BaseModel):
+    filename: str
+    size: int
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: int
+    chunk_size: Optional[int] = None
+
+class UploadCommitRequest(BaseModel):
+    upload_token: str
+    sha256: Optional[str] = None
+    md5: Optional[str] = None  # base64, as sent in Content-MD5
 
 # Authentication endpoints
 @app.post("/token", response_model=Token)
@@ -83,28 +232,72 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
+@app.get("/users/me/usage")
+async def read_usage(current_user: User = Depends(get_current_active_user)):
+    """Request rate limit and today's page quota usage for the current user"""
+    return get_rate_limiter().usage(current_user.username)
+
 # Document processing endpoints
 @app.post("/documents/upload")
 async def upload_document(
+    request: Request,
     file: UploadFile = File(...),
+    background: bool = False,
     current_user: User = Depends(get_current_active_user)
 ):
-    """Upload and process a document"""
+    """Upload and process a document (background=true queues the analysis for a worker)"""
+    deadline = _request_deadline(request)
     try:
-        # Save uploaded file temporarily
+        # Save uploaded file temporarily, a chunk at a time so memory stays bounded
         temp_path = f"temp_{file.filename}"
+        size = 0
         with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            while True:
+                chunk = await file.read(1024 * 1024)
+                if not chunk:
+                    break
+                buffer.write(chunk)
+                size += len(chunk)
         
-        # Upload to Azure Storage
-        blob_url = storage_client.upload_file(temp_path, file.filename)
+        # Upload to Azure Storage (off the event loop, so other requests keep being served)
+        upload_started = time.perf_counter()
+        deduplicated = False
+        if settings.CONTENT_ADDRESSED_UPLOADS:
+            upload = await _until_abandoned(request, deadline, run_in_threadpool(
+                storage_client.upload_content_addressed, temp_path, file.filename,
+                deadline=deadline, prefix=user_prefix(current_user.username)
+            ))
+            blob_name, blob_url = upload["blob_name"], upload["blob_url"]
+            deduplicated = upload["deduplicated"]
+        else:
+            blob_name = user_prefix(current_user.username) + file.filename
+            blob_url = await _until_abandoned(request, deadline, run_in_threadpool(
+                storage_client.upload_file, temp_path, blob_name, deadline=deadline
+            ))
         
-        # Generate SAS URL for processing
-        sas_url = storage_client.generate_sas_url(file.filename)
+        upload_seconds = time.perf_counter() - upload_started
+        
+        if background:
+            os.remove(temp_path)
+            job_id = await run_in_threadpool(_enqueue_analysis, blob_name, file.filename,
+                                             current_user.username, size)
+            # The worker's page count never comes back through the API, so charge the estimate
+            request.state.pages_processed = estimate_pages(size)
+            return JSONResponse(status_code=202, content={
+                "status": "queued",
+                "filename": file.filename,
+                "blob_url": blob_url,
+                "deduplicated": deduplicated,
+                "job_id": job_id,
+                "status_url": f"/jobs/{job_id}",
+                "user": current_user.username
+            })
         
         # Process with AI
-        analysis_result = doc_processor.analyze_document(sas_url)
+        analysis_result = await _until_abandoned(request, deadline, run_in_threadpool(
+            _analyze_blob, blob_name, current_user.username, size, upload_seconds, deadline
+        ))
+        request.state.pages_processed = len(analysis_result['pages'])
         
         # Clean up temp file
         os.remove(temp_path)
@@ -113,31 +306,344 @@ async def upload_document(
             "status": "success",
             "filename": file.filename,
             "blob_url": blob_url,
-            "analysis": {
-                "pages_processed": len(analysis_result['pages']),
-                "tables_found": len(analysis_result['tables']),
-                "content_preview": analysis_result['content'][:200] + "..." if len(analysis_result['content']) > 200 else analysis_result['content'],
-                "processing_time": "completed"
-            },
+            "deduplicated": deduplicated,
+            "analysis": analysis_summary(analysis_result),
             "user": current_user.username
         }
         
+    except WorkAbandoned as e:
+        # Stop the upload or analysis still running in its thread
+        deadline.abandon()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise _abandoned_error(e)
     except Exception as e:
         logger.error(f"Document processing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
+# Resumable uploads: open a session, PUT numbered chunks (in any order, retrying only
+# the missing ones), then commit. Registered before the /documents/{name}/commit route
+# so "uploads/<id>" is not taken for a blob name.
+def _get_upload_session(upload_id, current_user):
+    session = upload_sessions.get(upload_id)
+    if session is None or session["owner"] != current_user.username:
+        raise HTTPException(status_code=404, detail=f"Upload session not found: {upload_id}")
+    return session
+
+@app.post("/documents/uploads")
+async def create_upload_session(
+    request: UploadSessionRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Open a resumable upload session"""
+    max_chunk_size = settings.UPLOAD_MAX_CHUNK_SIZE_MB * 1024 * 1024
+    chunk_size = request.chunk_size or min(default_chunk_size(request.size), max_chunk_size)
+    if not 0 < chunk_size <= max_chunk_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk size must be between 1 byte and {settings.UPLOAD_MAX_CHUNK_SIZE_MB} MB"
+        )
+    if request.size <= 0:
+        raise HTTPException(status_code=400, detail="File size must be positive")
+    # Refuse up front what could be staged but never committed
+    if math.ceil(request.size / chunk_size) > MAX_CHUNKS:
+        if request.size > MAX_CHUNKS * max_chunk_size:
+            detail = (f"File too large for a resumable upload: at most {MAX_CHUNKS} chunks "
+                      f"of {settings.UPLOAD_MAX_CHUNK_SIZE_MB} MB")
+        else:
+            detail = (f"A file of {request.size} bytes needs chunks of at least "
+                      f"{math.ceil(request.size / MAX_CHUNKS)} bytes (at most {MAX_CHUNKS} chunks)")
+        raise HTTPException(status_code=400, detail=detail)
+    
+    blob_name = f"{user_prefix(current_user.username)}{uuid.uuid4().hex[:12]}-{os.path.basename(request.filename)}"
+    session = await run_in_threadpool(
+        upload_sessions.create, current_user.username, blob_name, request.size, chunk_size
+    )
+    return {
+        "status": "success",
+        "upload_id": session["upload_id"],
+        "blob_name": blob_name,
+        "chunk_size": chunk_size,
+        "chunk_count": chunk_count(session)
+    }
+
+@app.put("/documents/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Stage one chunk (raw request body) of a resumable upload"""
+    session = await run_in_threadpool(_get_upload_session, upload_id, current_user)
+    if session["status"] != "open":
+        raise HTTPException(status_code=409, detail="Upload session is already committed")
+    if not 0 <= index < chunk_count(session):
+        raise HTTPException(status_code=400, detail=f"Chunk index out of range 0..{chunk_count(session) - 1}")
+    
+    # Read at most one chunk; the server never holds more than that per request
+    expected = expected_chunk_length(session, index)
+    data = bytearray()
+    async for part in request.stream():
+        data.extend(part)
+        if len(data) > expected:
+            raise HTTPException(status_code=413, detail=f"Chunk {index} must be {expected} bytes")
+    if len(data) != expected:
+        raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes, got {len(data)}")
+    
+    try:
+        await run_in_threadpool(storage_client.stage_block, session["blob_name"], index, bytes(data))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to stage chunk {index}: {str(e)}")
+    return {"status": "success", "upload_id": upload_id, "chunk": index}
+
+@app.get("/documents/uploads/{upload_id}")
+async def get_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Report which chunks the server already has, so a client resends only the rest"""
+    session = await run_in_threadpool(_get_upload_session, upload_id, current_user)
+    total = chunk_count(session)
+    if session["status"] == "committed":
+        received = set(range(total))
+    else:
+        received = await run_in_threadpool(storage_client.get_staged_block_indexes, session["blob_name"])
+    return {
+        "upload_id": upload_id,
+        "blob_name": session["blob_name"],
+        "status": session["status"],
+        "chunk_size": session["chunk_size"],
+        "chunk_count": total,
+        "received_chunks": sorted(received),
+        "missing_chunks": [i for i in range(total) if i not in received]
+    }
+
+@app.post("/documents/uploads/{upload_id}/commit")
+async def commit_upload_session(
+    upload_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Assemble the staged chunks into the final blob and analyze it"""
+    deadline = _request_deadline(request)
+    session = await run_in_threadpool(_get_upload_session, upload_id, current_user)
+    blob_name = session["blob_name"]
+    try:
+        if session["status"] == "open":
+            received = await run_in_threadpool(storage_client.get_staged_block_indexes, blob_name)
+            missing = [i for i in range(chunk_count(session)) if i not in received]
+            if missing:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Upload incomplete", "missing_chunks": missing}
+                )
+            await run_in_threadpool(storage_client.commit_blocks, blob_name, chunk_count(session))
+            await run_in_threadpool(upload_sessions.mark_committed, upload_id)
+        
+        properties = await run_in_threadpool(storage_client.get_blob_properties, blob_name, deadline)
+        analysis_result = await _analyze_coalesced(request, blob_name, properties,
+                                                   current_user.username, deadline)
+        request.state.pages_processed = len(analysis_result['pages'])
+        return {
+            "status": "success",
+            "filename": blob_owner(blob_name)[1],
+            "blob_url": storage_client.blob_url(blob_name),
+            "analysis": analysis_summary(analysis_result),
+            "user": current_user.username
+        }
+    except HTTPException:
+        raise
+    except WorkAbandoned as e:
+        raise _abandoned_error(e)
+    except Exception as e:
+        logger.error(f"Upload session commit failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+@app.post("/documents/upload-url")
+async def create_upload_url(
+    request: UploadUrlRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Issue a short-lived write SAS so the client can upload straight to Blob Storage"""
+    if request.size <= 0 or request.size > settings.DIRECT_UPLOAD_MAX_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File size must be between 1 byte and {settings.DIRECT_UPLOAD_MAX_MB} MB"
+        )
+    
+    # A fresh name per upload means the write SAS can never touch an existing document
+    blob_name = f"{user_prefix(current_user.username)}{uuid.uuid4().hex[:12]}-{os.path.basename(request.filename)}"
+    try:
+        upload_url = storage_client.generate_upload_sas_url(
+            blob_name, expiry_minutes=settings.UPLOAD_SAS_EXPIRY_MINUTES
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create upload URL: {str(e)}")
+    
+    # The token binds the commit to this user, blob and declared size; it outlives the
+    # SAS so a transfer started just before expiry can still be committed
+    expires_at = datetime.utcnow() + timedelta(minutes=settings.UPLOAD_SAS_EXPIRY_MINUTES)
+    upload_token = auth_system.create_access_token(
+        data={"purpose": "upload", "owner": current_user.username,
+              "blob": blob_name, "size": request.size},
+        expires_delta=timedelta(minutes=settings.UPLOAD_SAS_EXPIRY_MINUTES + 60)
+    )
+    return {
+        "status": "success",
+        "blob_name": blob_name,
+        "upload_url": upload_url,
+        "required_headers": {"x-ms-blob-type": "BlockBlob"},
+        "expires_at": expires_at.isoformat(),
+        "upload_token": upload_token
+    }
+
+def _verify_direct_upload(blob_name, properties, expected_size, commit):
+    """
+    Check a client-uploaded blob against the declared size and hash; returns a mismatch or None
+
+    Raises a 422 without touching the blob when the hash given cannot be checked
+    (block uploads have no stored MD5), so the client can retry with sha256.
+    """
+    if properties.size != expected_size:
+        return f"Size mismatch: expected {expected_size} bytes, found {properties.size}"
+    
+    stored_md5 = properties.content_settings.content_md5
+    if commit.md5 and stored_md5:
+        # Cheap path: compare against the MD5 the service already stored
+        if base64.b64encode(bytes(stored_md5)).decode() != commit.md5:
+            return "MD5 mismatch"
+        return None
+    if commit.sha256:
+        if storage_client.compute_blob_sha256(blob_name) != commit.sha256.lower():
+            return "SHA-256 mismatch"
+        return None
+    raise HTTPException(status_code=422, detail="Blob has no stored MD5 (uploaded in blocks), "
+                                                "commit again with sha256 to verify it")
+
+@app.post("/documents/{blob_name:path}/commit")
+async def commit_direct_upload(
+    blob_name: str,
+    commit: UploadCommitRequest,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Verify a blob uploaded through /documents/upload-url and analyze it"""
+    ticket = auth_system.decode_token(commit.upload_token)
+    if (not ticket or ticket.get("purpose") != "upload" or ticket.get("blob") != blob_name
+            or ticket.get("owner") != current_user.username):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload token")
+    if not commit.sha256 and not commit.md5:
+        raise HTTPException(status_code=422, detail="Provide sha256 or md5 of the uploaded file")
+    
+    deadline = _request_deadline(request)
+    try:
+        properties = await run_in_threadpool(storage_client.get_blob_properties, blob_name, deadline)
+    except ResourceNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Blob has not been uploaded: {blob_name}")
+    except WorkAbandoned as e:
+        raise _abandoned_error(e)
+    
+    try:
+        error = await run_in_threadpool(
+            _verify_direct_upload, blob_name, properties, ticket["size"], commit
+        )
+        if error:
+            # Do not keep (or analyze) content that is not what the client declared
+            await run_in_threadpool(storage_client.delete_blob, blob_name)
+            raise HTTPException(status_code=422, detail=f"Upload verification failed: {error}")
+        
+        analysis_result = await _analyze_coalesced(request, blob_name, properties,
+                                                   current_user.username, deadline)
+        request.state.pages_processed = len(analysis_result['pages'])
+        return {
+            "status": "success",
+            "filename": blob_owner(blob_name)[1],
+            "blob_url": storage_client.blob_url(blob_name),
+            "analysis": analysis_summary(analysis_result),
+            "user": current_user.username
+        }
+    except HTTPException:
+        raise
+    except WorkAbandoned as e:
+        raise _abandoned_error(e)
+    except Exception as e:
+        logger.error(f"Direct upload commit failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+def _name_search_hits(hits):
+    """Report search hits under the names their documents were uploaded as, not content hashes"""
+    for hit in hits:
+        blob_name = hit["document"]
+        hit["document"] = storage_client.document_name(blob_name, fetch_metadata=True)
+        if hit["document"] != blob_name:
+            hit["blob_name"] = blob_name
+    return hits
+
+@app.get("/documents/search")
+async def search_documents(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    all_users: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Full-text search over the content of your analyzed documents (all_users=true for admins)"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    _require_admin_for_all_users(current_user, all_users)
+    limit = max(1, min(limit, 100))
+    prefix = None if all_users else user_prefix(current_user.username)
+    try:
+        hits = await run_in_threadpool(get_search_index().search, q, limit, max(0, offset), prefix)
+        hits = await run_in_threadpool(_name_search_hits, hits)
+        if prefix:
+            for hit in hits:
+                hit["document"] = hit["document"][len(prefix):]
+                if "blob_name" in hit:
+                    hit["blob_name"] = hit["blob_name"][len(prefix):]
+        return {
+            "status": "success",
+            "query": q,
+            "results": hits,
+            "count": len(hits)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
 @app.get("/documents/list")
-async def list_documents(current_user: User = Depends(get_current_active_user)):
-    """List all documents in storage"""
+async def list_documents(
+    owner: Optional[str] = None,
+    all_users: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    List your documents; admins can list another user's (owner=) or everyone's (all_users=true)
+    
+    Only the requested namespace is listed, so the cost follows its document count.
+    """
+    _require_admin_for_all_users(current_user, all_users)
+    prefix = None if all_users else _namespace(current_user, owner)
     try:
-        blobs = storage_client.list_blobs()
+        blobs = await run_in_threadpool(storage_client.list_blobs, prefix, True)
+        # Content-addressed blobs are listed under the name they were uploaded as,
+        # which is also the name /documents/analyze accepts
+        names = await run_in_threadpool(
+            lambda: [storage_client.document_name(blob.name, blob.metadata) for blob in blobs])
         documents = []
-        for blob in blobs:
-            documents.append({
-                "name": blob.name,
+        for blob, document_name in zip(blobs, names):
+            if prefix:
+                document = {"name": document_name[len(prefix):]}
+            else:
+                blob_user, name = blob_owner(document_name)
+                document = {"name": name, "owner": blob_user}
+            if document_name != blob.name:
+                document["blob_name"] = blob.name[len(prefix):] if prefix else blob.name
+            document.update({
                 "size_mb": round(blob.size / (1024 * 1024), 2),
                 "last_modified": blob.last_modified.isoformat() if blob.last_modified else None
             })
+            documents.append(document)
         return {
             "status": "success",
             "documents": documents,
@@ -149,22 +655,128 @@ async def list_documents(current_user: User = Depends(get_current_active_user)):
 @app.get("/documents/analyze/{document_name}")
 async def analyze_document(
     document_name: str,
+    request: Request,
+    owner: Optional[str] = None,
     current_user: User = Depends(get_current_active_user)
 ):
-    """Analyze a specific document"""
+    """Analyze one of your documents (admins can name another user's with owner=)"""
+    prefix = _namespace(current_user, owner)
+    deadline = _request_deadline(request)
     try:
-        sas_url = storage_client.generate_sas_url(document_name)
-        analysis_result = doc_processor.analyze_document(sas_url)
+        # Names uploaded content-addressed resolve to their hash blob, so identical
+        # content under different names also shares one analysis
+        blob_name = await run_in_threadpool(storage_client.resolve_blob_name, prefix + document_name)
+        
+        properties = await run_in_threadpool(storage_client.get_blob_properties, blob_name, deadline)
+        analysis_result = await _analyze_coalesced(request, blob_name, properties,
+                                                   current_user.username, deadline)
+        request.state.pages_processed = len(analysis_result['pages'])
         
         return {
             "status": "success",
             "document": document_name,
             "analysis": analysis_result
         }
+    except ResourceNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Document not found: {document_name}")
+    except WorkAbandoned as e:
+        raise _abandoned_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+# Background analysis: the API only queues work, workers started with
+# scripts/start_worker.py run it, so both scale independently
+@app.post("/jobs/analyze/{document_name:path}", status_code=202)
+async def queue_analysis(
+    document_name: str,
+    request: Request,
+    priority: str = "background",
+    owner: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Queue a stored document for analysis and return the job to poll (priority: background or bulk)"""
+    if priority not in ("background", "bulk"):
+        raise HTTPException(status_code=400, detail="priority must be background or bulk")
+    prefix = _namespace(current_user, owner)
+    try:
+        blob_name = await run_in_threadpool(storage_client.resolve_blob_name, prefix + document_name)
+        properties = await run_in_threadpool(storage_client.get_blob_properties, blob_name)
+        job_id = await run_in_threadpool(_enqueue_analysis, blob_name, document_name,
+                                         current_user.username, properties.size, priority)
+        request.state.pages_processed = estimate_pages(properties.size)
+        return {
+            "status": "queued",
+            "document": document_name,
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}"
+        }
+    except ResourceNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Document not found: {document_name}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue analysis: {str(e)}")
+
+@app.get("/jobs/{job_id}")
+async def job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """State of a queued analysis, with its summary once it has succeeded"""
+    try:
+        job = await run_in_threadpool(get_job_queue().status, job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job: {str(e)}")
+    if job is None or job["payload"].get("user") != current_user.username:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "document": job["payload"].get("document"),
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "enqueued_at": job["enqueued_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "analysis": job["result"]
+    }
+
+@app.get("/system/jobs")
+async def job_queue_stats(current_user: User = Depends(get_current_active_user)):
+    """Depth of the background job queue"""
+    try:
+        return await run_in_threadpool(get_job_queue().stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job stats: {str(e)}")
+
 # System monitoring endpoints
+@app.get("/system/saturation")
+async def system_saturation():
+    """
+    Load signal for autoscalers: utilization of each admission limit, analysis
+    slots and the background job backlog (unauthenticated, like /system/health)
+    """
+    saturation = get_admission_controller().saturation()
+    saturation["abandoned"] = dict(abandoned_requests, coalesced_waiters=analysis_flights.abandoned)
+    try:
+        saturation["jobs"] = await run_in_threadpool(get_job_queue().stats)
+    except Exception as e:
+        saturation["jobs"] = {"error": str(e)}
+    saturation["timestamp"] = datetime.utcnow().isoformat()
+    return saturation
+
+@app.get("/system/scheduler")
+async def scheduler_stats(current_user: User = Depends(get_current_active_user)):
+    """
+    Analysis slots in use, waiters and queueing delay per priority class in this API
+    process, plus the cluster-wide background/bulk slots
+    """
+    return dict(get_analysis_scheduler().stats(), shared_slots=get_shared_slots().stats())
+
+@app.get("/system/document-intelligence")
+async def document_intelligence_stats(current_user: User = Depends(get_current_active_user)):
+    """Analyses in flight, health and throughput of each Document Intelligence endpoint"""
+    return doc_processor.stats()
+
 @app.get("/system/health")
 async def system_health():
     """Check system health"""
@@ -187,22 +799,64 @@ async def system_health():
             "timestamp": datetime.utcnow().isoformat()
         }
 
+@app.get("/system/stats")
+async def system_stats(
+    granularity: str = "hour",
+    periods: int = 24,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Processing throughput, success rate and latency percentiles from the event rollups"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    periods = max(1, min(periods, 1000))
+    try:
+        event_store = get_event_store()
+        summary = await run_in_threadpool(event_store.summary, granularity, periods)
+        series = await run_in_threadpool(event_store.series, granularity, periods)
+        return {
+            "granularity": granularity,
+            "periods": periods,
+            "summary": summary,
+            "series": series,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
+
 @app.get("/system/metrics")
-async def system_metrics(current_user: User = Depends(get_current_active_user)):
-    """Get system metrics"""
+async def system_metrics(
+    all_users: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Storage metrics for your documents, or for every user's (all_users=true, admins only)"""
+    _require_admin_for_all_users(current_user, all_users)
+    prefix = None if all_users else user_prefix(current_user.username)
     try:
-        blobs = storage_client.list_blobs()
+        blobs = await run_in_threadpool(storage_client.list_blobs, prefix)
         total_size = sum(blob.size for blob in blobs)
         
+        storage_metrics = {
+            "scope": "all_users" if all_users else current_user.username,
+            "total_documents": len(blobs),
+            "total_size_mb": round(total_size / (1024 * 1024), 2),
+            "file_types": {}
+        }
+        if all_users:
+            by_user = {}
+            for blob in blobs:
+                usage = by_user.setdefault(blob_owner(blob.name)[0] or "(unassigned)",
+                                           {"documents": 0, "size_mb": 0.0})
+                usage["documents"] += 1
+                usage["size_mb"] += blob.size / (1024 * 1024)
+            for usage in by_user.values():
+                usage["size_mb"] = round(usage["size_mb"], 2)
+            storage_metrics["by_user"] = by_user
+        
         return {
-            "storage_metrics": {
-                "total_documents": len(blobs),
-                "total_size_mb": round(total_size / (1024 * 1024), 2),
-                "file_types": {}
-            },
+            "storage_metrics": storage_metrics,
             "user_metrics": {
                 "active_user": current_user.username,
-                "role": "admin" if current_user.username == "admin" else "user"
+                "role": "admin" if _is_admin(current_user) else "user"
             }
         }
     except Exception as e:
@@ -0,0 +1,248 @@
+"""
+Per-user request rate limits and daily page quotas for the API
+"""
+import asyncio
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from starlette.responses import JSONResponse
+from config.settings import settings
+from src.auth.authentication import auth_system
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Requests that start an analysis; refused once the user's daily page quota is used up
+QUOTA_ROUTES = re.compile(r"^/(documents/upload$|documents/analyze/|documents/.+/commit$|jobs/analyze/)")
+TOKEN_CACHE_SIZE = 10000
+
+def _utc_day(now=None):
+    return datetime.utcfromtimestamp(now or time.time()).strftime("%Y-%m-%d")
+
+def _seconds_to_utc_midnight(now=None):
+    current = datetime.utcfromtimestamp(now or time.time())
+    midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, math.ceil((midnight - current).total_seconds()))
+
+class PageUsageStore:
+    """Daily pages per user in SQLite, summed across API processes"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "rate_limits.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_usage (
+                day TEXT NOT NULL,
+                user TEXT NOT NULL,
+                pages INTEGER NOT NULL,
+                PRIMARY KEY (day, user)
+            )
+        """)
+
+    def add_and_read(self, day, deltas):
+        """
+        Add this process's new pages and return everyone's totals for the day
+
+        Args:
+            day (str): UTC day, YYYY-MM-DD
+            deltas (dict): User -> pages charged since the last call
+
+        Returns:
+            dict: User -> pages for the day across all processes
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO page_usage (day, user, pages) VALUES (?, ?, ?) "
+                "ON CONFLICT (day, user) DO UPDATE SET pages = pages + excluded.pages",
+                [(day, user, pages) for user, pages in deltas.items() if pages]
+            )
+            # Yesterday's rows are only kept for reporting; a week is plenty
+            cutoff = _utc_day(time.time() - 7 * 86400)
+            self._conn.execute("DELETE FROM page_usage WHERE day < ?", (cutoff,))
+            return dict(self._conn.execute("SELECT user, pages FROM page_usage WHERE day = ?", (day,)).fetchall())
+
+class RateLimiter:
+    """
+    Token buckets for request rate and counters for daily pages, per user
+
+    All state is read and written on the event loop thread only, so checks
+    take no locks: a check is a dict lookup and a little arithmetic. Page
+    counts are flushed to SQLite every RATE_LIMIT_PERSIST_SECONDS from a
+    thread, and the totals read back include other API processes.
+    """
+
+    def __init__(self, requests_per_minute=None, burst=None, daily_pages=None, store=None):
+        self.rate = (requests_per_minute if requests_per_minute is not None
+                     else settings.RATE_LIMIT_REQUESTS_PER_MINUTE) / 60.0
+        self.burst = burst or settings.RATE_LIMIT_BURST
+        self.daily_pages = daily_pages if daily_pages is not None else settings.DAILY_PAGE_QUOTA
+        self.store = store or PageUsageStore()
+        self.persist_seconds = settings.RATE_LIMIT_PERSIST_SECONDS
+        # user -> [tokens, last refill]
+        self._buckets = {}
+        self._day = _utc_day()
+        self._day_ends_at = time.time() + _seconds_to_utc_midnight()
+        # user -> pages already in the store (all processes), and pages not yet flushed
+        self._persisted = self.store.add_and_read(self._day, {})
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._flushing = False
+        self._flush_task = None
+        self._token_users = {}
+
+    def user_for(self, scope):
+        """Username from the bearer token, or the client address for anonymous requests"""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                token = value.decode("latin-1").partition(" ")[2]
+                cached = self._token_users.get(token)
+                if cached is None:
+                    claims = auth_system.decode_token(token)
+                    if not claims or not claims.get("sub"):
+                        break
+                    if len(self._token_users) >= TOKEN_CACHE_SIZE:
+                        self._token_users.clear()
+                    cached = self._token_users[token] = (claims["sub"], claims.get("exp", 0))
+                if cached[1] and cached[1] < time.time():
+                    break
+                return cached[0]
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else "ip:unknown"
+
+    def check_rate(self, user, now):
+        """Take one request token; return 0 if allowed, else seconds until one is available"""
+        if self.rate <= 0:
+            return 0
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            bucket = self._buckets[user] = [float(self.burst), now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0
+        bucket[0] = tokens
+        return max(1, math.ceil((1 - tokens) / self.rate))
+
+    def pages_used(self, user):
+        return self._persisted.get(user, 0) + self._pending.get(user, 0)
+
+    def check_quota(self, user):
+        """Return 0 if the user has pages left today, else seconds until the quota resets"""
+        self._roll_day()
+        if self.daily_pages <= 0 or self.pages_used(user) < self.daily_pages:
+            return 0
+        return _seconds_to_utc_midnight()
+
+    def charge_pages(self, user, pages):
+        """Count pages returned to a user against today's quota"""
+        self._roll_day()
+        self._pending[user] = self._pending.get(user, 0) + pages
+
+    def _roll_day(self):
+        if time.time() < self._day_ends_at:
+            return
+        self._day = _utc_day()
+        self._day_ends_at = time.time() + _seconds_to_utc_midnight()
+        self._persisted = {}
+        self._pending = {}
+
+    def maybe_flush(self, now):
+        """Start a background flush of pending page counts if one is due"""
+        if self._flushing or now - self._last_flush < self.persist_seconds:
+            return
+        self._flushing = True
+        self._last_flush = now
+        # Keep a reference: the loop only holds tasks weakly
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Persist pending page counts and pick up other processes' totals"""
+        day, deltas = self._day, self._pending
+        self._pending = {}
+        try:
+            totals = await asyncio.get_running_loop().run_in_executor(None, self.store.add_and_read, day, deltas)
+            if day == self._day:
+                self._persisted = totals
+        except Exception as e:
+            logger.error(f"❌ Failed to persist page usage: {str(e)}")
+            if day == self._day:
+                for user, pages in deltas.items():
+                    self._pending[user] = self._pending.get(user, 0) + pages
+        finally:
+            self._flushing = False
+
+    def usage(self, user):
+        """Current limits and usage for one user"""
+        bucket = self._buckets.get(user)
+        return {
+            "requests_per_minute": round(self.rate * 60),
+            "burst": self.burst,
+            "request_tokens": round(bucket[0], 2) if bucket else self.burst,
+            "daily_page_quota": self.daily_pages,
+            "pages_used_today": self.pages_used(user),
+            "quota_resets_in_seconds": _seconds_to_utc_midnight(),
+        }
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing RateLimiter limits with 429 and Retry-After
+
+    Endpoints that return analyses set request.state.pages_processed; the
+    middleware charges those pages to the caller when the response is done.
+    """
+
+    def __init__(self, app, limiter=None):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        if self.limiter is None:
+            self.limiter = get_rate_limiter()
+        limiter = self.limiter
+        now = time.monotonic()
+        limiter.maybe_flush(now)
+        user = limiter.user_for(scope)
+
+        retry_after = limiter.check_rate(user, now)
+        if retry_after:
+            await self._reject(scope, receive, send, retry_after, "Rate limit exceeded, slow down")
+            return
+        if QUOTA_ROUTES.match(scope["path"]):
+            retry_after = limiter.check_quota(user)
+            if retry_after:
+                await self._reject(scope, receive, send, retry_after,
+                                   f"Daily page quota of {limiter.daily_pages} pages used up")
+                return
+
+        state = scope.setdefault("state", {})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pages = state.get("pages_processed")
+            if pages:
+                limiter.charge_pages(user, pages)
+
+    async def _reject(self, scope, receive, send, retry_after, message):
+        response = JSONResponse(status_code=429, content={"detail": message},
+                                headers={"Retry-After": str(retry_after)})
+        await response(scope, receive, send)
+
+_rate_limiter = None
+
+def get_rate_limiter():
+    """Process-wide rate limiter, created on first use"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -93,6 +93,13 @@ class AuthSystem:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
+    def decode_token(self, token: str):
+        """Decode a JWT signed by this system and return its claims (None if invalid or expired)"""
+        try:
+            return jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError:
+            return None
+    
     def verify_token(self, token: str):
         """Verify JWT token"""
         try:
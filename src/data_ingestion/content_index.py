@@ -0,0 +1,112 @@
+"""
+Local index of document names to content hashes for deduplicated uploads
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+CONTENT_BLOB_PATTERN = re.compile(r"^(?P<prefix>.*?)sha256/[0-9a-f]{64}(\.[^/]*)?$")
+
+def file_sha256(file_path):
+    """Stream a file through SHA-256 without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_blob_name(sha256, file_name=""):
+    """Blob name under which content with this hash is stored"""
+    extension = os.path.splitext(file_name)[1].lower()
+    return f"sha256/{sha256}{extension}"
+
+def content_blob_prefix(blob_name):
+    """Namespace a content-addressed blob is stored under, or None for any other blob name"""
+    match = CONTENT_BLOB_PATTERN.match(blob_name)
+    return match.group("prefix") if match else None
+
+class ContentIndex:
+    """
+    SQLite-backed mapping of document names to content hashes
+
+    Knowing which hashes are already stored lets uploads of previously seen
+    content skip the network entirely.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "content_index.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS names (
+                name TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                blob_name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS names_sha256 ON names (sha256);
+            CREATE INDEX IF NOT EXISTS names_blob_name ON names (blob_name);
+        """)
+
+    def record(self, name, sha256, blob_name, size):
+        """Point a document name at the content it currently holds"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO names (name, sha256, blob_name, size, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, sha256, blob_name, size, datetime.utcnow().isoformat())
+            )
+
+    def lookup(self, name):
+        """Return the mapping for a document name, or None if it is unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, sha256, blob_name, size, updated_at FROM names WHERE name = ?",
+                (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("name", "sha256", "blob_name", "size", "updated_at"), row))
+
+    def has_blob(self, blob_name):
+        """True if some name already points at this content blob"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM names WHERE blob_name = ? LIMIT 1", (blob_name,)
+            ).fetchone()
+        return row is not None
+
+    def has_content(self, sha256):
+        """True if content with this hash has been stored before"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM names WHERE sha256 = ? LIMIT 1", (sha256,)
+            ).fetchone()
+        return row is not None
+
+    def names_for(self, sha256):
+        """All document names that share this content"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM names WHERE sha256 = ? ORDER BY name", (sha256,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def names_for_blob(self, blob_name):
+        """All document names that point at this content blob, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM names WHERE blob_name = ? ORDER BY updated_at, name", (blob_name,)
+            ).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,140 @@
+"""
+Hash sharding of blobs across several containers, optionally in several storage accounts
+
+A blob's shard is chosen by rendezvous (highest random weight) hashing of
+its name against each shard's spec. The mapping is stable across processes
+and restarts, and adding a shard only moves the blobs that now hash to it
+(about 1/N of them) - see scripts/rebalance_shards.py.
+"""
+import hashlib
+import os
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob import BlobServiceClient, generate_blob_sas
+from config.settings import settings
+from src.data_ingestion.http_transport import get_http_transport
+import logging
+
+logger = logging.getLogger(__name__)
+
+def parse_shards(spec, default_connection_string=None):
+    """
+    Parse STORAGE_SHARDS into StorageShards
+
+    Entries are comma separated: "container" lives in the default account,
+    "container@ENV_VAR" in the account whose connection string is in the
+    environment variable ENV_VAR.
+
+    Returns:
+        list: StorageShard objects, in the order given
+    """
+    default_connection_string = default_connection_string or settings.AZURE_STORAGE_CONNECTION_STRING
+    shards = []
+    for entry in filter(None, (part.strip() for part in (spec or "").split(","))):
+        container, _, account_var = entry.partition("@")
+        connection_string = default_connection_string
+        if account_var:
+            connection_string = os.getenv(account_var)
+            if not connection_string:
+                raise ValueError(f"Storage shard {entry}: environment variable {account_var} is not set")
+        shards.append(StorageShard(entry, connection_string, container))
+    return shards
+
+def _score(shard_name, blob_name):
+    digest = hashlib.blake2b(f"{shard_name}\0{blob_name}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+class StorageShard:
+    """One container in one storage account; clients are created on first use"""
+
+    def __init__(self, name, connection_string, container_name):
+        """
+        Args:
+            name (str): Shard spec as configured; it is what blob names are hashed against,
+                so it must not change while the shard holds data
+            connection_string (str): Storage account connection string
+            container_name (str): Container holding this shard's blobs
+        """
+        self.name = name
+        self.connection_string = connection_string
+        self.container_name = container_name
+        self._service_client = None
+        self._container_client = None
+        self._tuned_container_clients = {}
+
+    @property
+    def service_client(self):
+        if self._service_client is None:
+            self._service_client = BlobServiceClient.from_connection_string(
+                self.connection_string, transport=get_http_transport()
+            )
+        return self._service_client
+
+    @property
+    def container_client(self):
+        if self._container_client is None:
+            self._container_client = self.service_client.get_container_client(self.container_name)
+        return self._container_client
+
+    def ensure_container(self):
+        """Create the container if it does not exist yet"""
+        try:
+            self.container_client.create_container()
+            logger.info(f"✅ Container '{self.container_name}' created successfully")
+        except ResourceExistsError:
+            logger.info(f"✅ Container '{self.container_name}' already exists")
+
+    def tuned_container_client(self, block_size, single_put_size):
+        """
+        Container client whose transfers use the given block size and single-put threshold
+
+        Both values are client configuration in the SDK rather than per-call
+        arguments, so one client is kept per combination in use.
+        """
+        key = (block_size, single_put_size)
+        if key not in self._tuned_container_clients:
+            service_client = BlobServiceClient.from_connection_string(
+                self.connection_string,
+                max_block_size=block_size,
+                max_single_put_size=single_put_size,
+                transport=get_http_transport()
+            )
+            self._tuned_container_clients[key] = service_client.get_container_client(self.container_name)
+        return self._tuned_container_clients[key]
+
+    def sas_url(self, blob_name, permission, expiry):
+        """Sign a blob-scoped SAS token and append it to the blob URL"""
+        sas_token = generate_blob_sas(
+            account_name=self.service_client.account_name,
+            container_name=self.container_name,
+            blob_name=blob_name,
+            account_key=self.service_client.credential.account_key,
+            permission=permission,
+            expiry=expiry
+        )
+        return f"{self.container_client.get_blob_client(blob_name).url}?{sas_token}"
+
+    def __repr__(self):
+        return f"StorageShard({self.name!r})"
+
+class ShardMap:
+    """Maps blob names to StorageShards by rendezvous hashing"""
+
+    def __init__(self, shards):
+        if not shards:
+            raise ValueError("At least one storage shard is required")
+        names = [shard.name for shard in shards]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate storage shards in {', '.join(names)}")
+        self.shards = list(shards)
+
+    def shard_for(self, blob_name):
+        """The shard that owns a blob name"""
+        if len(self.shards) == 1:
+            return self.shards[0]
+        return max(self.shards, key=lambda shard: _score(shard.name, blob_name))
+
+    def __iter__(self):
+        return iter(self.shards)
+
+    def __len__(self):
+        return len(self.shards)
@@ -1,54 +1,141 @@
+import base64
+import hashlib
+import heapq
 import os
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from concurrent.futures import ThreadPoolExecutor
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import BlobBlock, BlobSasPermissions
 from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
 from config.settings import settings
+from src.data_ingestion.content_index import ContentIndex, file_sha256, content_blob_name, content_blob_prefix
+from src.data_ingestion.shards import ShardMap, StorageShard, parse_shards
+from src.data_processing.deadlines import storage_options
 import logging
 
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+
+# Metadata key holding the name a content-addressed blob was uploaded under
+ORIGINAL_NAME_METADATA = "original_name"
+
+# Upload tuning by file size: (up to size, max_concurrency, block size, single-put threshold).
+# Small files go up in one PUT; larger files are split into blocks that are staged
+# over several connections at once so big scans saturate the link.
+UPLOAD_TUNING_TIERS = [
+    (8 * MB, 1, 4 * MB, 8 * MB),
+    (64 * MB, 4, 4 * MB, 8 * MB),
+    (512 * MB, 8, 8 * MB, 8 * MB),
+    (None, 16, 16 * MB, 8 * MB),
+]
+
+def user_prefix(username):
+    """Blob name prefix under which a user's documents are stored"""
+    return f"{settings.USER_BLOB_PREFIX}{username}/"
+
+def blob_owner(blob_name):
+    """
+    Split a blob name into its owner and the name within the owner's namespace
+
+    Returns:
+        tuple: (username, document name), or (None, blob_name) outside any user namespace
+    """
+    if blob_name.startswith(settings.USER_BLOB_PREFIX):
+        owner, separator, name = blob_name[len(settings.USER_BLOB_PREFIX):].partition("/")
+        if separator and owner:
+            return owner, name
+    return None, blob_name
+
 class AzureStorageClient:
-    def __init__(self):
-        self.connection_string = settings.AZURE_STORAGE_CONNECTION_STRING
-        self.container_name = settings.STORAGE_CONTAINER
+    def __init__(self, connection_string=None, container_name=None, shards=None):
+        """
+        Args:
+            connection_string (str): Storage account (default AZURE_STORAGE_CONNECTION_STRING)
+            container_name (str): Use this one container instead of the configured shards
+            shards (list): StorageShards to use instead of STORAGE_SHARDS (optional)
+        """
+        self.connection_string = connection_string or settings.AZURE_STORAGE_CONNECTION_STRING
+        if shards is None:
+            if container_name or not settings.STORAGE_SHARDS:
+                container_name = container_name or settings.STORAGE_CONTAINER
+                shards = [StorageShard(container_name, self.connection_string, container_name)]
+            else:
+                shards = parse_shards(settings.STORAGE_SHARDS, self.connection_string)
+        self.shards = ShardMap(shards)
+        self.container_name = self.shards.shards[0].container_name
         self.blob_service_client = None
         self.container_client = None
+        self._content_index = None
+        self._claims_container_client = None
         self._initialize_clients()
     
     def _initialize_clients(self):
-        """Initialize Azure Storage clients and create container if it doesn't exist"""
+        """Initialize Azure Storage clients and create the shard containers if they don't exist"""
         try:
-            self.blob_service_client = BlobServiceClient.from_connection_string(
-                self.connection_string
-            )
+            for shard in self.shards:
+                shard.ensure_container()
             
-            # Check if container exists, create if it doesn't
-            try:
-                self.container_client = self.blob_service_client.get_container_client(
-                    self.container_name
-                )
-                # Test if container exists by getting properties
-                self.container_client.get_container_properties()
-                logger.info(f"✅ Container '{self.container_name}' already exists")
-            except Exception:
-                # Container doesn't exist, create it
-                logger.info(f"📦 Creating container '{self.container_name}'...")
-                self.container_client = self.blob_service_client.create_container(
-                    self.container_name
-                )
-                logger.info(f"✅ Container '{self.container_name}' created successfully")
+            # The first shard's account also holds the claims container
+            primary = self.shards.shards[0]
+            self.blob_service_client = primary.service_client
+            self.container_client = primary.container_client
             
-            logger.info("✅ Azure Storage clients initialized successfully")
+            logger.info(f"✅ Azure Storage clients initialized successfully ({len(self.shards)} "
+                        f"shard{'s' if len(self.shards) != 1 else ''})")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Azure Storage clients: {str(e)}")
             raise
     
-    def upload_file(self, file_path, blob_name=None):
+    def _blob_client(self, blob_name):
+        """Client for a blob in the shard that owns its name"""
+        return self.shards.shard_for(blob_name).container_client.get_blob_client(blob_name)
+    
+    def blob_url(self, blob_name):
+        """URL of a blob (without a SAS token)"""
+        return self._blob_client(blob_name).url
+    
+    def get_upload_tuning(self, file_size):
+        """
+        Pick upload parallelism and chunking for a file of the given size
+
+        Values configured in settings (UPLOAD_MAX_CONCURRENCY, UPLOAD_BLOCK_SIZE_MB,
+        UPLOAD_SINGLE_PUT_MB) override the size-based defaults.
+
+        Args:
+            file_size (int): Size of the file in bytes
+
+        Returns:
+            dict: max_concurrency, block_size and single_put_size in bytes
+        """
+        for max_size, concurrency, block_size, single_put_size in UPLOAD_TUNING_TIERS:
+            if max_size is None or file_size <= max_size:
+                break
+        if settings.UPLOAD_MAX_CONCURRENCY:
+            concurrency = settings.UPLOAD_MAX_CONCURRENCY
+        if settings.UPLOAD_BLOCK_SIZE_MB:
+            block_size = settings.UPLOAD_BLOCK_SIZE_MB * MB
+        if settings.UPLOAD_SINGLE_PUT_MB:
+            single_put_size = settings.UPLOAD_SINGLE_PUT_MB * MB
+        return {
+            "max_concurrency": concurrency,
+            "block_size": block_size,
+            "single_put_size": single_put_size,
+        }
+
+    def upload_file(self, file_path, blob_name=None, max_concurrency=None,
+                    block_size=None, single_put_size=None, deadline=None, metadata=None):
         """
         Upload a file to Azure Blob Storage
         
         Args:
             file_path (str): Local path to the file
             blob_name (str): Name for the blob in storage (optional)
+            max_concurrency (int): Parallel block uploads (optional, tuned by size)
+            block_size (int): Block size in bytes (optional, tuned by size)
+            single_put_size (int): Largest size sent as one PUT (optional, tuned by size)
+            deadline (Deadline): Caller's budget; the upload stops when it runs out (optional)
+            metadata (dict): Metadata to store on the blob (optional)
         
         Returns:
             str: URL of the uploaded blob
@@ -58,18 +145,164 @@ class AzureStorageClient:
         
         try:
             with open(file_path, "rb") as data:
-                blob_client = self.container_client.get_blob_client(blob_name)
-                blob_client.upload_blob(data, overwrite=True)
+                return self.upload_stream(
+                    data, blob_name, os.path.getsize(file_path),
+                    max_concurrency=max_concurrency, block_size=block_size,
+                    single_put_size=single_put_size, deadline=deadline, metadata=metadata
+                )
+        except Exception as e:
+            logger.error(f"❌ Failed to upload file {file_path}: {str(e)}")
+            raise
+
+    def upload_stream(self, stream, blob_name, length, progress_hook=None, max_concurrency=None,
+                      block_size=None, single_put_size=None, deadline=None, metadata=None):
+        """
+        Upload from a readable file-like object (e.g. an in-memory upload) without copying it
+        
+        Args:
+            stream (file-like): Readable binary stream positioned at the start of the data
+            blob_name (str): Name for the blob in storage
+            length (int): Number of bytes to upload
+            progress_hook (callable): Called as progress_hook(bytes_sent, total) (optional)
+            max_concurrency (int): Parallel block uploads (optional, tuned by size)
+            block_size (int): Block size in bytes (optional, tuned by size)
+            single_put_size (int): Largest size sent as one PUT (optional, tuned by size)
+            deadline (Deadline): Caller's budget; the upload stops when it runs out (optional)
+            metadata (dict): Metadata to store on the blob (optional)
+        
+        Returns:
+            str: URL of the uploaded blob
+        """
+        try:
+            tuning = self.get_upload_tuning(length)
+            container_client = self.shards.shard_for(blob_name).tuned_container_client(
+                block_size or tuning["block_size"],
+                single_put_size or tuning["single_put_size"]
+            )
+            blob_client = container_client.get_blob_client(blob_name)
+            blob_client.upload_blob(
+                stream, length=length, overwrite=True,
+                max_concurrency=max_concurrency or tuning["max_concurrency"],
+                progress_hook=progress_hook, metadata=metadata, **storage_options(deadline)
+            )
             
-            blob_url = f"https://{self.blob_service_client.account_name}.blob.core.windows.net/{self.container_name}/{blob_name}"
+            blob_url = blob_client.url
             logger.info(f"✅ File uploaded successfully: {blob_name}")
             logger.info(f"📎 Blob URL: {blob_url}")
             return blob_url
             
         except Exception as e:
-            logger.error(f"❌ Failed to upload file {file_path}: {str(e)}")
+            logger.error(f"❌ Failed to upload {blob_name}: {str(e)}")
+            raise
+
+    @property
+    def content_index(self):
+        """Name to content-hash mapping, opened on first use"""
+        if self._content_index is None:
+            self._content_index = ContentIndex()
+        return self._content_index
+
+    def upload_content_addressed(self, file_path, name=None, deadline=None, prefix=""):
+        """
+        Upload a file under its SHA-256 hash, skipping the upload if the content is already stored
+        
+        The document name is recorded in the content index so it can still be
+        resolved with resolve_blob_name(). Identical content under different
+        names is stored (and analyzed) once, and a new file with an existing
+        name no longer overwrites the old content.
+        
+        Args:
+            file_path (str): Local path to the file
+            name (str): Document name to map to the content (optional)
+            deadline (Deadline): Caller's budget; the upload stops when it runs out (optional)
+            prefix (str): Namespace for both the content blob and the name, e.g. user_prefix(...);
+                content is only deduplicated within one namespace (optional)
+        
+        Returns:
+            dict: blob_name, sha256, blob_url and whether the upload was deduplicated
+        """
+        if not name:
+            name = os.path.basename(file_path)
+        
+        try:
+            sha256 = file_sha256(file_path)
+            blob_name = prefix + content_blob_name(sha256, name)
+            blob_client = self._blob_client(blob_name)
+            
+            # The local index answers without a round trip; exists() covers content
+            # uploaded by other nodes
+            deduplicated = self.content_index.has_blob(blob_name) or blob_client.exists(**storage_options(deadline))
+            if deduplicated:
+                logger.info(f"♻️ Content of {name} already stored as {blob_name}, skipping upload")
+            else:
+                # Metadata values must be ASCII, so the name is stored percent-encoded
+                self.upload_file(file_path, blob_name, deadline=deadline,
+                                 metadata={ORIGINAL_NAME_METADATA: quote(name)})
+            
+            self.content_index.record(prefix + name, sha256, blob_name, os.path.getsize(file_path))
+            return {
+                "blob_name": blob_name,
+                "sha256": sha256,
+                "blob_url": blob_client.url,
+                "deduplicated": deduplicated
+            }
+        except Exception as e:
+            logger.error(f"❌ Failed content-addressed upload of {file_path}: {str(e)}")
             raise
 
+    def resolve_blob_name(self, name):
+        """
+        Map a document name to the blob that holds its content
+        
+        Args:
+            name (str): Document name as uploaded
+        
+        Returns:
+            str: Content-addressed blob name if the name is in the index, otherwise the name itself
+        """
+        entry = self.content_index.lookup(name)
+        return entry["blob_name"] if entry else name
+
+    def document_name(self, blob_name, metadata=None, fetch_metadata=False):
+        """
+        Map a blob to the document name it was uploaded under (the inverse of resolve_blob_name)
+        
+        Content-addressed blobs are named after their hash; the uploaded name
+        is kept in the blob's metadata and in the local content index. When
+        identical content was uploaded under several names, the first one is
+        returned.
+        
+        Args:
+            blob_name (str): Blob name, e.g. from list_blobs or a search hit
+            metadata (dict): The blob's metadata, if already listed (optional)
+            fetch_metadata (bool): Read the metadata from storage when the index does not know the blob
+        
+        Returns:
+            str: Namespaced document name, or the blob name itself if none is known
+        """
+        prefix = content_blob_prefix(blob_name)
+        if prefix is None:
+            return blob_name
+        original_name = (metadata or {}).get(ORIGINAL_NAME_METADATA)
+        if original_name:
+            return prefix + unquote(original_name)
+        names = self.content_index.names_for_blob(blob_name)
+        if names:
+            return names[0]
+        if fetch_metadata:
+            try:
+                original_name = (self._blob_client(blob_name).get_blob_properties().metadata or {}).get(
+                    ORIGINAL_NAME_METADATA)
+            except ResourceNotFoundError:
+                original_name = None
+            if original_name:
+                return prefix + unquote(original_name)
+        return blob_name
+
+    def _blob_sas_url(self, blob_name, permission, expiry):
+        """Sign a blob-scoped SAS token and append it to the blob URL"""
+        return self.shards.shard_for(blob_name).sas_url(blob_name, permission, expiry)
+
     def generate_sas_url(self, blob_name, expiry_hours=1):
         """
         Generate a SAS URL for temporary secure access to a blob
@@ -82,31 +315,190 @@ class AzureStorageClient:
             str: SAS URL for secure access
         """
         try:
-            # Create SAS token
-            sas_token = generate_blob_sas(
-                account_name=self.blob_service_client.account_name,
-                container_name=self.container_name,
-                blob_name=blob_name,
-                account_key=self.blob_service_client.credential.account_key,
-                permission=BlobSasPermissions(read=True),
-                expiry=datetime.utcnow() + timedelta(hours=expiry_hours)
+            sas_url = self._blob_sas_url(
+                blob_name,
+                BlobSasPermissions(read=True),
+                datetime.utcnow() + timedelta(hours=expiry_hours)
             )
             
-            # Construct SAS URL
-            sas_url = f"https://{self.blob_service_client.account_name}.blob.core.windows.net/{self.container_name}/{blob_name}?{sas_token}"
-            
             logger.info(f"🔐 Generated SAS URL for {blob_name} (expires in {expiry_hours} hours)")
             return sas_url
             
         except Exception as e:
             logger.error(f"❌ Failed to generate SAS URL for {blob_name}: {str(e)}")
             raise
+
+    def generate_upload_sas_url(self, blob_name, expiry_minutes=15):
+        """
+        Generate a short-lived, write-only SAS URL so a client can upload a blob directly
+        
+        The token is scoped to this one blob and cannot read or list anything.
+        
+        Args:
+            blob_name (str): Name of the blob to be created
+            expiry_minutes (int): Minutes until SAS token expires
+        
+        Returns:
+            str: SAS URL accepting Put Blob / Put Block / Put Block List
+        """
+        try:
+            sas_url = self._blob_sas_url(
+                blob_name,
+                BlobSasPermissions(create=True, write=True),
+                datetime.utcnow() + timedelta(minutes=expiry_minutes)
+            )
+            
+            logger.info(f"🔐 Generated upload SAS URL for {blob_name} (expires in {expiry_minutes} minutes)")
+            return sas_url
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to generate upload SAS URL for {blob_name}: {str(e)}")
+            raise
+
+    @staticmethod
+    def _block_id(block_index):
+        """Block IDs must have the same length within a blob, so the index is zero-padded"""
+        return base64.b64encode(f"{block_index:08d}".encode()).decode()
+
+    def stage_block(self, blob_name, block_index, data):
+        """
+        Stage one numbered chunk of a blob without committing it
+        
+        Staged blocks stay on the service (for up to 7 days) until the block
+        list is committed, so an interrupted transfer only resends missing chunks.
+        
+        Args:
+            blob_name (str): Name of the blob being assembled
+            block_index (int): Zero-based chunk number
+            data (bytes): Chunk content
+        """
+        try:
+            blob_client = self._blob_client(blob_name)
+            blob_client.stage_block(self._block_id(block_index), data, length=len(data))
+        except Exception as e:
+            logger.error(f"❌ Failed to stage block {block_index} of {blob_name}: {str(e)}")
+            raise
+
+    def get_staged_block_indexes(self, blob_name):
+        """
+        List the chunk numbers already staged (but not committed) for a blob
+        
+        Args:
+            blob_name (str): Name of the blob being assembled
+        
+        Returns:
+            set: Zero-based chunk numbers present on the service
+        """
+        try:
+            blob_client = self._blob_client(blob_name)
+            _, uncommitted = blob_client.get_block_list("uncommitted")
+            return {int(base64.b64decode(block.id).decode()) for block in uncommitted}
+        except ResourceNotFoundError:
+            # Nothing staged yet
+            return set()
+        except Exception as e:
+            logger.error(f"❌ Failed to get staged blocks of {blob_name}: {str(e)}")
+            raise
+
+    def commit_blocks(self, blob_name, block_count):
+        """
+        Commit chunks 0..block_count-1 as the content of a blob
+        
+        Args:
+            blob_name (str): Name of the blob being assembled
+            block_count (int): Number of chunks making up the blob
+        
+        Returns:
+            str: URL of the committed blob
+        """
+        try:
+            blob_client = self._blob_client(blob_name)
+            blob_client.commit_block_list(
+                [BlobBlock(block_id=self._block_id(i)) for i in range(block_count)]
+            )
+            logger.info(f"✅ Committed {block_count} blocks as {blob_name}")
+            return blob_client.url
+        except Exception as e:
+            logger.error(f"❌ Failed to commit blocks of {blob_name}: {str(e)}")
+            raise
+
+    def compute_blob_sha256(self, blob_name):
+        """
+        Stream a blob through SHA-256 without holding it in memory
+        
+        Args:
+            blob_name (str): Name of the blob
+        
+        Returns:
+            str: Hex digest of the blob content
+        """
+        try:
+            digest = hashlib.sha256()
+            downloader = self._blob_client(blob_name).download_blob()
+            for chunk in downloader.chunks():
+                digest.update(chunk)
+            return digest.hexdigest()
+        except Exception as e:
+            logger.error(f"❌ Failed to hash blob {blob_name}: {str(e)}")
+            raise
+
+    def delete_blob(self, blob_name):
+        """Delete a blob (and its snapshots) from the container"""
+        try:
+            self._blob_client(blob_name).delete_blob(delete_snapshots="include")
+            logger.info(f"🗑️ Deleted blob {blob_name}")
+        except Exception as e:
+            logger.error(f"❌ Failed to delete blob {blob_name}: {str(e)}")
+            raise
     
-    def list_blobs(self):
-        """List all blobs in the container"""
+    def get_blob_properties(self, blob_name, deadline=None):
+        """
+        Get the properties (size, ETag, content settings) of a blob
+
+        Args:
+            blob_name (str): Name of the blob
+            deadline (Deadline): Caller's budget (optional)
+
+        Returns:
+            BlobProperties: Properties of the blob
+        """
+        try:
+            blob_client = self._blob_client(blob_name)
+            return blob_client.get_blob_properties(**storage_options(deadline))
+        except Exception as e:
+            logger.error(f"❌ Failed to get properties for {blob_name}: {str(e)}")
+            raise
+
+    def list_blobs(self, name_starts_with=None, include_metadata=False):
+        """
+        List the blobs in every shard, optionally only those under a name prefix
+        
+        Shards are listed in parallel; each listing comes back sorted by name,
+        so the merged result is sorted by name too. The prefix is filtered by
+        the service, so listing one user's namespace (see user_prefix) costs
+        in proportion to that user's documents, not the whole container.
+        
+        Args:
+            name_starts_with (str): Only list blobs whose name starts with this (optional)
+            include_metadata (bool): Also return each blob's metadata, e.g. for document_name()
+        
+        Returns:
+            list: BlobProperties sorted by name
+        """
+        include = ["metadata"] if include_metadata else None
         try:
-            blobs = list(self.container_client.list_blobs())
-            logger.info(f"📁 Found {len(blobs)} blobs in container '{self.container_name}'")
+            def list_shard(shard):
+                return list(shard.container_client.list_blobs(name_starts_with=name_starts_with, include=include))
+            
+            if len(self.shards) == 1:
+                blobs = list_shard(self.shards.shards[0])
+            else:
+                workers = min(len(self.shards), settings.STORAGE_LIST_CONCURRENCY)
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="list-shard") as executor:
+                    listings = list(executor.map(list_shard, self.shards))
+                blobs = list(heapq.merge(*listings, key=lambda blob: blob.name))
+            logger.info(f"📁 Found {len(blobs)} blobs{f' under {name_starts_with}' if name_starts_with else ''} "
+                        f"in {len(self.shards)} container{'s' if len(self.shards) != 1 else ''}")
             for blob in blobs:
                 logger.info(f"   - {blob.name} (Size: {blob.size} bytes)")
             return blobs
@@ -114,6 +506,76 @@ class AzureStorageClient:
             logger.error(f"❌ Failed to list blobs: {str(e)}")
             raise
     
+    def _get_claims_container_client(self):
+        """Container holding the claim marker blobs, created on first use"""
+        if self._claims_container_client is None:
+            container_client = self.blob_service_client.get_container_client(settings.CLAIMS_CONTAINER)
+            try:
+                container_client.create_container()
+            except ResourceExistsError:
+                pass
+            self._claims_container_client = container_client
+        return self._claims_container_client
+
+    def acquire_claim(self, name, lease_seconds=None):
+        """
+        Take an exclusive lease on the claim marker for a document
+
+        The lease is on a zero-byte marker blob in the claims container, not
+        on the document itself, so the document stays writable while it is
+        processed. Blob leases last 15-60 seconds; an unrenewed lease expires
+        and the claim becomes free again.
+
+        Args:
+            name (str): Name of the document (blob) to claim
+            lease_seconds (int): Lease duration, 15-60 (default CLAIM_LEASE_SECONDS)
+
+        Returns:
+            BlobLeaseClient: Lease to renew and release, or None if another holder has it
+        """
+        lease_seconds = max(15, min(60, lease_seconds or settings.CLAIM_LEASE_SECONDS))
+        try:
+            blob_client = self._get_claims_container_client().get_blob_client(name)
+            try:
+                blob_client.upload_blob(b"", overwrite=False)
+            except (ResourceExistsError, HttpResponseError):
+                # Already there; a leased marker also rejects the write
+                pass
+            try:
+                return blob_client.acquire_lease(lease_duration=lease_seconds)
+            except HttpResponseError as e:
+                if e.status_code == 409:
+                    return None
+                raise
+        except Exception as e:
+            logger.error(f"❌ Failed to claim {name}: {str(e)}")
+            raise
+
+    def renew_claim(self, lease):
+        """
+        Renew a claim lease for another lease period
+
+        Args:
+            lease (BlobLeaseClient): Lease returned by acquire_claim
+
+        Returns:
+            bool: False if the lease expired and was taken by someone else
+        """
+        try:
+            lease.renew()
+            return True
+        except HttpResponseError as e:
+            logger.warning(f"⚠️ Could not renew claim lease {lease.id}: {str(e)}")
+            return False
+
+    def release_claim(self, lease):
+        """Release a claim lease so other nodes can take the document right away"""
+        try:
+            lease.release()
+        except HttpResponseError as e:
+            # Already expired or taken over; nothing left to release
+            logger.warning(f"⚠️ Could not release claim lease {lease.id}: {str(e)}")
+
     def test_connection(self):
         """Test the connection to Azure Storage"""
         try:
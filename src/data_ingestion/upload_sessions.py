@@ -0,0 +1,93 @@
+"""
+Persistent state of resumable (chunked) upload sessions
+"""
+import math
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+SESSION_FIELDS = ("upload_id", "owner", "blob_name", "size", "chunk_size", "status", "created_at")
+
+# Azure commits a block blob from at most this many blocks, one per chunk
+MAX_CHUNKS = 50000
+
+class UploadSessionStore:
+    """
+    SQLite-backed registry of resumable upload sessions
+
+    Only session metadata lives here; the chunks themselves are staged as
+    uncommitted blocks in Blob Storage, which is the source of truth for
+    which chunks have arrived. Sessions therefore survive API restarts.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "upload_sessions.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                upload_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                blob_name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+
+    def create(self, owner, blob_name, size, chunk_size):
+        """Open a new session and return it"""
+        session = {
+            "upload_id": uuid.uuid4().hex,
+            "owner": owner,
+            "blob_name": blob_name,
+            "size": size,
+            "chunk_size": chunk_size,
+            "status": "open",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO upload_sessions ({', '.join(SESSION_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                tuple(session[field] for field in SESSION_FIELDS)
+            )
+        logger.info(f"📦 Opened upload session {session['upload_id']} for {blob_name}")
+        return session
+
+    def get(self, upload_id):
+        """Return a session by id, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(SESSION_FIELDS)} FROM upload_sessions WHERE upload_id = ?",
+                (upload_id,)
+            ).fetchone()
+        return dict(zip(SESSION_FIELDS, row)) if row else None
+
+    def mark_committed(self, upload_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE upload_sessions SET status = 'committed' WHERE upload_id = ?", (upload_id,)
+            )
+
+def default_chunk_size(size):
+    """UPLOAD_CHUNK_SIZE_MB, grown where needed so a file of this size fits in MAX_CHUNKS chunks"""
+    return max(settings.UPLOAD_CHUNK_SIZE_MB * 1024 * 1024, math.ceil(size / MAX_CHUNKS))
+
+def chunk_count(session):
+    """Number of chunks a session's file is split into"""
+    return max(1, math.ceil(session["size"] / session["chunk_size"]))
+
+def expected_chunk_length(session, index):
+    """Exact length chunk ``index`` must have (the last one carries the remainder)"""
+    if index < chunk_count(session) - 1:
+        return session["chunk_size"]
+    return session["size"] - session["chunk_size"] * (chunk_count(session) - 1)
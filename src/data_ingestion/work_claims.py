@@ -0,0 +1,78 @@
+"""
+Cross-node work claims on blob leases, so one document is processed by one worker at a time
+"""
+import threading
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ClaimLost(Exception):
+    """Raised when a claim's lease expired before the work finished"""
+
+class WorkClaim:
+    """
+    A held claim on one document, renewed in the background until released
+
+    Use as a context manager. If renewal fails (network partition, process
+    paused past the lease), `lost` is set and another node may already have
+    taken the document, so results must not be written.
+    """
+
+    def __init__(self, storage_client, name, lease, lease_seconds):
+        self.storage_client = storage_client
+        self.name = name
+        self.lease = lease
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._released = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_loop, name=f"claim-{name}", daemon=True)
+        self._heartbeat.start()
+
+    def _renew_loop(self):
+        # Renew at a third of the lease so one failed renewal can still be retried in time
+        while not self._released.wait(self.lease_seconds / 3):
+            if not self.storage_client.renew_claim(self.lease):
+                if self._released.is_set():
+                    return
+                logger.warning(f"⚠️ Lost the claim on {self.name}")
+                self.lost.set()
+                return
+
+    def check(self):
+        """Raise ClaimLost if the lease ran out; call before writing results"""
+        if self.lost.is_set():
+            raise ClaimLost(f"Claim on {self.name} expired before the work finished")
+
+    def release(self):
+        """Stop renewing and give the document back"""
+        if self._released.is_set():
+            return
+        self._released.set()
+        self._heartbeat.join()
+        if not self.lost.is_set():
+            self.storage_client.release_claim(self.lease)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+def claim(storage_client, name, lease_seconds=None):
+    """
+    Try to claim a document for processing
+
+    Args:
+        storage_client (AzureStorageClient): Client whose account holds the claims container
+        name (str): Document (blob) name
+        lease_seconds (int): Lease duration, 15-60 (default CLAIM_LEASE_SECONDS)
+
+    Returns:
+        WorkClaim: Held claim, or None if another worker is processing the document
+    """
+    lease_seconds = max(15, min(60, lease_seconds or settings.CLAIM_LEASE_SECONDS))
+    lease = storage_client.acquire_claim(name, lease_seconds)
+    if lease is None:
+        return None
+    return WorkClaim(storage_client, name, lease, lease_seconds)
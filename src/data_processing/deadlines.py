@@ -0,0 +1,121 @@
+"""
+Request deadlines and cancellation passed down from the API into storage and analysis calls
+"""
+import math
+import threading
+import time
+from azure.core.pipeline.policies import SansIOHTTPPolicy
+
+class WorkAbandoned(Exception):
+    """The caller no longer wants the result; stop and release resources"""
+
+class DeadlineExceeded(WorkAbandoned):
+    """The caller's time budget ran out"""
+
+class ClientDisconnected(WorkAbandoned):
+    """The caller went away"""
+
+class Deadline:
+    """
+    Remaining time budget of a request, plus a cancellation flag
+
+    Shared by every caller waiting on the same work: the work lives until
+    the latest of their deadlines and is only cancelled once all of them
+    have abandoned it. Thread-safe, since the work runs in worker threads.
+    """
+
+    def __init__(self, seconds=None):
+        """
+        Args:
+            seconds (float): Time budget from now; None means no deadline
+        """
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self._waiters = 1
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def share(self, other):
+        """Another caller now waits on this work; keep it alive for the later of both deadlines"""
+        with self._lock:
+            self._waiters += 1
+            if self.expires_at is not None:
+                self.expires_at = None if other.expires_at is None else max(self.expires_at, other.expires_at)
+
+    def abandon(self):
+        """One caller went away; cancel the work when nobody is left waiting"""
+        with self._lock:
+            self._waiters -= 1
+            if self._waiters <= 0:
+                self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """Seconds left, or None without a deadline"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self):
+        """Raise ClientDisconnected or DeadlineExceeded if the work should stop"""
+        if self._cancelled.is_set():
+            raise ClientDisconnected("Client disconnected before the work finished")
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+    def timeout(self, default=None):
+        """
+        Whole seconds to pass as an Azure SDK timeout: the remaining budget,
+        capped by default (either may be None)
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        seconds = max(1, math.ceil(remaining))
+        return seconds if default is None else min(seconds, default)
+
+    def on_request(self, request):
+        """
+        Apply the deadline to an outgoing SDK request: refuse it once the work
+        is abandoned, otherwise never wait on the response longer than the budget
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is not None:
+            request.context.options["connection_timeout"] = max(1, remaining)
+            request.context.options["read_timeout"] = max(1, remaining)
+
+def storage_options(deadline):
+    """
+    Keyword arguments passing a deadline to an Azure Storage call
+
+    Storage clients take no custom pipeline policies, but run a per-call
+    raw_request_hook before sending (and before each block of a chunked
+    upload). With a time limit the call gets a single attempt bounded by
+    the budget: storage retries back off 15 s and more, longer than any
+    interactive deadline. timeout is the service-side limit in seconds.
+    """
+    if deadline is None:
+        return {}
+    options = {"raw_request_hook": deadline.on_request}
+    if deadline.expires_at is not None:
+        options["timeout"] = deadline.timeout()
+        options["retry_total"] = 0
+    return options
+
+class DeadlinePolicy(SansIOHTTPPolicy):
+    """
+    Azure SDK pipeline policy that stops requests of abandoned work
+
+    Pass deadline=<Deadline> to an SDK call. Long-running operation pollers
+    forward the call's keyword arguments to every status request, so once
+    the deadline passes or the caller disconnects, the next poll raises
+    instead of going out and the polling thread ends.
+    """
+
+    def on_request(self, request):
+        deadline = request.context.options.pop("deadline", None)
+        if deadline is not None:
+            deadline.on_request(request)
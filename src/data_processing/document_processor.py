@@ -1,101 +1,155 @@
 import os
+import time
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from azure.core.credentials import AzureKeyCredential
 from config.settings import settings
+from src.data_ingestion.http_transport import get_http_transport
+from src.data_processing.deadlines import DeadlinePolicy
+from src.data_processing.endpoint_pool import Endpoint, EndpointPool, configured_endpoints
 import logging
 
 logger = logging.getLogger(__name__)
 
+def flatten_result(result):
+    """
+    Convert an SDK AnalyzeResult into the plain dict returned by the API
+    
+    Args:
+        result (AnalyzeResult): Result of a Document Intelligence analysis
+    
+    Returns:
+        dict: Content, pages (with line text) and tables
+    """
+    analysis_result = {
+        "content": result.content,
+        "pages": [],
+        "tables": [],
+        "key_value_pairs": []
+    }
+    
+    # Extract pages
+    for page in result.pages:
+        page_data = {
+            "page_number": page.page_number,
+            "angle": page.angle,
+            "width": page.width,
+            "height": page.height,
+            "unit": page.unit,
+            "lines": [line.content for line in page.lines]
+        }
+        analysis_result["pages"].append(page_data)
+    
+    # Extract tables
+    for table in result.tables:
+        table_data = {
+            "row_count": table.row_count,
+            "column_count": table.column_count,
+            "cells": []
+        }
+        for cell in table.cells:
+            cell_data = {
+                "row_index": cell.row_index,
+                "column_index": cell.column_index,
+                "content": cell.content
+            }
+            table_data["cells"].append(cell_data)
+        analysis_result["tables"].append(table_data)
+    
+    return analysis_result
+
 class DocumentProcessor:
     def __init__(self):
-        self.endpoint = settings.AZURE_FORMRECOGNIZER_ENDPOINT
-        self.key = settings.AZURE_FORMRECOGNIZER_KEY
-        self.document_analysis_client = None
+        # Every configured resource; the first is AZURE_FORMRECOGNIZER_ENDPOINT
+        self.endpoints = [endpoint for endpoint, _ in configured_endpoints()]
+        self.endpoint = self.endpoints[0] if self.endpoints else None
+        self.pool = None
         self._initialize_client()
     
     def _initialize_client(self):
-        """Initialize Azure Document Intelligence client"""
+        """Initialize one Azure Document Intelligence client per configured resource"""
         try:
-            credential = AzureKeyCredential(self.key)
-            self.document_analysis_client = DocumentAnalysisClient(
-                endpoint=self.endpoint, credential=credential
-            )
-            logger.info("✅ Azure Document Intelligence client initialized successfully")
+            endpoints = [
+                Endpoint(endpoint, DocumentAnalysisClient(
+                    endpoint=endpoint, credential=AzureKeyCredential(key),
+                    per_call_policies=[DeadlinePolicy()], transport=get_http_transport()
+                ))
+                for endpoint, key in configured_endpoints()
+            ]
+            self.pool = EndpointPool(endpoints)
+            logger.info(f"✅ Azure Document Intelligence client initialized successfully "
+                        f"({len(endpoints)} endpoint{'s' if len(endpoints) != 1 else ''})")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Document Intelligence client: {str(e)}")
             raise
     
-    def analyze_document(self, document_url):
+    def analyze_document(self, document_url, deadline=None):
         """
         Analyze a document using Azure Document Intelligence
         
+        The analysis goes to the healthy endpoint with the fewest analyses in
+        flight; if that endpoint fails (throttled, unreachable, 5xx) it is
+        retried once on each of the other endpoints.
+        
         Args:
             document_url (str): URL of the document to analyze
+            deadline (Deadline): Budget of the caller (optional); polling stops as soon
+                as it runs out or the caller disconnects
         
         Returns:
             dict: Analysis results
         """
-        try:
-            logger.info(f"🔍 Analyzing document: {document_url}")
+        logger.info(f"🔍 Analyzing document: {document_url}")
+        tried = []
+        while True:
+            endpoint = self.pool.acquire(exclude=tried)
+            tried.append(endpoint)
+            started = time.monotonic()
+            try:
+                result = self._analyze(endpoint.client, document_url, deadline)
+            except Exception as e:
+                endpoint_fault = self.pool.release(endpoint, started, error=e)
+                if endpoint_fault and len(tried) < len(self.pool.endpoints):
+                    logger.warning(f"⚠️ Analysis failed on {endpoint.url}, trying another endpoint: {str(e)}")
+                    continue
+                logger.error(f"❌ Document analysis failed: {str(e)}")
+                raise
+            self.pool.release(endpoint, started, pages=len(result.pages))
             
-            poller = self.document_analysis_client.begin_analyze_document_from_url(
-                "prebuilt-read", document_url
-            )
-            result = poller.result()
+            analysis_result = flatten_result(result)
             
-            # Extract and structure the results
-            analysis_result = {
-                "content": result.content,
-                "pages": [],
-                "tables": [],
-                "key_value_pairs": []
-            }
-            
-            # Extract pages
-            for page in result.pages:
-                page_data = {
-                    "page_number": page.page_number,
-                    "angle": page.angle,
-                    "width": page.width,
-                    "height": page.height,
-                    "unit": page.unit,
-                    "lines": [line.content for line in page.lines]
-                }
-                analysis_result["pages"].append(page_data)
-            
-            # Extract tables
-            for table in result.tables:
-                table_data = {
-                    "row_count": table.row_count,
-                    "column_count": table.column_count,
-                    "cells": []
-                }
-                for cell in table.cells:
-                    cell_data = {
-                        "row_index": cell.row_index,
-                        "column_index": cell.column_index,
-                        "content": cell.content
-                    }
-                    table_data["cells"].append(cell_data)
-                analysis_result["tables"].append(table_data)
-            
-            logger.info(f"✅ Document analysis completed. Found {len(result.pages)} pages, {len(result.tables)} tables")
+            logger.info(f"✅ Document analysis completed. Found {len(analysis_result['pages'])} pages, {len(analysis_result['tables'])} tables")
             return analysis_result
-            
-        except Exception as e:
-            logger.error(f"❌ Document analysis failed: {str(e)}")
-            raise
+    
+    def _analyze(self, client, document_url, deadline):
+        if deadline is None:
+            poller = client.begin_analyze_document_from_url("prebuilt-read", document_url)
+            return poller.result()
+        
+        deadline.check()
+        poller = client.begin_analyze_document_from_url(
+            "prebuilt-read", document_url, deadline=deadline
+        )
+        # Wait in short steps so an abandoned request stops waiting right away;
+        # the poller's own next status request is refused by DeadlinePolicy
+        while not poller.done():
+            deadline.check()
+            poller.wait(timeout=0.5)
+        return poller.result()
+    
+    def stats(self):
+        """Per-endpoint load, health and throughput (see EndpointPool.stats)"""
+        return self.pool.stats()
     
     def test_connection(self):
         """Test connection to Azure Document Intelligence"""
         try:
-            # Use a simpler test - just check if we can create the client
+            # Use a simpler test - just check that a client is initialized and in rotation
             # The list_models method might not be available in all versions
-            if self.document_analysis_client:
+            if self.pool and self.pool.healthy_count():
                 logger.info("✅ Document Intelligence connection test: PASS")
                 return True
             else:
-                logger.error("❌ Document Intelligence client not initialized")
+                logger.error("❌ Document Intelligence client not initialized or no endpoint healthy")
                 return False
         except Exception as e:
             logger.error(f"❌ Document Intelligence connection test: FAILED - {str(e)}")
@@ -0,0 +1,212 @@
+"""
+Routing of analyses across several Document Intelligence resources
+
+Each resource caps its own transactions per second, so capacity grows by
+adding resources to AZURE_FORMRECOGNIZER_ENDPOINTS. Every analysis goes to
+the healthy endpoint with the fewest operations in flight; an endpoint that
+keeps failing (or is throttled) is ejected for a while and the analysis is
+retried on another one.
+"""
+import threading
+import time
+from collections import deque
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from config.settings import settings
+from src.data_processing.deadlines import WorkAbandoned
+import logging
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_WINDOW_SECONDS = 60
+LATENCY_SAMPLES = 1000
+
+def parse_endpoints(spec):
+    """Parse "https://a.example/=key1,https://b.example/=key2" into [(endpoint, key)]"""
+    endpoints = []
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        endpoint, _, key = part.rpartition("=")
+        endpoints.append((endpoint.strip(), key.strip()))
+    return endpoints
+
+def configured_endpoints():
+    """AZURE_FORMRECOGNIZER_ENDPOINT/KEY followed by AZURE_FORMRECOGNIZER_ENDPOINTS, without duplicates"""
+    endpoints = []
+    if settings.AZURE_FORMRECOGNIZER_ENDPOINT:
+        endpoints.append((settings.AZURE_FORMRECOGNIZER_ENDPOINT, settings.AZURE_FORMRECOGNIZER_KEY))
+    for endpoint, key in parse_endpoints(settings.AZURE_FORMRECOGNIZER_ENDPOINTS):
+        if endpoint not in [existing for existing, _ in endpoints]:
+            endpoints.append((endpoint, key))
+    return endpoints
+
+def endpoint_failure(error):
+    """
+    Seconds to eject an endpoint for after this error, 0 if it only counts
+    towards ejection, or None if the error is not the endpoint's fault
+    (bad document, caller gave up)
+    """
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return 0
+    if isinstance(error, HttpResponseError):
+        status = getattr(error, "status_code", None)
+        if status == 429:
+            # Still throttled after the SDK's own retries: rest it for as long as it asks
+            retry_after = None
+            if error.response is not None:
+                retry_after = error.response.headers.get("Retry-After")
+            try:
+                return max(1, float(retry_after)) if retry_after else settings.DI_EJECT_SECONDS
+            except ValueError:
+                return settings.DI_EJECT_SECONDS
+        if status is None or status >= 500 or status in (401, 403):
+            return 0
+    return None
+
+class Endpoint:
+    """One Document Intelligence resource and its counters (guarded by the pool lock)"""
+
+    def __init__(self, url, client):
+        self.url = url
+        self.client = client
+        self.outstanding = 0
+        self.started = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.abandoned = 0
+        self.pages = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.last_error = None
+        self._completed = deque()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def healthy(self, now):
+        return now >= self.ejected_until
+
+class EndpointPool:
+    """Least-outstanding routing with health ejection over a list of Endpoints"""
+
+    def __init__(self, endpoints, eject_after_failures=None, eject_seconds=None):
+        """
+        Args:
+            endpoints (list): Endpoint objects
+            eject_after_failures (int): Consecutive failures that take an endpoint out of rotation
+            eject_seconds (float): How long an ejected endpoint stays out
+        """
+        if not endpoints:
+            raise ValueError("At least one Document Intelligence endpoint is required")
+        self.endpoints = endpoints
+        self.eject_after_failures = eject_after_failures or settings.DI_EJECT_AFTER_FAILURES
+        self.eject_seconds = eject_seconds or settings.DI_EJECT_SECONDS
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude=()):
+        """
+        Pick the endpoint for the next analysis and count it as outstanding
+
+        Healthy endpoints with the fewest operations in flight win, then the
+        one used least. If every candidate is ejected, the one due back
+        first is used rather than failing the analysis outright.
+
+        Args:
+            exclude (iterable): Endpoints already tried for this analysis
+
+        Returns:
+            Endpoint: The chosen endpoint, or None if all were excluded
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if e.healthy(now)]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: (e.outstanding, e.started))
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.started += 1
+            return endpoint
+
+    def release(self, endpoint, started, pages=None, error=None):
+        """
+        Record the outcome of an analysis sent to an endpoint
+
+        Args:
+            endpoint (Endpoint): Endpoint returned by acquire()
+            started (float): time.monotonic() when the analysis was sent
+            pages (int): Pages analyzed, on success
+            error (Exception): The failure, if any
+
+        Returns:
+            bool: True if the error was the endpoint's fault (worth trying another one)
+        """
+        now = time.monotonic()
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.succeeded += 1
+                endpoint.pages += pages or 0
+                endpoint.consecutive_failures = 0
+                endpoint._completed.append(now)
+                while endpoint._completed[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                    endpoint._completed.popleft()
+                endpoint._latencies.append(now - started)
+                return False
+
+            if isinstance(error, WorkAbandoned):
+                endpoint.abandoned += 1
+                return False
+            endpoint.failed += 1
+            eject_for = endpoint_failure(error)
+            if eject_for is None:
+                return False
+            endpoint.consecutive_failures += 1
+            endpoint.last_error = str(error)[:200]
+            if not eject_for and endpoint.consecutive_failures >= self.eject_after_failures:
+                eject_for = self.eject_seconds
+            if eject_for and endpoint.healthy(now):
+                endpoint.ejected_until = now + eject_for
+                endpoint.ejections += 1
+                logger.warning(f"⚠️ Taking {endpoint.url} out of rotation for {eject_for:.0f}s: {endpoint.last_error}")
+            return True
+
+    def healthy_count(self):
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for e in self.endpoints if e.healthy(now))
+
+    def stats(self):
+        """Per-endpoint load, health, throughput and latency"""
+        now = time.monotonic()
+        endpoints = []
+        with self._lock:
+            for e in self.endpoints:
+                while e._completed and e._completed[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                    e._completed.popleft()
+                latencies = sorted(e._latencies)
+                endpoints.append({
+                    "endpoint": e.url,
+                    "healthy": e.healthy(now),
+                    "ejected_for_seconds": round(max(0.0, e.ejected_until - now), 1),
+                    "outstanding": e.outstanding,
+                    "started": e.started,
+                    "succeeded": e.succeeded,
+                    "failed": e.failed,
+                    "abandoned": e.abandoned,
+                    "pages": e.pages,
+                    "analyses_per_minute": len(e._completed) * 60 / THROUGHPUT_WINDOW_SECONDS,
+                    "latency_seconds": {
+                        "p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                        "p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3)
+                               if latencies else None,
+                    },
+                    "consecutive_failures": e.consecutive_failures,
+                    "ejections": e.ejections,
+                    "last_error": e.last_error,
+                })
+        return {
+            "endpoints": endpoints,
+            "healthy": sum(1 for e in endpoints if e["healthy"]),
+            "outstanding": sum(e["outstanding"] for e in endpoints),
+        }
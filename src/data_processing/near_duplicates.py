@@ -0,0 +1,231 @@
+"""
+Near-duplicate detection over extracted document content (MinHash + LSH)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUM_PERMUTATIONS = 128
+BANDS = 16  # 16 bands x 8 rows: documents above ~0.7 Jaccard almost always collide
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 5
+# Largest prime below 2^32: with a, b < PRIME and 32-bit shingle hashes x,
+# a * x + b stays below 2^64, so the uint64 arithmetic never wraps
+PRIME = np.uint64(4294967291)
+# Bump when the signature scheme changes; older signatures are not comparable
+SIGNATURE_VERSION = 2
+
+# Fixed seed: signatures must be comparable across processes and restarts
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, int(PRIME), size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, int(PRIME), size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+_DIGITS = re.compile(r"\d+")
+_WORDS = re.compile(r"\w+")
+
+def normalize_text(text):
+    """
+    Lowercase words with every digit run masked
+
+    Reissued certificates mostly differ in dates, serial numbers and IDs,
+    so numbers are treated as the same token.
+    """
+    return _WORDS.findall(_DIGITS.sub("0", text.lower()))
+
+def _shingle_hashes(words):
+    """32-bit hashes of every SHINGLE_SIZE-word window"""
+    if len(words) < SHINGLE_SIZE:
+        windows = [" ".join(words)] if words else []
+    else:
+        windows = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(w.encode(), digest_size=4).digest(), "little") for w in set(windows)),
+        dtype=np.uint64
+    )
+
+def minhash_signature(text):
+    """
+    MinHash signature of a text's word shingles
+
+    Returns:
+        numpy.ndarray: NUM_PERMUTATIONS uint32 values, or None for text without
+            any words (it has no content to compare, and a constant signature
+            would match every other such document)
+    """
+    hashes = _shingle_hashes(normalize_text(text))
+    if hashes.size == 0:
+        return None
+    # (a * x + b) mod p per permutation, minimised; p < 2^32 so it fits uint32
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the two shingle sets"""
+    return float(np.count_nonzero(signature_a == signature_b)) / NUM_PERMUTATIONS
+
+def _band_buckets(signature):
+    """One bucket key per band (signed 63-bit so it fits an SQLite INTEGER)"""
+    buckets = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        key = int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little") >> 1
+        buckets.append((band, key))
+    return buckets
+
+def _page_hashes(analysis_result):
+    """Hash of each page's normalized text, keyed by page number"""
+    hashes = {}
+    for index, page in enumerate(analysis_result.get("pages", [])):
+        words = normalize_text(" ".join(page.get("lines", [])))
+        hashes[page.get("page_number", index + 1)] = hashlib.sha1(" ".join(words).encode()).hexdigest()
+    return hashes
+
+class NearDuplicateIndex:
+    """
+    Local LSH index of document MinHash signatures
+
+    Lookups only touch documents sharing at least one band bucket with the
+    query, through an SQLite index on (band, bucket), so query cost depends
+    on the number of similar documents rather than on the corpus size.
+    """
+
+    def __init__(self, db_path=None, threshold=None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "near_duplicates.db")
+        self.threshold = threshold if threshold is not None else settings.NEAR_DUPLICATE_THRESHOLD
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                document TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                page_hashes TEXT NOT NULL,
+                indexed_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                document TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lsh_buckets_lookup ON lsh_buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS lsh_buckets_document ON lsh_buckets (document);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self._reset_if_outdated()
+        self.last_candidates = 0
+
+    def _reset_if_outdated(self):
+        """Empty an index built with another signature scheme; documents are re-indexed as they are analyzed"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'signature_version'").fetchone()
+            if row is not None and int(row[0]) == SIGNATURE_VERSION:
+                return
+            self._conn.execute("DELETE FROM lsh_buckets")
+            removed = self._conn.execute("DELETE FROM signatures").rowcount
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature_version', ?)",
+                               (str(SIGNATURE_VERSION),))
+        if removed:
+            logger.warning(f"⚠️ Near-duplicate index reset: {removed} signatures were computed with an "
+                           f"older scheme; documents are re-indexed as they are analyzed again")
+
+    def _remove(self, document):
+        self._conn.execute("DELETE FROM lsh_buckets WHERE document = ?", (document,))
+        self._conn.execute("DELETE FROM signatures WHERE document = ?", (document,))
+
+    def _candidates(self, buckets, exclude):
+        rows = set()
+        for band, bucket in buckets:
+            rows.update(
+                document for (document,) in self._conn.execute(
+                    "SELECT document FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                )
+            )
+        rows.discard(exclude)
+        return rows
+
+    def find(self, signature, page_hashes=None, exclude=None, limit=5):
+        """
+        Near-duplicates of a signature already in the index
+
+        Args:
+            signature (numpy.ndarray): MinHash signature to look up (None matches nothing)
+            page_hashes (dict): Page number -> normalized page hash, to report unchanged pages
+            exclude (str): Document to leave out (usually the one being indexed)
+            limit (int): Maximum number of matches
+
+        Returns:
+            list: Matches with document, similarity and unchanged_pages, best first
+        """
+        if signature is None:
+            self.last_candidates = 0
+            return []
+        with self._lock:
+            candidates = self._candidates(_band_buckets(signature), exclude)
+            self.last_candidates = len(candidates)
+            matches = []
+            for document in candidates:
+                stored_signature, stored_pages = self._conn.execute(
+                    "SELECT signature, page_hashes FROM signatures WHERE document = ?", (document,)
+                ).fetchone()
+                similarity = estimated_similarity(signature, np.frombuffer(stored_signature, dtype=np.uint32))
+                if similarity < self.threshold:
+                    continue
+                known = set(json.loads(stored_pages).values())
+                unchanged = sorted(page for page, h in (page_hashes or {}).items() if h in known)
+                matches.append({"document": document, "similarity": round(similarity, 3),
+                                "unchanged_pages": unchanged})
+        matches.sort(key=lambda match: match["similarity"], reverse=True)
+        return matches[:limit]
+
+    def add(self, document, analysis_result):
+        """
+        Index a document's content and report what it nearly duplicates
+
+        Args:
+            document (str): Blob name of the analyzed document
+            analysis_result (dict): Result of DocumentProcessor.analyze_document
+
+        Returns:
+            list: Near-duplicates found among previously indexed documents (none
+                for a document without text, which is not indexed)
+        """
+        signature = minhash_signature(analysis_result.get("content") or "")
+        if signature is None:
+            # Drop what an earlier analysis of the same blob may have indexed
+            with self._lock, self._conn:
+                self._remove(document)
+            return []
+        page_hashes = _page_hashes(analysis_result)
+        matches = self.find(signature, page_hashes, exclude=document)
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM lsh_buckets WHERE document = ?", (document,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signatures (document, signature, page_hashes, indexed_at) VALUES (?, ?, ?, ?)",
+                (document, signature.tobytes(), json.dumps(page_hashes), datetime.utcnow().isoformat())
+            )
+            self._conn.executemany(
+                "INSERT INTO lsh_buckets (band, bucket, document) VALUES (?, ?, ?)",
+                [(band, bucket, document) for band, bucket in _band_buckets(signature)]
+            )
+        if matches:
+            logger.info(f"👯 {document} is a near-duplicate of {matches[0]['document']} "
+                        f"(similarity {matches[0]['similarity']})")
+        return matches
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
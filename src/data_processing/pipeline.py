@@ -0,0 +1,219 @@
+"""
+Shared analysis pipeline: SAS URL -> Document Intelligence -> downstream indexes
+
+Every entry point that analyzes a stored blob (API, bulk ingest, dashboard)
+goes through analyze_blob() so each analysis feeds the same indexes.
+"""
+from config.settings import settings
+from src.data_processing.deadlines import WorkAbandoned
+from src.data_processing.near_duplicates import NearDuplicateIndex
+from src.data_processing.search_index import SearchIndex
+from src.jobs.scheduler import estimate_pages, get_analysis_scheduler, get_shared_slots
+from src.monitoring.event_store import get_event_store
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_search_index = None
+_near_duplicate_index = None
+
+def get_search_index():
+    """Process-wide full-text index, opened on first use"""
+    global _search_index
+    if _search_index is None:
+        _search_index = SearchIndex()
+    return _search_index
+
+def get_near_duplicate_index():
+    """Process-wide near-duplicate index, opened on first use"""
+    global _near_duplicate_index
+    if _near_duplicate_index is None:
+        _near_duplicate_index = NearDuplicateIndex()
+    return _near_duplicate_index
+
+def record_analysis(blob_name, analysis_result):
+    """
+    Feed a finished analysis into the downstream indexes
+
+    Near-duplicates of earlier documents are added to the result under
+    "near_duplicates", each with the pages whose text is unchanged.
+    Failures here are logged but never fail the analysis itself.
+    """
+    try:
+        get_search_index().index_document(blob_name, analysis_result)
+    except Exception as e:
+        logger.error(f"❌ Failed to index {blob_name} for search: {str(e)}")
+    
+    if settings.NEAR_DUPLICATE_DETECTION:
+        try:
+            analysis_result["near_duplicates"] = get_near_duplicate_index().add(blob_name, analysis_result)
+        except Exception as e:
+            logger.error(f"❌ Near-duplicate check failed for {blob_name}: {str(e)}")
+
+def _record_event(blob_name, outcome, started, analyze_started, user, size_bytes,
+                  upload_seconds, pages=0, error=None):
+    """Append a processing event; monitoring must never break processing"""
+    now = time.perf_counter()
+    upload_ms = upload_seconds * 1000 if upload_seconds is not None else None
+    try:
+        get_event_store().record(
+            blob_name, outcome,
+            total_ms=(now - started) * 1000 + (upload_ms or 0),
+            user=user, pages=pages, size_bytes=size_bytes or 0,
+            upload_ms=upload_ms, analyze_ms=(now - analyze_started) * 1000,
+            error=error
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to record processing event for {blob_name}: {str(e)}")
+
+def analyze_blob(storage_client, doc_processor, blob_name, user=None, size_bytes=None,
+                 upload_seconds=None, claim=None, priority="interactive", deadline=None):
+    """
+    Analyze a stored blob and record the result
+
+    Args:
+        storage_client (AzureStorageClient): Client holding the blob
+        doc_processor (DocumentProcessor): Document Intelligence client
+        blob_name (str): Name of the blob to analyze
+        user (str): Username the work is done for (optional, for monitoring)
+        size_bytes (int): Size of the document (optional, for monitoring)
+        upload_seconds (float): Time the caller spent uploading it (optional, for monitoring)
+        claim (WorkClaim): Claim held on the blob (optional); if it expired during the
+            analysis the result is not recorded, since another node may own the blob now
+        priority (str): Scheduling class - "interactive", "background" or "bulk"
+        deadline (Deadline): Caller's budget (optional); waiting and polling stop when it
+            runs out or the caller disconnects, and the event is recorded as abandoned
+
+    Returns:
+        dict: Analysis result as returned by DocumentProcessor.analyze_document
+    """
+    started = time.perf_counter()
+    timing = {}
+
+    def analyze(sas_url):
+        # Time from the granted slot, so queueing shows in total_ms but not analyze_ms
+        timing["analyze_started"] = time.perf_counter()
+        return doc_processor.analyze_document(sas_url, deadline=deadline)
+
+    try:
+        sas_url = storage_client.generate_sas_url(blob_name)
+        # Background and bulk work first takes a cluster-wide slot, so backfills on
+        # other nodes cannot crowd out interactive analyses
+        shared_slot = get_shared_slots().acquire(storage_client, priority, deadline)
+        try:
+            analysis_result = get_analysis_scheduler().run(
+                analyze, sas_url, user=user, priority=priority, pages=estimate_pages(size_bytes),
+                deadline=deadline
+            )
+        finally:
+            get_shared_slots().release(shared_slot, priority)
+        if claim is not None:
+            claim.check()
+    except WorkAbandoned as e:
+        _record_event(blob_name, "abandoned", started, timing.get("analyze_started", started), user,
+                      size_bytes, upload_seconds, error=str(e))
+        raise
+    except Exception as e:
+        _record_event(blob_name, "failure", started, started, user, size_bytes,
+                      upload_seconds, error=str(e))
+        raise
+    
+    _record_event(blob_name, "success", started, timing["analyze_started"], user, size_bytes,
+                  upload_seconds, pages=len(analysis_result["pages"]))
+    record_analysis(blob_name, analysis_result)
+    return analysis_result
+
+def analysis_summary(analysis_result):
+    """Condensed view of an analysis, as returned by the API and stored on jobs"""
+    content = analysis_result['content']
+    return {
+        "pages_processed": len(analysis_result['pages']),
+        "tables_found": len(analysis_result['tables']),
+        "content_preview": content[:200] + "..." if len(content) > 200 else content,
+        "near_duplicates": analysis_result.get("near_duplicates", []),
+        "processing_time": "completed"
+    }
+
+class ProcessingJob:
+    """
+    Upload-and-analyze of one in-memory document, run on a background thread
+
+    The UI polls progress()/stage instead of blocking on the work. Upload
+    progress is reported by the SDK per transferred chunk; Document
+    Intelligence gives no percentage, so the analysis stage reports its
+    elapsed time instead.
+    """
+
+    # Share of the progress bar given to the upload; analysis fills the rest
+    UPLOAD_SHARE = 0.5
+
+    def __init__(self, storage_client, doc_processor, stream, blob_name, size_bytes, user=None):
+        self.storage_client = storage_client
+        self.doc_processor = doc_processor
+        self.stream = stream
+        self.blob_name = blob_name
+        self.size_bytes = size_bytes
+        self.user = user
+        self.stage = "queued"
+        self.uploaded_bytes = 0
+        self.result = None
+        self.error = None
+        self.upload_seconds = None
+        self.analyze_started = None
+        self.finished_at = None
+        self.started_at = None
+
+    def _on_upload_progress(self, current, total):
+        self.uploaded_bytes = current
+
+    def run(self):
+        """Execute the job; meant to be submitted to an executor"""
+        self.started_at = time.perf_counter()
+        try:
+            self.stage = "uploading"
+            self.stream.seek(0)
+            self.storage_client.upload_stream(
+                self.stream, self.blob_name, self.size_bytes,
+                progress_hook=self._on_upload_progress
+            )
+            self.uploaded_bytes = self.size_bytes
+            self.upload_seconds = time.perf_counter() - self.started_at
+            
+            self.stage = "analyzing"
+            self.analyze_started = time.perf_counter()
+            self.result = analyze_blob(
+                self.storage_client, self.doc_processor, self.blob_name,
+                user=self.user, size_bytes=self.size_bytes, upload_seconds=self.upload_seconds
+            )
+            self.stage = "completed"
+        except Exception as e:
+            logger.error(f"❌ Processing job for {self.blob_name} failed: {str(e)}")
+            self.error = str(e)
+            self.stage = "failed"
+        finally:
+            self.finished_at = time.perf_counter()
+            # Drop the reference so the uploaded buffer can be freed
+            self.stream = None
+        return self
+
+    @property
+    def done(self):
+        return self.stage in ("completed", "failed")
+
+    def progress(self):
+        """Overall progress between 0.0 and 1.0"""
+        if self.stage == "completed":
+            return 1.0
+        if self.stage in ("queued", "uploading"):
+            return self.UPLOAD_SHARE * self.uploaded_bytes / max(self.size_bytes, 1)
+        if self.stage == "analyzing":
+            # Creep towards (never reaching) the end while waiting on the service
+            elapsed = time.perf_counter() - self.analyze_started
+            return self.UPLOAD_SHARE + (1 - self.UPLOAD_SHARE) * elapsed / (elapsed + 10)
+        return self.UPLOAD_SHARE * self.uploaded_bytes / max(self.size_bytes, 1)
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
@@ -0,0 +1,136 @@
+"""
+Incremental full-text index over extracted document content (SQLite FTS5)
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SearchIndex:
+    """
+    Line-level full-text index of analyzed documents
+
+    Every extracted line is stored with its page number and line position in
+    a plain table; an external-content FTS5 table kept in sync by triggers
+    provides ranked (BM25) matching and snippets. Re-indexing a document only
+    touches that document's rows.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "search_index.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                document TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL,
+                indexed_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lines (
+                id INTEGER PRIMARY KEY,
+                document TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                line INTEGER NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lines_document ON lines (document);
+            CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+                content, content='lines', content_rowid='id', tokenize='unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+                INSERT INTO lines_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+                INSERT INTO lines_fts (lines_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            END;
+        """)
+
+    def index_document(self, document, analysis_result):
+        """
+        Add or replace a document's extracted lines in the index
+
+        Args:
+            document (str): Blob name of the analyzed document
+            analysis_result (dict): Result of DocumentProcessor.analyze_document
+        """
+        rows = [
+            (document, page.get("page_number", page_index + 1), line_number, content)
+            for page_index, page in enumerate(analysis_result.get("pages", []))
+            for line_number, content in enumerate(page.get("lines", []), start=1)
+            if content
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM lines WHERE document = ?", (document,))
+            self._conn.executemany(
+                "INSERT INTO lines (document, page, line, content) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (document, page_count, indexed_at) VALUES (?, ?, ?)",
+                (document, len(analysis_result.get("pages", [])), datetime.utcnow().isoformat())
+            )
+        logger.info(f"🔎 Indexed {len(rows)} lines of {document}")
+
+    def remove_document(self, document):
+        """Drop a document from the index"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM lines WHERE document = ?", (document,))
+            self._conn.execute("DELETE FROM documents WHERE document = ?", (document,))
+
+    @staticmethod
+    def _match_expression(query):
+        """
+        Turn free text into a safe FTS5 expression
+
+        A query wrapped in double quotes is matched as a phrase; otherwise every
+        term must occur in the line. Terms are quoted so characters like '-' or
+        ':' in part numbers are never parsed as FTS5 operators.
+        """
+        query = query.strip()
+        if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+            return '"' + query[1:-1].replace('"', '""') + '"'
+        return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+    def search(self, query, limit=20, offset=0, document_prefix=None):
+        """
+        Ranked search over indexed lines
+
+        Args:
+            query (str): Free-text query, or a "quoted phrase"
+            limit (int): Maximum number of hits
+            offset (int): Hits to skip (for paging)
+            document_prefix (str): Only match documents whose name starts with this (optional)
+
+        Returns:
+            list: Hits with document, page, line, snippet and score (lower is better)
+        """
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT lines.document, lines.page, lines.line,
+                       snippet(lines_fts, 0, '[', ']', '…', 16), lines_fts.rank
+                FROM lines_fts JOIN lines ON lines.id = lines_fts.rowid
+                WHERE lines_fts MATCH ?
+                  AND (? IS NULL OR substr(lines.document, 1, length(?)) = ?)
+                ORDER BY lines_fts.rank
+                LIMIT ? OFFSET ?
+            """, (expression, document_prefix, document_prefix, document_prefix, limit, offset)).fetchall()
+        return [
+            {"document": document, "page": page, "line": line,
+             "snippet": snippet, "score": round(score, 4)}
+            for document, page, line, snippet, score in rows
+        ]
+
+    def stats(self):
+        """Number of indexed documents and lines"""
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            lines = self._conn.execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+        return {"documents": documents, "lines": lines}
@@ -0,0 +1,84 @@
+"""
+Single-flight coalescing of identical in-flight operations
+"""
+import asyncio
+from src.data_processing.deadlines import Deadline
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Run at most one operation per key at a time.
+
+    Callers that arrive while an operation for the same key is still running
+    await the same future instead of starting their own, so the work (and the
+    Azure bill) is paid once and the result fans out to every waiter.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._deadlines = {}
+        self.started = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def run(self, key, func, *args, deadline=None):
+        """
+        Run ``func(*args)`` for ``key`` or join the call already in flight
+
+        Args:
+            key (hashable): Identity of the operation, e.g. (blob name, ETag)
+            func (callable): Coroutine function doing the actual work
+            *args: Positional arguments passed to ``func``
+            deadline (Deadline): This caller's deadline (optional). The first
+                caller's deadline is the one ``func`` should honour; later callers
+                extend it, and it is cancelled once every waiter has gone away
+
+        Returns:
+            The result of the shared call (exceptions are shared too)
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args))
+            self._in_flight[key] = task
+            if deadline is not None:
+                self._deadlines[key] = deadline
+            task.add_done_callback(lambda done: self._done(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"🔗 Joined in-flight operation for {key}")
+            if key in self._deadlines:
+                self._deadlines[key].share(deadline or Deadline())
+        shared_deadline = self._deadlines.get(key)
+
+        # Shield so a waiter that goes away does not cancel the shared call
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self.abandoned += 1
+                if shared_deadline is not None:
+                    shared_deadline.abandon()
+                    if shared_deadline.cancelled:
+                        # Last waiter gone: the call is stopping, so a new caller
+                        # for this key must start afresh rather than join it
+                        self._forget(key, task)
+            raise
+
+    def _forget(self, key, task):
+        # Only if the key still points at this call, not at a newer one
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            self._deadlines.pop(key, None)
+
+    def _done(self, key, task):
+        self._forget(key, task)
+        # Mark the outcome as seen even if every waiter went away before it finished
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self):
+        """Number of distinct operations currently running"""
+        return len(self._in_flight)
@@ -0,0 +1,395 @@
+"""
+Durable background job queue with SQLite (single node) and Azure Storage Queue
+(many nodes) backends
+"""
+import json
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_FIELDS = ("id", "kind", "payload", "status", "attempts", "max_attempts", "enqueued_at",
+              "started_at", "finished_at", "error", "result")
+RETRY_BACKOFF_SECONDS = 10
+MAX_RETRY_BACKOFF_SECONDS = 600
+
+def _iso(ts):
+    return datetime.utcfromtimestamp(ts).isoformat() if ts else None
+
+def retry_delay(attempts):
+    """Seconds before a failed job is offered again (exponential, capped)"""
+    return min(MAX_RETRY_BACKOFF_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** max(0, attempts - 1))
+
+class JobQueue(ABC):
+    """
+    Interface shared by the queue backends
+
+    A received job stays invisible to other workers for the visibility
+    timeout. The worker must complete(), fail() or extend() it before then,
+    using the job's receipt; otherwise the job is offered again (the worker
+    is presumed dead). Jobs that fail max_attempts times are dead-lettered.
+    Backends must implement every method; a missing one fails on construction.
+    """
+
+    @abstractmethod
+    def enqueue(self, kind, payload):
+        """Add a job and return its id"""
+
+    @abstractmethod
+    def receive(self, visibility_timeout=None):
+        """Claim the next ready job (dict with a "receipt"), or None"""
+
+    @abstractmethod
+    def extend(self, job, visibility_timeout=None):
+        """Keep a claimed job invisible for longer; False if the claim was lost"""
+
+    @abstractmethod
+    def complete(self, job, result=None):
+        """Mark a claimed job done; False if the claim was lost"""
+
+    @abstractmethod
+    def fail(self, job, error):
+        """Schedule a retry, or dead-letter the job once attempts are exhausted"""
+
+    @abstractmethod
+    def defer(self, job, delay):
+        """Put a claimed job back to run after delay seconds, without counting the attempt"""
+
+    @abstractmethod
+    def status(self, job_id):
+        """Job record without the receipt, or None"""
+
+    @abstractmethod
+    def stats(self):
+        """Queue depth and job counts by state"""
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue in a local SQLite database
+
+    Claims are single UPDATE ... RETURNING statements, so several worker
+    processes on the same machine can share the database safely.
+    """
+
+    def __init__(self, db_path=None, max_attempts=None, visibility_timeout=None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "jobs.db")
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.visibility_timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                visible_at REAL NOT NULL,
+                receipt TEXT,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                result TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, visible_at);
+        """)
+
+    def _record(self, row):
+        job = dict(zip(JOB_FIELDS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        for field in ("enqueued_at", "started_at", "finished_at"):
+            job[field] = _iso(job[field])
+        return job
+
+    def enqueue(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, visible_at, enqueued_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), self.max_attempts, now, now)
+            )
+        logger.info(f"📥 Queued {kind} job {job_id}")
+        return job_id
+
+    def receive(self, visibility_timeout=None):
+        now = time.time()
+        receipt = uuid.uuid4().hex
+        with self._lock, self._conn:
+            # Running jobs whose visibility expired belong to a dead worker; once
+            # they have used up their attempts they are dead-lettered, not retried
+            self._conn.execute(
+                "UPDATE jobs SET status = 'dead', receipt = NULL, finished_at = ?, "
+                "error = COALESCE(error, 'visibility timeout expired on every attempt') "
+                "WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = self._conn.execute(
+                f"UPDATE jobs SET status = 'running', attempts = attempts + 1, receipt = ?, "
+                f"started_at = ?, visible_at = ? "
+                f"WHERE id = (SELECT id FROM jobs WHERE status IN ('queued', 'running') AND visible_at <= ? "
+                f"ORDER BY visible_at LIMIT 1) "
+                f"RETURNING {', '.join(JOB_FIELDS)}",
+                (receipt, now, now + (visibility_timeout or self.visibility_timeout), now)
+            ).fetchone()
+        if row is None:
+            return None
+        job = self._record(row)
+        job["receipt"] = receipt
+        return job
+
+    def extend(self, job, visibility_timeout=None):
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE id = ? AND receipt = ? AND status = 'running'",
+                (time.time() + (visibility_timeout or self.visibility_timeout), job["id"], job["receipt"])
+            ).rowcount
+        return updated == 1
+
+    def complete(self, job, result=None):
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = 'succeeded', receipt = NULL, finished_at = ?, error = NULL, result = ? "
+                "WHERE id = ? AND receipt = ? AND status = 'running'",
+                (time.time(), json.dumps(result), job["id"], job["receipt"])
+            ).rowcount
+        if not updated:
+            logger.warning(f"⚠️ Job {job['id']} finished after its claim expired; result discarded")
+        return updated == 1
+
+    def fail(self, job, error):
+        now = time.time()
+        dead = job["attempts"] >= job["max_attempts"]
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, receipt = NULL, visible_at = ?, finished_at = ?, error = ? "
+                "WHERE id = ? AND receipt = ? AND status = 'running'",
+                ("dead" if dead else "queued", now + retry_delay(job["attempts"]),
+                 now if dead else None, str(error), job["id"], job["receipt"])
+            ).rowcount
+        if updated and dead:
+            logger.error(f"☠️ Job {job['id']} dead-lettered after {job['attempts']} attempts: {error}")
+        elif updated:
+            logger.warning(f"🔁 Job {job['id']} failed (attempt {job['attempts']}), retrying in "
+                           f"{retry_delay(job['attempts'])}s: {error}")
+        return updated == 1
+
+    def defer(self, job, delay):
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, receipt = NULL, visible_at = ? "
+                "WHERE id = ? AND receipt = ? AND status = 'running'",
+                (time.time() + delay, job["id"], job["receipt"])
+            ).rowcount
+        if updated:
+            logger.info(f"⏸️ Job {job['id']} deferred for {delay}s")
+        return updated == 1
+
+    def status(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._record(row) if row else None
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            ready, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(visible_at) FROM jobs "
+                "WHERE status IN ('queued', 'running') AND visible_at <= ?", (now,)
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "ready": ready,
+            "oldest_ready_seconds": round(now - oldest, 1) if oldest else 0,
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "succeeded": counts.get("succeeded", 0),
+            "dead": counts.get("dead", 0),
+        }
+
+class AzureStorageJobQueue(JobQueue):
+    """
+    Job queue on Azure Storage Queues, shared by any number of nodes
+
+    Messages carry only the job id, kind and payload. Job records (state,
+    error, result) are JSON blobs in a companion container so the API can
+    report status, and jobs that exhaust their attempts move to a
+    "<name>-poison" queue. Works against Azurite for local testing.
+    """
+
+    def __init__(self, connection_string=None, queue_name=None, max_attempts=None, visibility_timeout=None):
+        try:
+            from azure.storage.queue import QueueClient
+        except ImportError:
+            raise ImportError("The azure job queue backend needs azure-storage-queue (pip install azure-storage-queue)")
+        from azure.core.exceptions import ResourceExistsError
+        from azure.storage.blob import BlobServiceClient
+        from src.data_ingestion.http_transport import get_http_transport
+
+        connection_string = connection_string or settings.AZURE_STORAGE_CONNECTION_STRING
+        self.queue_name = queue_name or settings.JOB_QUEUE_NAME
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.visibility_timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+        transport = get_http_transport()
+        self._queue = QueueClient.from_connection_string(connection_string, self.queue_name, transport=transport)
+        self._dead_letter = QueueClient.from_connection_string(connection_string, f"{self.queue_name}-poison",
+                                                               transport=transport)
+        self._records = BlobServiceClient.from_connection_string(connection_string, transport=transport).get_container_client(
+            f"{self.queue_name}-jobs"
+        )
+        for create in (self._queue.create_queue, self._dead_letter.create_queue, self._records.create_container):
+            try:
+                create()
+            except ResourceExistsError:
+                pass
+        logger.info(f"✅ Job queue '{self.queue_name}' ready on Azure Storage")
+
+    def _write_record(self, record):
+        self._records.upload_blob(f"{record['id']}.json", json.dumps(record), overwrite=True)
+
+    def _read_record(self, job_id):
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            return json.loads(self._records.download_blob(f"{job_id}.json").readall())
+        except ResourceNotFoundError:
+            return None
+
+    def _update_record(self, job, **changes):
+        record = {field: job.get(field) for field in JOB_FIELDS}
+        record.update(changes)
+        self._write_record(record)
+        return record
+
+    def enqueue(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        self._write_record({"id": job_id, "kind": kind, "payload": payload, "status": "queued", "attempts": 0,
+                            "max_attempts": self.max_attempts, "enqueued_at": datetime.utcnow().isoformat(),
+                            "started_at": None, "finished_at": None, "error": None, "result": None})
+        # time_to_live=-1: jobs never silently expire from the queue
+        self._queue.send_message(json.dumps({"id": job_id, "kind": kind, "payload": payload}), time_to_live=-1)
+        logger.info(f"📥 Queued {kind} job {job_id}")
+        return job_id
+
+    def receive(self, visibility_timeout=None):
+        while True:
+            message = self._queue.receive_message(visibility_timeout=visibility_timeout or self.visibility_timeout)
+            if message is None:
+                return None
+            body = json.loads(message.content)
+            record = self._read_record(body["id"]) or {"id": body["id"], "enqueued_at": None}
+            # A deferred job is re-sent as a new message; earlier attempts travel in the body
+            attempts = body.get("previous_attempts", 0) + message.dequeue_count
+            job = dict(record, kind=body["kind"], payload=body["payload"], attempts=attempts,
+                       max_attempts=self.max_attempts, receipt=(message.id, message.pop_receipt))
+            if attempts > self.max_attempts:
+                # Delivered again after its last attempt timed out: the worker died every time
+                self._dead_letter_message(job, record.get("error") or "visibility timeout expired on every attempt")
+                continue
+            self._update_record(job, status="running", started_at=datetime.utcnow().isoformat())
+            return job
+
+    def extend(self, job, visibility_timeout=None):
+        from azure.core.exceptions import HttpResponseError
+        message_id, pop_receipt = job["receipt"]
+        try:
+            updated = self._queue.update_message(
+                message_id, pop_receipt, visibility_timeout=visibility_timeout or self.visibility_timeout
+            )
+        except HttpResponseError:
+            return False
+        job["receipt"] = (message_id, updated.pop_receipt)
+        return True
+
+    def complete(self, job, result=None):
+        from azure.core.exceptions import HttpResponseError
+        try:
+            self._queue.delete_message(*job["receipt"])
+        except HttpResponseError:
+            logger.warning(f"⚠️ Job {job['id']} finished after its claim expired; result discarded")
+            return False
+        self._update_record(job, status="succeeded", finished_at=datetime.utcnow().isoformat(),
+                            error=None, result=result)
+        return True
+
+    def _dead_letter_message(self, job, error):
+        self._dead_letter.send_message(json.dumps({"id": job["id"], "kind": job["kind"], "payload": job["payload"],
+                                                   "error": str(error)}), time_to_live=-1)
+        self._queue.delete_message(*job["receipt"])
+        self._update_record(job, status="dead", finished_at=datetime.utcnow().isoformat(), error=str(error))
+        logger.error(f"☠️ Job {job['id']} dead-lettered after {job['attempts']} attempts: {error}")
+
+    def fail(self, job, error):
+        from azure.core.exceptions import HttpResponseError
+        try:
+            if job["attempts"] >= self.max_attempts:
+                self._dead_letter_message(job, error)
+                return True
+            # Keep the message but hide it until the backoff has passed
+            self._queue.update_message(*job["receipt"], visibility_timeout=retry_delay(job["attempts"]))
+        except HttpResponseError:
+            return False
+        self._update_record(job, status="queued", error=str(error))
+        logger.warning(f"🔁 Job {job['id']} failed (attempt {job['attempts']}), retrying in "
+                       f"{retry_delay(job['attempts'])}s: {error}")
+        return True
+
+    def defer(self, job, delay):
+        from azure.core.exceptions import HttpResponseError
+        # A message's dequeue count cannot be reset, so send a fresh copy that
+        # becomes visible after the delay and drop the claimed one
+        self._queue.send_message(
+            json.dumps({"id": job["id"], "kind": job["kind"], "payload": job["payload"],
+                        "previous_attempts": job["attempts"] - 1}),
+            visibility_timeout=delay, time_to_live=-1
+        )
+        try:
+            self._queue.delete_message(*job["receipt"])
+        except HttpResponseError:
+            # Claim already lost: the old message will be delivered again as well,
+            # and whichever copy runs second finds the job done
+            logger.warning(f"⚠️ Job {job['id']} was deferred after its claim expired")
+            return False
+        self._update_record(job, status="queued", attempts=job["attempts"] - 1)
+        logger.info(f"⏸️ Job {job['id']} deferred for {delay}s")
+        return True
+
+    def status(self, job_id):
+        return self._read_record(job_id)
+
+    def stats(self):
+        # Approximate counts: Storage Queues do not report in-flight messages separately
+        return {
+            "backend": "azure",
+            "ready": self._queue.get_queue_properties().approximate_message_count,
+            "dead": self._dead_letter.get_queue_properties().approximate_message_count,
+        }
+
+_job_queue = None
+
+def get_job_queue():
+    """Process-wide job queue for the configured backend, opened on first use"""
+    global _job_queue
+    if _job_queue is None:
+        if settings.JOB_QUEUE_BACKEND == "azure":
+            _job_queue = AzureStorageJobQueue()
+        elif settings.JOB_QUEUE_BACKEND == "sqlite":
+            _job_queue = SQLiteJobQueue()
+        else:
+            raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {settings.JOB_QUEUE_BACKEND}")
+    return _job_queue
@@ -0,0 +1,270 @@
+"""
+Priority and size-aware scheduling of Document Intelligence calls
+
+All analyses in a process go through one AnalysisScheduler, which limits how
+many run at once and picks who goes next when a slot frees up:
+
+1. Priority class: interactive, then background, then bulk. A waiter moves
+   up one class for every ANALYSIS_AGING_SECONDS it has waited, so bulk work
+   keeps moving under constant interactive load.
+2. Weighted fair share between users in the same class: the user who has
+   been served the fewest pages (divided by their weight) goes first.
+3. Shortest job first among one user's waiters, by estimated page count.
+
+That ordering only covers one process. Across processes, background and bulk
+analyses also hold one of a fixed number of cluster-wide slots per class
+(SharedSlots, ANALYSIS_SHARED_SLOTS), so workers and bulk ingest on every
+node together never take more than that share of Document Intelligence,
+however many of them run. Interactive analyses never wait for a shared slot.
+"""
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from config.settings import settings
+from src.data_ingestion.work_claims import claim
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("interactive", "background", "bulk")
+WAIT_SAMPLES = 1000
+
+def estimate_pages(size_bytes):
+    """Rough page count from the document size, used to order work before it is analyzed"""
+    if not size_bytes:
+        return 1
+    return max(1, round(size_bytes / settings.ANALYSIS_BYTES_PER_PAGE))
+
+def parse_weights(spec):
+    """Parse "admin=4,bulk-ingest=0.5" into {user: weight}"""
+    weights = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        user, _, weight = part.partition("=")
+        weights[user.strip()] = float(weight)
+    return weights
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class AnalysisScheduler:
+    """
+    Grants analysis slots in priority, fair-share and shortest-job order
+
+    Ordering is per process: API, workers and bulk ingest each order their
+    own analyses. SharedSlots caps lower classes across processes.
+    """
+
+    def __init__(self, concurrency=None, aging_seconds=None, weights=None):
+        """
+        Args:
+            concurrency (int): Analyses allowed to run at once
+            aging_seconds (float): Wait after which a waiter moves up one priority class
+            weights (dict): User -> fair-share weight (default 1)
+        """
+        self.concurrency = concurrency or settings.ANALYSIS_CONCURRENCY
+        self.aging_seconds = aging_seconds or settings.ANALYSIS_AGING_SECONDS
+        self.weights = weights if weights is not None else parse_weights(settings.ANALYSIS_USER_WEIGHTS)
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        # Start-time fair queuing: each user's virtual finish time, and the
+        # virtual time of the last grant so idle users cannot bank credit
+        self._user_vtime = {}
+        self._vtime = 0.0
+        self._granted = {priority: 0 for priority in PRIORITIES}
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITIES}
+
+    def run(self, fn, *args, user=None, priority="interactive", pages=1, deadline=None, **kwargs):
+        """
+        Wait for a slot, then call fn(*args, **kwargs)
+
+        Args:
+            fn (callable): The analysis to run
+            user (str): User the work is done for
+            priority (str): One of PRIORITIES
+            pages (int): Estimated page count (see estimate_pages)
+            deadline (Deadline): Stop waiting for a slot once the caller gives up (optional)
+
+        Returns:
+            Whatever fn returns
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        self._acquire(user or "anonymous", priority, max(1, pages), deadline)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._release()
+
+    def _acquire(self, user, priority, pages, deadline=None):
+        ticket = {"user": user, "priority": priority, "class": PRIORITIES.index(priority),
+                  "pages": pages, "enqueued": time.monotonic(), "sequence": next(self._sequence),
+                  "granted": False}
+        with self._cond:
+            self._waiting.append(ticket)
+            self._dispatch()
+            while not ticket["granted"]:
+                if deadline is not None:
+                    try:
+                        deadline.check()
+                    except Exception:
+                        self._waiting.remove(ticket)
+                        raise
+                # Timed wait so aging (and the caller's deadline) is re-evaluated
+                # even if nothing finishes
+                self._cond.wait(self.aging_seconds if deadline is None else min(self.aging_seconds, 0.5))
+                self._dispatch()
+        return ticket
+
+    def _release(self):
+        with self._cond:
+            self._running -= 1
+            self._dispatch()
+
+    def _rank(self, ticket, now):
+        aged = int((now - ticket["enqueued"]) // self.aging_seconds)
+        user_vtime = max(self._user_vtime.get(ticket["user"], 0.0), self._vtime)
+        return (max(0, ticket["class"] - aged), user_vtime, ticket["pages"], ticket["sequence"])
+
+    def _dispatch(self):
+        """Grant free slots to the best-ranked waiters (lock held)"""
+        granted = False
+        now = time.monotonic()
+        while self._running < self.concurrency and self._waiting:
+            ticket = min(self._waiting, key=lambda t: self._rank(t, now))
+            self._waiting.remove(ticket)
+            user = ticket["user"]
+            start = max(self._user_vtime.get(user, 0.0), self._vtime)
+            self._user_vtime[user] = start + ticket["pages"] / self.weights.get(user, 1.0)
+            self._vtime = start
+            self._running += 1
+            self._granted[ticket["priority"]] += 1
+            self._waits[ticket["priority"]].append(now - ticket["enqueued"])
+            ticket["granted"] = True
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def stats(self):
+        """Slots in use, waiters per class and recent queueing delay per class"""
+        with self._cond:
+            waiting = {priority: 0 for priority in PRIORITIES}
+            for ticket in self._waiting:
+                waiting[ticket["priority"]] += 1
+            return {
+                "concurrency": self.concurrency,
+                "running": self._running,
+                "waiting": waiting,
+                "granted": dict(self._granted),
+                "wait_seconds": {
+                    priority: {
+                        "p50": _percentile(self._waits[priority], 0.5),
+                        "p95": _percentile(self._waits[priority], 0.95),
+                    }
+                    for priority in PRIORITIES
+                },
+            }
+
+class SharedSlots:
+    """
+    Cluster-wide concurrency budget per priority class, held as leases on
+    numbered marker blobs in the claims container
+
+    A slot is a WorkClaim, renewed while the analysis runs and freed when it
+    ends (or when its lease lapses, if the process dies).
+    """
+
+    def __init__(self, limits=None, poll_seconds=2.0):
+        """
+        Args:
+            limits (dict): Priority class -> slots shared by all processes; classes
+                not listed are not limited
+            poll_seconds (float): Wait between attempts while every slot is taken
+        """
+        self.limits = limits if limits is not None else {
+            priority: int(count) for priority, count in parse_weights(settings.ANALYSIS_SHARED_SLOTS).items()
+        }
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._held = {priority: 0 for priority in PRIORITIES}
+        self._waiting = {priority: 0 for priority in PRIORITIES}
+
+    def _try_acquire(self, storage_client, priority):
+        # Random order spreads contending nodes over the slots instead of all racing for slot 0
+        for index in random.sample(range(self.limits[priority]), self.limits[priority]):
+            slot = claim(storage_client, f"analysis-slots/{priority}-{index}")
+            if slot is not None:
+                return slot
+        return None
+
+    def acquire(self, storage_client, priority, deadline=None):
+        """
+        Wait for a shared slot of this class
+
+        Args:
+            storage_client (AzureStorageClient): Client whose account holds the claims container
+            priority (str): One of PRIORITIES
+            deadline (Deadline): Stop waiting once the caller gives up (optional)
+
+        Returns:
+            WorkClaim: Slot to release() when the analysis ends, or None if the class is not limited
+        """
+        if not self.limits.get(priority):
+            return None
+        with self._lock:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                if deadline is not None:
+                    deadline.check()
+                slot = self._try_acquire(storage_client, priority)
+                if slot is not None:
+                    with self._lock:
+                        self._held[priority] += 1
+                    return slot
+                time.sleep(self.poll_seconds)
+        finally:
+            with self._lock:
+                self._waiting[priority] -= 1
+
+    def release(self, slot, priority):
+        if slot is None:
+            return
+        slot.release()
+        with self._lock:
+            self._held[priority] -= 1
+
+    def stats(self):
+        """Configured shared slots, and those held and waited for by this process"""
+        with self._lock:
+            return {
+                "limits": dict(self.limits),
+                "held": {priority: self._held[priority] for priority in self.limits},
+                "waiting": {priority: self._waiting[priority] for priority in self.limits},
+            }
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_shared_slots = None
+
+def get_analysis_scheduler():
+    """Process-wide analysis scheduler, created on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = AnalysisScheduler()
+        return _scheduler
+
+def get_shared_slots():
+    """Process-wide handle on the cluster-wide analysis slots, created on first use"""
+    global _shared_slots
+    with _scheduler_lock:
+        if _shared_slots is None:
+            _shared_slots = SharedSlots()
+        return _shared_slots
@@ -0,0 +1,141 @@
+"""
+Worker loop that runs queued jobs with visibility heartbeats and retries
+"""
+import threading
+import time
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class JobDeferred(Exception):
+    """
+    Raised by a handler that cannot run the job yet through no fault of the
+    job (e.g. another node holds its work claim); the job goes back on the
+    queue after delay seconds without using up an attempt
+    """
+
+    def __init__(self, message, delay):
+        super().__init__(message)
+        self.delay = delay
+
+class Worker:
+    """
+    Pulls jobs from a JobQueue and runs them on a pool of threads
+
+    Each running job's visibility is extended every third of the timeout, so
+    long analyses are not handed to another worker while this one is alive;
+    if the process dies, the job reappears once the timeout lapses.
+    """
+
+    def __init__(self, queue, handlers, concurrency=2, visibility_timeout=None, poll_interval=2.0):
+        """
+        Args:
+            queue (JobQueue): Queue to pull jobs from
+            handlers (dict): Job kind -> callable(payload) returning a JSON-serializable result
+            concurrency (int): Jobs run at the same time
+            visibility_timeout (int): Seconds a claim lasts between heartbeats
+            poll_interval (float): Seconds to wait when the queue is empty
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+        self.poll_interval = poll_interval
+        self._stopping = threading.Event()
+        self._threads = []
+        self.processed = 0
+        self.failed = 0
+        self.deferred = 0
+        self._counter_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads"""
+        for n in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🚀 Worker started with {self.concurrency} threads")
+
+    def request_stop(self):
+        """Stop taking new jobs; safe to call from a signal handler"""
+        self._stopping.set()
+
+    def stop(self, timeout=None):
+        """Stop taking new jobs and wait for running ones to finish"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        logger.info(f"🛑 Worker stopped ({self.processed} succeeded, {self.failed} failed)")
+
+    def run_forever(self):
+        """Start and block until request_stop(), then wait for running jobs"""
+        self.start()
+        while not self._stopping.wait(1):
+            pass
+        self.stop()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.receive(self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"❌ Could not receive from job queue: {str(e)}")
+                job = None
+            if job is None:
+                self._stopping.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        """
+        Run one claimed job and settle it on the queue
+
+        Args:
+            job (dict): Job as returned by JobQueue.receive
+
+        Returns:
+            bool: True if the handler succeeded
+        """
+        handler = self.handlers.get(job["kind"])
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, finished), daemon=True)
+        heartbeat.start()
+        logger.info(f"⚙️ Running {job['kind']} job {job['id']} (attempt {job['attempts']}/{job['max_attempts']})")
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind '{job['kind']}'")
+            result = handler(job["payload"])
+        except JobDeferred as e:
+            finished.set()
+            heartbeat.join()
+            logger.info(f"⏸️ Job {job['id']} deferred: {str(e)}")
+            self.queue.defer(job, e.delay)
+            with self._counter_lock:
+                self.deferred += 1
+            return False
+        except Exception as e:
+            finished.set()
+            heartbeat.join()
+            self.queue.fail(job, str(e))
+            with self._counter_lock:
+                self.failed += 1
+            return False
+
+        finished.set()
+        heartbeat.join()
+        if self.queue.complete(job, result):
+            logger.info(f"✅ Job {job['id']} done in {time.perf_counter() - started:.1f}s")
+        with self._counter_lock:
+            self.processed += 1
+        return True
+
+    def _heartbeat(self, job, finished):
+        while not finished.wait(self.visibility_timeout / 3):
+            try:
+                if not self.queue.extend(job, self.visibility_timeout):
+                    logger.warning(f"⚠️ Lost the claim on job {job['id']}; another worker may pick it up")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Could not extend job {job['id']}: {str(e)}")
@@ -0,0 +1,242 @@
+"""
+Append-only store of processing events with incrementally maintained rollups
+"""
+import bisect
+import os
+import sqlite3
+import threading
+import time
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rollup granularities and how long their buckets are kept (None = forever)
+GRANULARITIES = {
+    "minute": (60, 2 * 86400),
+    "hour": (3600, 90 * 86400),
+    "day": (86400, None),
+}
+
+# Upper bounds (ms) of the latency histogram kept per rollup bucket; the last
+# bucket is open-ended. Percentiles are interpolated within a bucket.
+LATENCY_BUCKETS_MS = [50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000,
+                      7500, 10000, 15000, 20000, 30000, 60000, 120000, 300000]
+
+PRUNE_EVERY = 1000
+
+def _percentile_from_histogram(histogram, fraction):
+    """Approximate percentile (ms) from bucket counts"""
+    total = sum(histogram)
+    if total == 0:
+        return None
+    target = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= target:
+            lower = LATENCY_BUCKETS_MS[index - 1] if index > 0 else 0
+            upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else lower * 2
+            return round(lower + (upper - lower) * (target - seen) / count, 1)
+        seen += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+class ProcessingEventStore:
+    """
+    SQLite event log plus per-minute, hourly and daily rollups
+
+    Each recorded event is appended to the raw log and folded into one
+    bucket per granularity in the same transaction, so charts and latency
+    percentiles over any range read a handful of rollup rows instead of
+    scanning raw events.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "processing_events.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._recorded = 0
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                document TEXT NOT NULL,
+                user TEXT,
+                outcome TEXT NOT NULL,
+                pages INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                upload_ms REAL,
+                analyze_ms REAL,
+                total_ms REAL NOT NULL,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS rollups (
+                granularity TEXT NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                events INTEGER NOT NULL DEFAULT 0,
+                successes INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                pages INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket_start)
+            );
+            CREATE TABLE IF NOT EXISTS rollup_latency (
+                granularity TEXT NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                latency_bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (granularity, bucket_start, latency_bucket)
+            );
+        """)
+
+    def record(self, document, outcome, total_ms, user=None, pages=0, size_bytes=0,
+               upload_ms=None, analyze_ms=None, error=None, ts=None):
+        """
+        Append one processing event and fold it into the rollups
+
+        Args:
+            document (str): Blob name
+            outcome (str): "success", "failure" or "abandoned"
+            total_ms (float): End-to-end duration in milliseconds
+            user (str): Username that triggered the processing (optional)
+            pages (int): Pages analyzed
+            size_bytes (int): Document size in bytes
+            upload_ms (float): Upload stage duration (optional)
+            analyze_ms (float): Analysis stage duration (optional)
+            error (str): Error message for failures (optional)
+            ts (float): Event time as a Unix timestamp (defaults to now)
+        """
+        ts = ts if ts is not None else time.time()
+        success = 1 if outcome == "success" else 0
+        failure = 1 if outcome == "failure" else 0
+        latency_bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, total_ms)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO events (ts, document, user, outcome, pages, bytes, upload_ms, analyze_ms, total_ms, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, document, user, outcome, pages, size_bytes, upload_ms, analyze_ms, total_ms, error)
+            )
+            for granularity, (seconds, _) in GRANULARITIES.items():
+                bucket_start = int(ts // seconds * seconds)
+                self._conn.execute("""
+                    INSERT INTO rollups (granularity, bucket_start, events, successes, failures, pages, bytes, total_ms)
+                    VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+                    ON CONFLICT (granularity, bucket_start) DO UPDATE SET
+                        events = events + 1,
+                        successes = successes + excluded.successes,
+                        failures = failures + excluded.failures,
+                        pages = pages + excluded.pages,
+                        bytes = bytes + excluded.bytes,
+                        total_ms = total_ms + excluded.total_ms
+                """, (granularity, bucket_start, success, failure, pages, size_bytes, total_ms))
+                self._conn.execute("""
+                    INSERT INTO rollup_latency (granularity, bucket_start, latency_bucket, count)
+                    VALUES (?, ?, ?, 1)
+                    ON CONFLICT (granularity, bucket_start, latency_bucket) DO UPDATE SET count = count + 1
+                """, (granularity, bucket_start, latency_bucket))
+            self._recorded += 1
+            if self._recorded % PRUNE_EVERY == 0:
+                self._prune(ts)
+
+    def _prune(self, now):
+        """Drop rollup buckets older than their granularity's retention"""
+        for granularity, (_, retention) in GRANULARITIES.items():
+            if retention is None:
+                continue
+            for table in ("rollups", "rollup_latency"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE granularity = ? AND bucket_start < ?",
+                    (granularity, now - retention)
+                )
+
+    def _histograms(self, granularity, since, until):
+        histograms = {}
+        for bucket_start, latency_bucket, count in self._conn.execute(
+            "SELECT bucket_start, latency_bucket, count FROM rollup_latency "
+            "WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ?",
+            (granularity, since, until)
+        ):
+            histogram = histograms.setdefault(bucket_start, [0] * (len(LATENCY_BUCKETS_MS) + 1))
+            histogram[latency_bucket] += count
+        return histograms
+
+    def series(self, granularity="hour", periods=24, until=None):
+        """
+        Per-bucket throughput and latency for the last ``periods`` buckets
+
+        Returns:
+            list: One dict per non-empty bucket, oldest first
+        """
+        seconds = GRANULARITIES[granularity][0]
+        until = until if until is not None else time.time()
+        end = int(until // seconds * seconds) + seconds
+        since = end - periods * seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT bucket_start, events, successes, failures, pages, bytes, total_ms FROM rollups "
+                "WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ? ORDER BY bucket_start",
+                (granularity, since, end)
+            ).fetchall()
+            histograms = self._histograms(granularity, since, end)
+        series = []
+        for bucket_start, events, successes, failures, pages, size_bytes, total_ms in rows:
+            histogram = histograms.get(bucket_start, [])
+            series.append({
+                "bucket_start": bucket_start,
+                "events": events,
+                "successes": successes,
+                "failures": failures,
+                "pages": pages,
+                "bytes": size_bytes,
+                "avg_ms": round(total_ms / events, 1) if events else None,
+                "p50_ms": _percentile_from_histogram(histogram, 0.50),
+                "p95_ms": _percentile_from_histogram(histogram, 0.95),
+                "p99_ms": _percentile_from_histogram(histogram, 0.99),
+            })
+        return series
+
+    def summary(self, granularity="hour", periods=24, until=None):
+        """
+        Totals, success rate and latency percentiles over the last ``periods`` buckets
+        """
+        seconds = GRANULARITIES[granularity][0]
+        until = until if until is not None else time.time()
+        end = int(until // seconds * seconds) + seconds
+        since = end - periods * seconds
+        with self._lock:
+            events, successes, failures, pages, size_bytes, total_ms = self._conn.execute(
+                "SELECT COALESCE(SUM(events), 0), COALESCE(SUM(successes), 0), COALESCE(SUM(failures), 0), "
+                "COALESCE(SUM(pages), 0), COALESCE(SUM(bytes), 0), COALESCE(SUM(total_ms), 0) "
+                "FROM rollups WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ?",
+                (granularity, since, end)
+            ).fetchone()
+            merged = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for histogram in self._histograms(granularity, since, end).values():
+                merged = [a + b for a, b in zip(merged, histogram)]
+        return {
+            "window_seconds": periods * seconds,
+            "events": events,
+            "successes": successes,
+            "failures": failures,
+            "abandoned": events - successes - failures,
+            "success_rate": round(successes / events * 100, 2) if events else None,
+            "pages": pages,
+            "bytes": size_bytes,
+            "throughput_per_hour": round(events / (periods * seconds) * 3600, 2),
+            "avg_ms": round(total_ms / events, 1) if events else None,
+            "p50_ms": _percentile_from_histogram(merged, 0.50),
+            "p95_ms": _percentile_from_histogram(merged, 0.95),
+            "p99_ms": _percentile_from_histogram(merged, 0.99),
+        }
+
+_event_store = None
+
+def get_event_store():
+    """Process-wide event store, opened on first use"""
+    global _event_store
+    if _event_store is None:
+        _event_store = ProcessingEventStore()
+    return _event_store
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other as src.*, config.* and scripts.*, relative to the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,167 @@
+"""
+Claim, acknowledge, retry and defer paths of the SQLite job queue and the worker
+"""
+import time
+
+import pytest
+
+from src.jobs.queue import JobQueue, SQLiteJobQueue, retry_delay
+from src.jobs.worker import JobDeferred, Worker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(db_path=str(tmp_path / "jobs.db"), max_attempts=2, visibility_timeout=60)
+
+
+def visible_at(queue, job_id):
+    return queue._conn.execute("SELECT visible_at FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+def make_ready(queue, job_id):
+    """Skip a retry delay or let a claim's visibility timeout lapse"""
+    with queue._conn:
+        queue._conn.execute("UPDATE jobs SET visible_at = 0 WHERE id = ?", (job_id,))
+
+
+def test_receive_claims_a_job_once(queue):
+    job_id = queue.enqueue("analyze", {"blob": "a.pdf"})
+
+    job = queue.receive()
+
+    assert job["id"] == job_id
+    assert job["payload"] == {"blob": "a.pdf"}
+    assert job["receipt"]
+    assert job["attempts"] == 1
+    assert queue.status(job_id)["status"] == "running"
+    assert visible_at(queue, job_id) > time.time() + 50
+    assert queue.receive() is None
+
+
+def test_complete_acknowledges_the_current_claim_only(queue):
+    job_id = queue.enqueue("analyze", {})
+    stale = queue.receive()
+    make_ready(queue, job_id)
+    current = queue.receive()
+
+    assert current["receipt"] != stale["receipt"]
+    assert queue.complete(stale, {"pages": 1}) is False
+    assert queue.complete(current, {"pages": 2}) is True
+
+    record = queue.status(job_id)
+    assert record["status"] == "succeeded"
+    assert record["result"] == {"pages": 2}
+    assert "receipt" not in record
+    assert queue.receive() is None
+
+
+def test_extend_fails_once_the_claim_is_lost(queue):
+    job_id = queue.enqueue("analyze", {})
+    stale = queue.receive()
+
+    assert queue.extend(stale, 120) is True
+    assert visible_at(queue, job_id) > time.time() + 110
+
+    make_ready(queue, job_id)
+    queue.receive()
+    assert queue.extend(stale) is False
+
+
+def test_fail_retries_after_backoff_then_dead_letters(queue):
+    job_id = queue.enqueue("analyze", {})
+
+    first = queue.receive()
+    before = time.time()
+    assert queue.fail(first, "boom") is True
+    record = queue.status(job_id)
+    assert record["status"] == "queued"
+    assert record["error"] == "boom"
+    assert visible_at(queue, job_id) >= before + retry_delay(1)
+    assert queue.receive() is None
+
+    make_ready(queue, job_id)
+    second = queue.receive()
+    assert second["attempts"] == 2
+    assert queue.fail(second, "boom again") is True
+    record = queue.status(job_id)
+    assert record["status"] == "dead"
+    assert record["finished_at"]
+
+    make_ready(queue, job_id)
+    assert queue.receive() is None
+    assert queue.stats()["dead"] == 1
+
+
+def test_fail_with_a_stale_receipt_is_ignored(queue):
+    job_id = queue.enqueue("analyze", {})
+    stale = queue.receive()
+    make_ready(queue, job_id)
+    queue.receive()
+
+    assert queue.fail(stale, "late") is False
+    assert queue.status(job_id)["status"] == "running"
+
+
+def test_expired_claim_is_offered_again_until_attempts_run_out(queue):
+    job_id = queue.enqueue("analyze", {})
+    queue.receive()
+    make_ready(queue, job_id)
+
+    again = queue.receive()
+    assert again["id"] == job_id
+    assert again["attempts"] == 2
+
+    make_ready(queue, job_id)
+    assert queue.receive() is None
+    record = queue.status(job_id)
+    assert record["status"] == "dead"
+    assert record["error"] == "visibility timeout expired on every attempt"
+
+
+def test_worker_defers_without_using_an_attempt(queue):
+    def handler(payload):
+        raise JobDeferred("claimed elsewhere", 30)
+
+    worker = Worker(queue, {"analyze": handler}, visibility_timeout=60)
+    job_id = queue.enqueue("analyze", {})
+
+    before = time.time()
+    assert worker.run_job(queue.receive()) is False
+    assert worker.deferred == 1
+    record = queue.status(job_id)
+    assert record["status"] == "queued"
+    assert record["attempts"] == 0
+    assert visible_at(queue, job_id) >= before + 30
+
+    # Deferring on every attempt never dead-letters the job
+    for _ in range(3):
+        make_ready(queue, job_id)
+        worker.run_job(queue.receive())
+    assert queue.status(job_id)["status"] == "queued"
+
+
+def test_worker_settles_success_and_failure(queue):
+    worker = Worker(queue, {"ok": lambda payload: {"echo": payload}, "bad": lambda payload: 1 / 0},
+                    visibility_timeout=60)
+    ok_id = queue.enqueue("ok", {"n": 1})
+    assert worker.run_job(queue.receive()) is True
+    assert queue.status(ok_id)["result"] == {"echo": {"n": 1}}
+
+    bad_id = queue.enqueue("bad", {})
+    assert worker.run_job(queue.receive()) is False
+    record = queue.status(bad_id)
+    assert record["status"] == "queued"
+    assert "division by zero" in record["error"]
+    assert (worker.processed, worker.failed) == (1, 1)
+
+
+def test_incomplete_backend_cannot_be_created():
+    class HalfQueue(JobQueue):
+        def enqueue(self, kind, payload):
+            return "id"
+
+        def receive(self, visibility_timeout=None):
+            return None
+
+    with pytest.raises(TypeError):
+        HalfQueue()
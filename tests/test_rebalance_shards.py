@@ -0,0 +1,152 @@
+"""
+Move and skip decisions of scripts/rebalance_shards.py, against in-memory containers
+"""
+import hashlib
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import HttpResponseError, ResourceModifiedError, ResourceNotFoundError
+
+from scripts.rebalance_shards import move_blob, plan_moves
+from src.data_ingestion.shards import ShardMap
+
+_etags = itertools.count()
+
+
+class FakeBlobClient:
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+
+    def get_blob_properties(self):
+        if self.name not in self.container.blobs:
+            raise ResourceNotFoundError("BlobNotFound")
+        return self.container.properties(self.name)
+
+    def start_copy_from_url(self, url, source_etag=None, source_match_condition=None):
+        source_container, name = url.split("?")[0].split("/", 1)
+        source = self.container.registry[source_container]
+        data, etag, md5 = source.blobs[name]
+        if source_etag is not None and source_etag != etag:
+            error = HttpResponseError("SourceConditionNotMet")
+            error.status_code = 412
+            raise error
+        self.container.copies += 1
+        # Server-side copies keep the source's Content-MD5, or its absence
+        self.container.blobs[self.name] = (data, f"etag-{next(_etags)}", md5)
+
+    def delete_blob(self, delete_snapshots=None, etag=None, match_condition=None):
+        if etag is not None and self.container.blobs[self.name][1] != etag:
+            raise ResourceModifiedError("ConditionNotMet")
+        del self.container.blobs[self.name]
+
+
+class FakeContainer:
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+        self.blobs = {}
+        self.copies = 0
+        registry[name] = self
+
+    def put(self, name, data, with_md5=True):
+        md5 = hashlib.md5(data).digest() if with_md5 else None
+        self.blobs[name] = (data, f"etag-{next(_etags)}", md5)
+
+    def properties(self, name):
+        data, etag, md5 = self.blobs[name]
+        return SimpleNamespace(
+            name=name, size=len(data), etag=etag,
+            content_settings=SimpleNamespace(content_md5=md5),
+            copy=SimpleNamespace(status="success", status_description=None)
+        )
+
+    def get_blob_client(self, name):
+        return FakeBlobClient(self, name)
+
+    def list_blobs(self):
+        return [self.properties(name) for name in sorted(self.blobs)]
+
+
+class FakeShard:
+    def __init__(self, name, registry):
+        self.name = name
+        self.container_client = FakeContainer(name, registry)
+
+    def sas_url(self, blob_name, permission, expiry):
+        return f"{self.name}/{blob_name}?sig"
+
+
+@pytest.fixture
+def shards():
+    registry = {}
+    return FakeShard("shard-a", registry), FakeShard("shard-b", registry)
+
+
+def test_moves_missing_blob_and_deletes_source(shards):
+    source, owner = shards
+    source.container_client.put("doc.pdf", b"content")
+    listed = source.container_client.properties("doc.pdf")
+
+    assert move_blob(source, owner, listed) == "moved"
+    assert owner.container_client.blobs["doc.pdf"][0] == b"content"
+    assert "doc.pdf" not in source.container_client.blobs
+
+
+def test_skips_copy_when_both_md5s_match(shards):
+    source, owner = shards
+    source.container_client.put("doc.pdf", b"content")
+    owner.container_client.put("doc.pdf", b"content")
+    listed = source.container_client.properties("doc.pdf")
+
+    assert move_blob(source, owner, listed) == "moved"
+    assert owner.container_client.copies == 0
+
+
+def test_recopies_same_size_blob_without_md5(shards):
+    source, owner = shards
+    # An earlier pass copied the old version; the source was re-uploaded in blocks since
+    owner.container_client.put("doc.pdf", b"old-version", with_md5=False)
+    source.container_client.put("doc.pdf", b"new-version", with_md5=False)
+    listed = source.container_client.properties("doc.pdf")
+
+    assert move_blob(source, owner, listed) == "moved"
+    assert owner.container_client.copies == 1
+    assert owner.container_client.blobs["doc.pdf"][0] == b"new-version"
+
+
+def test_keeps_source_that_changed_after_listing(shards):
+    source, owner = shards
+    source.container_client.put("doc.pdf", b"listed")
+    listed = source.container_client.properties("doc.pdf")
+    source.container_client.put("doc.pdf", b"rewritten", with_md5=False)
+
+    assert move_blob(source, owner, listed) == "changed"
+    assert source.container_client.blobs["doc.pdf"][0] == b"rewritten"
+    assert "doc.pdf" not in owner.container_client.blobs
+
+
+def test_keep_source_only_copies(shards):
+    source, owner = shards
+    source.container_client.put("doc.pdf", b"content")
+    listed = source.container_client.properties("doc.pdf")
+
+    assert move_blob(source, owner, listed, keep_source=True) == "copied"
+    assert "doc.pdf" in source.container_client.blobs
+    assert owner.container_client.blobs["doc.pdf"][0] == b"content"
+
+
+def test_plan_moves_only_picks_blobs_owned_elsewhere(shards):
+    shard_map = ShardMap(list(shards))
+    names = [f"users/u{i % 5}/doc-{i}.pdf" for i in range(200)]
+    for name in names:
+        shards[0].container_client.put(name, name.encode())
+
+    moves, owners = plan_moves(shard_map, list(shards), workers=2)
+
+    expected = {name for name in names if shard_map.shard_for(name).name == "shard-b"}
+    assert {blob.name for _, _, blob in moves} == expected
+    assert all(source.name == "shard-a" and owner.name == "shard-b" for source, owner, _ in moves)
+    assert owners["shard-a"] + owners["shard-b"] == len(names)
+    assert 0 < len(expected) < len(names)